@@ -0,0 +1,55 @@
+from sys import argv
+from time import perf_counter
+from nxapi_sim import intfc_rows
+from nxapi_counters import CounterTable
+
+
+def main(switches=100, ports=500):
+    """
+    This program times the CounterTable steps for a fleet: building the
+    tables from "show interface" rows, joining the switches into one fleet
+    table, and computing the rates between two polls.
+
+    :param switches: The number of switches.
+    :param ports: The number of interfaces per switch.
+
+    :prints: The time taken by each step.
+
+    :example:
+    (py3) C:\\Users>python bench_counters.py 100 500
+
+     100 switches x 500 ports
+     from_rows:    262.985 ms (2.630 ms/switch)
+     concat:        30.260 ms
+     rates:         21.725 ms
+    """
+    switches, ports = int(switches), int(ports)
+    before_rows = intfc_rows(ports)
+    after_rows = [dict(row, vdc_lvl_in_bytes=str(int(row.get("vdc_lvl_in_bytes", 0)) + 1000),
+                       eth_crc=int(row.get("eth_crc", 0)) + 1) for row in before_rows]
+
+    start = perf_counter()
+    before = dict(("sw{}".format(i), CounterTable.from_rows(before_rows, timestamp=0)) for i in range(switches))
+    after = dict(("sw{}".format(i), CounterTable.from_rows(after_rows, timestamp=30)) for i in range(switches))
+    build = (perf_counter() - start) / 2
+
+    start = perf_counter()
+    fleet_before = CounterTable.concat(before)
+    fleet_after = CounterTable.concat(after)
+    concat = (perf_counter() - start) / 2
+
+    start = perf_counter()
+    rates = fleet_after.rates(fleet_before)
+    rate = perf_counter() - start
+
+    assert rates["eth_crc"].max() == 1 / 30
+
+    print("\n {} switches x {} ports"
+          "\n from_rows:   {:8.3f} ms ({:.3f} ms/switch)"
+          "\n concat:      {:8.3f} ms"
+          "\n rates:       {:8.3f} ms".format(
+        switches, ports, build * 1000, build * 1000 / switches, concat * 1000, rate * 1000))
+
+
+if __name__ == '__main__':
+    main(*argv[1:3])
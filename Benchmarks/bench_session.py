@@ -0,0 +1,63 @@
+from sys import argv
+from time import perf_counter
+import nxapi_sim
+from nxapi_class import NxAaa, NxSession, NxSystem
+
+
+def main(calls):
+    """
+    This program compares the per-call latency of NxSystem.nx_sh_ver()
+    when every call opens a new connection, and when the calls share a
+    NxSession connection pool. The switch is the local HTTPS simulator
+    in nxapi_sim, so the numbers show the cost of the TCP connect and TLS
+    handshake that the session saves.
+
+    :param calls: The number of "show version" calls to make per run.
+
+    :prints: The mean latency per call for each run.
+
+    :example:
+    (py3) C:\\Users>python bench_session.py 200
+
+     new connection per call: 200 calls, 39.284 ms/call
+     pooled NxSession:        200 calls, 1.917 ms/call
+     saved per call:          37.367 ms (95.1%)
+    """
+    calls = int(calls)
+    server = nxapi_sim.start(tls=True)
+    url = server.switch_url('localhost')
+
+    try:
+        header = NxAaa('admin', 'localhost', 'admin', url=url).nx_login()
+        single = time_calls(NxSystem(header, 'localhost', url=url), calls)
+
+        with NxSession('localhost', url=url) as session:
+            pooled = time_calls(NxSystem(header, 'localhost', url=url, session=session), calls)
+    finally:
+        server.shutdown()
+
+    print("\n new connection per call: {} calls, {:.3f} ms/call"
+          "\n pooled NxSession:        {} calls, {:.3f} ms/call"
+          "\n saved per call:          {:.3f} ms ({:.1f}%)".format(
+        calls, single * 1000, calls, pooled * 1000,
+        (single - pooled) * 1000, (single - pooled) / single * 100))
+
+
+def time_calls(sw, calls):
+    """
+    This function times repeated "show version" calls.
+
+    :param sw: The NxSystem object to make the calls with.
+    :param calls: The number of calls to make.
+
+    :return: The mean number of seconds per call.
+    """
+    start = perf_counter()
+    for _ in range(calls):
+        sw.nx_sh_ver().json()
+
+    return (perf_counter() - start) / calls
+
+
+if __name__ == '__main__':
+    main(argv[1] if len(argv) > 1 else 200)
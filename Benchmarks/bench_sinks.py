@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+from sys import argv
+from time import perf_counter
+from nxapi_sim import intfc_rows
+from nxapi_export import SINKS, open_sink, pyarrow
+from nxapi_normalize import INTFC_HEADERS, normalize_intfcs
+
+
+def main(count=100000):
+    """
+    This program writes the same normalized interface records to each report
+    format, and reports the write throughput and file size of each.
+
+    :param count: The number of interface records to write.
+
+    :prints: The rows per second, MB per second and file size per format.
+
+    :example:
+    (py3) C:\\Users>python bench_sinks.py 100000
+
+     100000 interface records
+     csv        225,831 rows/s   34.6 MB/s   15.3 MB
+     jsonl       84,255 rows/s   39.5 MB/s   46.9 MB
+     xlsx         3,954 rows/s    0.4 MB/s    9.4 MB
+     arrow      145,875 rows/s   34.2 MB/s   23.4 MB
+     parquet    126,684 rows/s    2.4 MB/s    1.9 MB
+    """
+    count = int(count)
+    records = list(normalize_intfcs(intfc_rows(count)))
+    out_dir = tempfile.mkdtemp()
+
+    print("\n {} interface records".format(count))
+    try:
+        for fmt in SINKS:
+            if fmt in ("arrow", "parquet") and pyarrow is None:
+                print(" {:8} skipped, pyarrow is not installed".format(fmt))
+                continue
+
+            path = os.path.join(out_dir, "intfcs.{}".format(fmt))
+            start = perf_counter()
+            with open_sink(path, INTFC_HEADERS) as sink:
+                sink.write_rows(records)
+            took = perf_counter() - start
+
+            size = os.path.getsize(path) / 1e6
+            print(" {:8} {:9,.0f} rows/s {:6.1f} MB/s {:6.1f} MB".format(fmt, count / took, size / took, size))
+    finally:
+        shutil.rmtree(out_dir)
+
+
+if __name__ == '__main__':
+    main(*argv[1:2])
@@ -0,0 +1,372 @@
+import os
+import gc
+import sys
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from time import perf_counter
+from datetime import datetime
+from statistics import median
+from collections import OrderedDict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+for folder in ("", "System", "Layer2", "Interfaces"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+import nxapi_sim
+from nxapi_class import NxAaa, NxIntfc, NxL2, NxSession, NxSystem, req_body
+from nxapi_counters import CounterTable
+from nxapi_export import SINKS, open_sink, pyarrow
+from nxapi_normalize import INTFC_HEADERS, normalize_intfcs
+from nxapi_result import NxResult
+from nxapi_sh_ver import sh_ver_filter
+from nxapi_sh_vlans import vlans_fltr
+from nxapi_sh_intfcs import sh_intfcs_fltr
+from nxapi_sh_intfc_vlans import vlan_table
+
+RESULTS = os.path.join(HERE, "results")
+
+SIZES = (10, 100, 1000, 10000, 100000)
+
+# NX-OS has at most 4094 VLANs, so the VLAN payloads stop growing there.
+MAX_VLANS = 4094
+
+
+class Payloads:
+    """
+    This builds the synthetic payloads of each size once, and runs the
+    simulator the round trip cases post to. Each size is its own switch
+    on the simulator, with size interfaces and VLANs.
+    """
+
+    def __init__(self):
+        self.server = None
+        self.sessions = {}
+        self.made = {}
+        self.out_dir = tempfile.mkdtemp()
+
+    def get(self, kind, size):
+        if (kind, size) not in self.made:
+            self.made[kind, size] = getattr(self, kind)(size)
+
+        return self.made[kind, size]
+
+    def switch(self, size):
+        """
+        :return: The NxSession, header and url of the simulated switch for size.
+        """
+        if self.server is None:
+            self.server = nxapi_sim.start()
+        if size not in self.sessions:
+            name = "sim{}".format(size)
+            self.server.switches[name] = nxapi_sim.SimSwitch(name, size, min(size, MAX_VLANS))
+            url = self.server.switch_url(name)
+            session = NxSession(name, url=url)
+            header = NxAaa("admin", name, "admin", url=url, session=session).nx_login()
+            self.sessions[size] = (session, header, url)
+
+        return self.sessions[size]
+
+    def intfcs(self, size):
+        session, header, url = self.switch(size)
+        return NxIntfc(header, "sim{}".format(size), url=url, session=session).sh_intfcs().content
+
+    def vlans(self, size):
+        session, header, url = self.switch(size)
+        return NxL2(header, "sim{}".format(size), url=url, session=session).sh_vlan().content
+
+    def version(self, size):
+        session, header, url = self.switch(size)
+        return NxSystem(header, "sim{}".format(size), url, session).nx_sh_ver().content
+
+    def intfc_rows(self, size):
+        return json.loads(self.get("intfcs", size))["result"]["body"]["TABLE_interface"]["ROW_interface"]
+
+    def records(self, size):
+        return list(normalize_intfcs(self.get("intfc_rows", size)))
+
+    def close(self):
+        for session, _, _ in self.sessions.values():
+            session.close()
+        if self.server is not None:
+            self.server.shutdown()
+        shutil.rmtree(self.out_dir)
+
+
+def case_req_body(payloads, size):
+    """Build a batch of size request bodies."""
+    return lambda: [req_body("show interface", req_id) for req_id in range(size)]
+
+
+def case_round_trip_intfcs(payloads, size):
+    """Post "show interface" over a pooled session and read the body."""
+    session, header, url = payloads.switch(size)
+    intfc = NxIntfc(header, "sim{}".format(size), url=url, session=session)
+    return lambda: intfc.sh_intfcs().content
+
+
+def case_round_trip_vlans(payloads, size):
+    """Post "show vlan" over a pooled session and read the body."""
+    session, header, url = payloads.switch(size)
+    l2 = NxL2(header, "sim{}".format(size), url=url, session=session)
+    return lambda: l2.sh_vlan().content
+
+
+def case_decode_intfcs(payloads, size):
+    """Decode a "show interface" body."""
+    content = payloads.get("intfcs", size)
+    return lambda: json.loads(content)
+
+
+def case_decode_vlans(payloads, size):
+    """Decode a "show vlan" body."""
+    content = payloads.get("vlans", size)
+    return lambda: json.loads(content)
+
+
+def case_sh_ver_filter(payloads, size):
+    """Filter the "show version" of size switches."""
+    req = NxResult(reply=json.loads(payloads.get("version", size)))
+    return lambda: [sh_ver_filter(req) for _ in range(size)]
+
+
+def case_vlans_fltr(payloads, size):
+    """Filter a decoded "show vlan"."""
+    req = NxResult(reply=json.loads(payloads.get("vlans", size)))
+    return lambda: vlans_fltr(req)
+
+
+def case_vlan_table(payloads, size):
+    """Index a decoded "show vlan" by VLAN and interface."""
+    req = NxResult(reply=json.loads(payloads.get("vlans", size)))
+    return lambda: vlan_table(req)
+
+
+def case_sh_intfcs_fltr(payloads, size):
+    """Filter a decoded "show interface"."""
+    req = NxResult(reply=json.loads(payloads.get("intfcs", size)))
+    return lambda: sh_intfcs_fltr(req)
+
+
+def case_counter_table(payloads, size):
+    """Build a CounterTable from the "show interface" rows."""
+    rows = payloads.get("intfc_rows", size)
+    return lambda: CounterTable.from_rows(rows)
+
+
+def export_case(fmt):
+    def case(payloads, size):
+        records = payloads.get("records", size)
+        path = os.path.join(payloads.out_dir, "intfcs.{}".format(fmt))
+
+        def export():
+            with open_sink(path, INTFC_HEADERS) as sink:
+                sink.write_rows(records)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+        return export
+
+    case.__doc__ = "Write the normalized interface records as {}.".format(fmt)
+
+    return case
+
+
+CASES = OrderedDict([
+    ("req_body", case_req_body),
+    ("round_trip.intfcs", case_round_trip_intfcs),
+    ("round_trip.vlans", case_round_trip_vlans),
+    ("decode.intfcs", case_decode_intfcs),
+    ("decode.vlans", case_decode_vlans),
+    ("filter.sh_ver_filter", case_sh_ver_filter),
+    ("filter.vlans_fltr", case_vlans_fltr),
+    ("filter.vlan_table", case_vlan_table),
+    ("filter.sh_intfcs_fltr", case_sh_intfcs_fltr),
+    ("filter.counter_table", case_counter_table),
+])
+for fmt in SINKS:
+    CASES["export.{}".format(fmt)] = export_case(fmt)
+
+
+def main(args=None):
+    """
+    This program times each stage of a collection, from building the request
+    to writing the report, over payloads of each size. The results can be
+    saved under the current git commit, and two saved commits compared, so a
+    slower filter or export shows up before the nightly job overruns.
+
+    :prints: The best and median time of each case and size, or for
+    --compare, the change of each case and size between two commits.
+
+    :example:
+    (py3) C:\\Users>python bench_suite.py --sizes 100,10000 --match filter --save
+
+     case                        size       best     median   per item
+     filter.sh_ver_filter         100    0.263 ms   0.271 ms    2.6 us
+     filter.sh_ver_filter       10000   26.602 ms  27.115 ms    2.7 us
+     filter.vlans_fltr            100    0.035 ms   0.036 ms    0.4 us
+     ...
+     saved results\\1a2b3c4.json
+
+    (py3) C:\\Users>python bench_suite.py --compare 0ed3be3 1a2b3c4
+
+     case                        size     0ed3be3    1a2b3c4   change
+     filter.sh_intfcs_fltr      10000   96.549 ms  33.703 ms   -65.1%
+     ...
+    """
+    parser = argparse.ArgumentParser(prog="bench_suite", description="Time each stage of a collection.")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="Comma separated interface and VLAN counts.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each case; the best is kept.")
+    parser.add_argument("--match", default="", help="Only run the cases with this in their name.")
+    parser.add_argument("--save", action="store_true", help="Save the results under the git commit.")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two saved commits.")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="The slowdown that --compare reports as a regression.")
+    args = parser.parse_args(args)
+
+    if args.compare:
+        return compare(args.compare[0], args.compare[1], args.threshold)
+
+    results = run([int(size) for size in args.sizes.split(",")], args.repeat, args.match)
+    if args.save:
+        print("\n saved {}".format(save(results)))
+
+
+def run(sizes, repeat=5, match=""):
+    """
+    This runs the cases, and prints each result as it finishes.
+
+    :param sizes: The payload sizes to run each case with.
+    :param repeat: The number of runs of each case.
+    :param match: Only run the cases with this in their name.
+
+    :return: A dictionary of each "case[size]" and its times in seconds.
+    """
+    payloads = Payloads()
+    results = OrderedDict()
+    print("\n {:26} {:>6} {:>10} {:>10} {:>10}".format("case", "size", "best", "median", "per item"))
+    try:
+        for name, case in CASES.items():
+            if match not in name:
+                continue
+            if name in ("export.arrow", "export.parquet") and pyarrow is None:
+                print(" {:26} skipped, pyarrow is not installed".format(name))
+                continue
+
+            for size in sizes:
+                times = timed(case(payloads, size), repeat)
+                results["{}[{}]".format(name, size)] = {"best": min(times), "median": median(times)}
+                print(" {:26} {:6} {:>10} {:>10} {:>7.1f} us".format(
+                    name, size, ms(min(times)), ms(median(times)), min(times) / size * 1e6))
+    finally:
+        payloads.close()
+
+    return results
+
+
+def timed(func, repeat):
+    """
+    This function runs func repeat times, with the garbage collector
+    paused, after one untimed warm up run.
+
+    :return: A list of the seconds each run took.
+    """
+    func()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = perf_counter()
+            func()
+            times.append(perf_counter() - start)
+        finally:
+            gc.enable()
+
+    return times
+
+
+def ms(seconds):
+    return "{:.3f} ms".format(seconds * 1000)
+
+
+def commit():
+    """
+    This returns the short hash of the current git commit, with "+" on
+    the end if the tree has changes, or "local" outside of git.
+    """
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode().strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, check=True,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "local"
+
+    return rev + ("+" if dirty else "")
+
+
+def save(results):
+    """
+    This saves the results in results/<commit>.json, with the machine
+    they were run on.
+
+    :return: The path of the file.
+    """
+    os.makedirs(RESULTS, exist_ok=True)
+    rev = commit()
+    path = os.path.join(RESULTS, "{}.json".format(rev))
+    with open(path, "w") as f:
+        json.dump({
+            "commit": rev,
+            "date": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "cpu": platform.processor() or platform.machine(),
+            "results": results,
+        }, f, indent=2)
+
+    return path
+
+
+def load(rev):
+    with open(os.path.join(RESULTS, "{}.json".format(rev))) as f:
+        return json.load(f)
+
+
+def compare(before, after, threshold=0.1):
+    """
+    This prints the change in the best time of each case both commits ran.
+
+    :return: 1 if any case got slower by more than threshold, else 0,
+    so a CI job can fail on a regression.
+    """
+    old, new = load(before)["results"], load(after)["results"]
+    regressions = 0
+    print("\n {:26} {:>6} {:>10} {:>10} {:>8}".format("case", "size", before, after, "change"))
+    for key in old:
+        if key not in new:
+            continue
+        name, size = key[:-1].split("[")
+        change = new[key]["best"] / old[key]["best"] - 1
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  SLOWER"
+        print(" {:26} {:>6} {:>10} {:>10} {:>+7.1f}%{}".format(
+            name, size, ms(old[key]["best"]), ms(new[key]["best"]), change * 100, flag))
+
+    print("\n {} regressions over {:.0f}%".format(regressions, threshold * 100))
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import gc
+from sys import argv
+from time import perf_counter
+import nxapi_sim
+from nxapi_class import NxAaa, NxIntfc, NxL2, NxSession
+
+FORMATS = ("jsonrpc", "json", "xml", "ascii")
+
+
+def main(interfaces=3000, vlans=500, repeat=5):
+    """
+    This program compares the wire formats of nxapi_wire on the "show
+    interface" and "show vlan brief" payloads, with and without gzip. The
+    switch is the local simulator in nxapi_sim, with compression on.
+
+    :param interfaces: The number of interfaces on the switch.
+    :param vlans: The number of VLANs on the switch.
+    :param repeat: The number of runs; the best run is reported.
+
+    :prints: The bytes on the wire, and the best round trip and decode
+    time of each command, format and compression. The ascii format is the
+    CLI text, so its decode leaves the text still to be parsed.
+
+    :example:
+    (py3) C:\\Users>python bench_wire.py 3000 500
+
+     show interface, 3000 interfaces, best of 5
+     format   gzip       bytes   round trip     decode
+     jsonrpc  no      2299663    12.678 ms  27.887 ms
+     jsonrpc  yes       78677    30.961 ms  20.702 ms
+     json     no      2299774     9.058 ms  18.414 ms
+     json     yes       78760    24.562 ms  19.663 ms
+     xml      no      3182063    16.630 ms 166.906 ms
+     xml      yes       87830    31.744 ms 141.089 ms
+     ...
+    """
+    interfaces, vlans, repeat = int(interfaces), int(vlans), int(repeat)
+    server = nxapi_sim.start(interfaces=interfaces, vlans=vlans, compress=True)
+    url = server.switch_url('bench')
+
+    try:
+        for title, request in (("show interface, {} interfaces".format(interfaces),
+                                lambda header, session: NxIntfc(header, 'bench', url=url, session=session)
+                                .sh_intfcs()),
+                               ("show vlan brief, {} VLANs".format(vlans),
+                                lambda header, session: NxL2(header, 'bench', url=url, session=session)
+                                .sh_vlan(brief=True))):
+            print("\n {}, best of {}"
+                  "\n format   gzip       bytes   round trip     decode".format(title, repeat))
+            for fmt in FORMATS:
+                for compress in (False, True):
+                    size, round_trip, decode = time_format(url, request, fmt, compress, repeat)
+                    print(" {:<8} {:<4} {:>11} {:>9.3f} ms {:>7.3f} ms".format(
+                        fmt, "yes" if compress else "no", size, round_trip * 1000, decode * 1000))
+    finally:
+        server.shutdown()
+
+
+def time_format(url, request, fmt, compress, repeat):
+    """
+    This function times one command in one wire format.
+
+    :return: The bytes on the wire, and the best round trip and decode
+    seconds.
+    """
+    with NxSession('bench', url=url, fmt=fmt, compress=compress) as session:
+        header = NxAaa('admin', 'bench', 'admin', url=url, session=session).nx_login()
+        round_trips = []
+        decodes = []
+        for _ in range(repeat):
+            gc.collect()
+            start = perf_counter()
+            resp = request(header, session)
+            resp.content
+            round_trips.append(perf_counter() - start)
+
+            start = perf_counter()
+            resp.json()
+            decodes.append(perf_counter() - start)
+
+    return int(resp.headers["Content-Length"]), min(round_trips), min(decodes)
+
+
+if __name__ == '__main__':
+    main(*argv[1:])
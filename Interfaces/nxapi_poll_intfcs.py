@@ -0,0 +1,55 @@
+from sys import argv
+from getpass import getpass
+from nxapi_poller import DeltaLog, Poller
+
+
+def main(switch_file, log_file, interval=30):
+    """
+    This polls the interface counters of many switches until stopped with
+    Ctrl-C. Only the counters that changed are appended to the log file,
+    which is gzipped if its name ends in .gz; see nxapi_poller.read_deltas()
+    to read it back.
+
+    :param switch_file: A file with one switch per line.
+    :param log_file: The file to append the counter changes to.
+    :param interval: The seconds between polls of each switch.
+
+    :prints: The interfaces that changed in each poll, and the interfaces
+    with the most errors and the highest utilization over the last 5 minutes.
+
+    :example:
+    (py3) C:\\Users>python nxapi_poll_intfcs.py switches.txt counters.jsonl.gz 30
+    What is your username: admin
+    What is your password
+    10.1.1.2: 54 interfaces changed
+    10.1.1.1: 54 interfaces changed
+    10.1.1.2: 12 interfaces changed
+      Ethernet1/47  3.20 errors/s  in 41.2%  out 12.0%
+      Ethernet1/45  0.00 errors/s  in 87.5%  out 60.1%
+    10.1.1.3: FAILED: HTTPSConnectionPool(host='10.1.1.3', port=443): Read timed out.
+    """
+    with open(switch_file) as f:
+        switches = [line.strip() for line in f if line.strip()]
+
+    user = input('What is your username: ')
+    pw = getpass('What is your password ')
+
+    with DeltaLog(log_file) as log:
+        poller = Poller(switches, user, pw, interval=float(interval), log=log)
+        try:
+            for switch, changed, error in poller.run():
+                if error is not None:
+                    print("{}: FAILED: {}".format(switch, error))
+                    continue
+
+                print("{}: {} interfaces changed".format(switch, changed))
+                for intfc, errors, in_util, out_util in poller.switches[switch].summary(top=2):
+                    print("  {:13} {:.2f} errors/s  in {:.1%}  out {:.1%}".format(intfc, errors, in_util, out_util))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            poller.close()
+
+
+if __name__ == '__main__':
+    main(*argv[1:4])
@@ -0,0 +1,52 @@
+from sys import argv
+from getpass import getpass
+from requests import RequestException
+from nxapi_export import XlsxExporter
+from nxapi_normalize import INTFC_HEADERS
+from nxapi_class import NxAaa, NxApiError, NxIntfc, NxSession
+from nxapi_sh_intfcs import sh_intfcs_stream, time_stamp
+
+
+def main(switch_file):
+    """
+    This collects the interface stats of every switch in a file, and saves
+    them to one workbook named "fleet_date_hourminute.xlsx" with a sheet for
+    each switch. The rows are written as they are parsed, so the memory used
+    does not grow with the number of switches or interfaces.
+
+    :param switch_file: A file with one switch per line.
+
+    :saves: A xlsx with a sheet of interfaces for each switch.
+
+    :example:
+    (py3) C:\\Users>python nxapi_sh_intfcs_fleet.py switches.txt
+    What is your username: admin
+    What is your password
+    10.1.1.1: 54 interfaces
+    10.1.1.2: 54 interfaces
+    10.1.1.3: FAILED: HTTPSConnectionPool(host='10.1.1.3', port=443): Max retries exceeded
+    """
+    with open(switch_file) as f:
+        switches = [line.strip() for line in f if line.strip()]
+
+    user = input('What is your username: ')
+    pw = getpass('What is your password ')
+
+    with XlsxExporter('fleet_{}.xlsx'.format(time_stamp())) as export:
+        for switch in switches:
+            try:
+                with NxSession(switch) as session:
+                    header = NxAaa(user, switch, pw, session=session).nx_login()
+                    sh_sw_intfcs = NxIntfc(header, switch, session=session).sh_intfcs(stream=True)
+                    if not sh_sw_intfcs.ok:
+                        print("{}: FAILED: {} {}".format(switch, sh_sw_intfcs.status_code, sh_sw_intfcs.reason))
+                        continue
+
+                    sheet = export.add_sheet(switch, INTFC_HEADERS)
+                    print("{}: {} interfaces".format(switch, sheet.write_rows(sh_intfcs_stream(sh_sw_intfcs))))
+            except (RequestException, NxApiError) as error:
+                print("{}: FAILED: {}".format(switch, error))
+
+
+if __name__ == '__main__':
+    main(argv[1])
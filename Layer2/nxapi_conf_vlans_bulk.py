@@ -0,0 +1,44 @@
+from sys import argv
+from getpass import getpass
+from nxapi_provision import provision_fleet, read_vlans
+
+
+def main(switch_file, vlan_file, workers=10):
+    """
+    :param switch_file: A file with one switch per line.
+    :param vlan_file: A file with one "vlan,name" per line; see
+    nxapi_provision.read_vlans().
+    :param workers: The number of switches to configure at once.
+
+    :prints: The number of VLANs created on each switch, and any VLAN
+    that failed with its reason.
+
+    :example:
+    (py3) C:\\Users>python nxapi_conf_vlans_bulk.py switches.txt vlans.txt 20
+    What is your username: admin
+    What is your password
+    10.1.1.2: 300 of 300 VLANs created
+    10.1.1.1: 299 of 300 VLANs created
+      VLAN 4095: VLAN ID 4095 is not in 1-4094
+    10.1.1.3: FAILED: HTTPSConnectionPool(host='10.1.1.3', port=443): Max retries exceeded
+    """
+    with open(switch_file) as f:
+        switches = [line.strip() for line in f if line.strip()]
+    pairs = read_vlans(vlan_file)
+
+    user = input('What is your username: ')
+    pw = getpass('What is your password ')
+
+    for switch, results, error in provision_fleet(switches, user, pw, pairs, int(workers)):
+        if error is not None:
+            print("{}: FAILED: {}".format(switch, error))
+            continue
+
+        failed = [(vlan, result) for vlan, result in results.items() if result != "ok"]
+        print("{}: {} of {} VLANs created".format(switch, len(results) - len(failed), len(results)))
+        for vlan, result in failed:
+            print("  VLAN {}: {}".format(vlan, result))
+
+
+if __name__ == '__main__':
+    main(*argv[1:4])
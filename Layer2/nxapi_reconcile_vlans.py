@@ -0,0 +1,54 @@
+from sys import argv
+from functions import nx_login
+from nxapi_provision import format_plan, read_vlans, reconcile_vlans
+
+
+def main(switch, vlan_file, *flags):
+    """
+    :param switch: The switch to configure.
+    :param vlan_file: A file with one "vlan,name" per line; see
+    nxapi_provision.read_vlans().
+    :param flags: --dry-run to only print the changes, and --delete
+    to also delete the VLANs that are not in the file.
+
+    :prints: The changes needed, and the result of any VLAN that failed.
+
+    :example:
+    (py3) C:\\Users>python nxapi_reconcile_vlans.py 10.1.1.1 vlans.txt --dry-run
+    What is your username: admin
+    What is your password
+    + vlan 30 name private
+    ~ vlan 10 name web -> www
+
+    (py3) C:\\Users>python nxapi_reconcile_vlans.py 10.1.1.1 vlans.txt
+    What is your username: admin
+    What is your password
+    + vlan 30 name private
+    ~ vlan 10 name web -> www
+    2 VLANs changed on 10.1.1.1
+
+    (py3) C:\\Users>python nxapi_reconcile_vlans.py 10.1.1.1 vlans.txt
+    What is your username: admin
+    What is your password
+    10.1.1.1 already has the VLANs in vlans.txt
+    """
+    pairs = read_vlans(vlan_file)
+    header = nx_login(switch)
+
+    plan, results = reconcile_vlans(header, switch, pairs, delete="--delete" in flags, dry_run="--dry-run" in flags)
+    if not any(plan.values()):
+        print("{} already has the VLANs in {}".format(switch, vlan_file))
+        return
+
+    print(format_plan(plan))
+    if results is None:
+        return
+
+    failed = [(vlan, result) for vlan, result in results.items() if result != "ok"]
+    print("{} VLANs changed on {}".format(len(results) - len(failed), switch))
+    for vlan, result in failed:
+        print("  VLAN {}: {}".format(vlan, result))
+
+
+if __name__ == '__main__':
+    main(*argv[1:])
@@ -0,0 +1,52 @@
+from sys import argv
+from functions import nx_login
+from nxapi_class import NxL2
+from nxapi_vlan import VlanTable, intfc_name
+from nxapi_normalize import vlan_rows
+
+
+def main(switch, *intfcs):
+    """
+    :param switch: The switch to view VLAN information.
+    :param intfcs: The interfaces to list the VLANs of.
+
+    :prints: The VLANs each interface is a member of, or the reason for http failure.
+
+    :example:
+    (py3) C:\\Users>python nxapi_sh_intfc_vlans.py 10.1.1.1 eth1/45 eth1/47 eth2/1
+    What is your username: admin
+    What is your password
+
+    Ethernet1/45: 10 (web)
+    Ethernet1/47: 10 (web)
+    Ethernet2/1: 1 (default)
+    """
+    header = nx_login(switch)
+
+    sw_vlans = NxL2(header, switch)
+    sh_vlans = sw_vlans.sh_vlan(brief=True)
+    if sh_vlans.ok:
+        vlans = vlan_table(sh_vlans)
+        for intfc in intfcs:
+            print("{}: {}".format(intfc_name(intfc), ", ".join(
+                "{} ({})".format(vlan, vlans.name(vlan)) for vlan in vlans.vlans_of(intfc)) or "None"))
+    else:
+        print('HTTP REQUEST FAILED:\nStatus Code: {}\nReason: {}\nContent: {}'.format(
+            sh_vlans.status_code, sh_vlans.reason, sh_vlans.content))
+
+
+def vlan_table(req):
+    """
+    This indexes the VLANs returned from the VLAN request by both VLAN
+    and interface.
+
+    :param req: The results of an API request for "show vlan" or
+    "show vlan brief"
+
+    :return: A nxapi_vlan.VlanTable.
+    """
+    return VlanTable.from_rows(vlan_rows(req.json()))
+
+
+if __name__ == '__main__':
+    main(argv[1], *argv[2:])
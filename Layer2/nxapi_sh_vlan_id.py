@@ -1,6 +1,7 @@
 from sys import argv
 from functions import nx_login
 from nxapi_class import NxL2
+from nxapi_result import VlanRow
 
 
 def main(switch, vlan):
@@ -38,29 +39,21 @@ def vlan_fltr(req, vlan):
     """
     This filters the information returned from the VLAN request to just the
     relevant information (VLAN ID, VLAN Name, and interfaces associated
-    with the VLAN). Try and except are used for the conversion to json and
-    the interfaces extraction, as the dictionary keys will not exist if they
-    do not have values, which will then raise an error.
+    with the VLAN). The first VLAN is used when the request was for a range,
+    and the interfaces are "None" when the VLAN has no interfaces.
 
-    :param req: The results of an API request for "show vlan id #"
+    :param req: The NxResult of an API request for "show vlan id #"
 
     :return: A dictionary for VLAN consisting of Name, and associated interfaces.
     """
-    try:
-        sw_vlan_json = req.json()["result"]["body"]["TABLE_vlanbriefid"]["ROW_vlanbriefid"]
-    except TypeError:
+    sw_vlan = next(req.typed(VlanRow), None)
+    if sw_vlan is None:
         print("\nVLAN {} DOES NOT EXIST".format(vlan))
         exit(1)
 
-    vlan_name = sw_vlan_json["vlanshowbr-vlanname"]
-    try:
-        vlan_int = sw_vlan_json["vlanshowplist-ifidx"]
-    except KeyError:
-        vlan_int = "None"
-
     return {
-        "name": vlan_name,
-        "interfaces": vlan_int
+        "name": sw_vlan.name,
+        "interfaces": ",".join(sw_vlan.interfaces) or "None"
     }
 
 
@@ -1,11 +1,15 @@
 from sys import argv
 from functions import nx_login
 from nxapi_class import NxL2
+from nxapi_export import open_sink
+from nxapi_normalize import VLAN_FIELDS, vlan_rows
 
 
-def main(switch):
+def main(switch, output=None):
     """
     :param switch: The switch to view VLAN information.
+    :param output: An optional csv, jsonl, xlsx, arrow or parquet
+    file to save the VLANs to, instead of printing them.
 
     :prints: The VLAN information for the switch, or the reason for http failure.
 
@@ -40,9 +44,13 @@ def main(switch):
     header = nx_login(switch)
 
     sw_vlans = NxL2(header, switch)
-    sh_vlans = sw_vlans.sh_vlan()
+    sh_vlans = sw_vlans.sh_vlan(brief=True)
     if sh_vlans.ok:
         sh_vlans_dict = vlans_fltr(sh_vlans)
+        if output is not None:
+            with open_sink(output, VLAN_FIELDS) as sink:
+                sink.write_rows(sh_vlans_dict)
+            return
         for vlan in sh_vlans_dict:
             print("\nVLAN: {}\n  Name: {}\n  {}\n".format(
                 vlan["vlan_id"], vlan["name"], vlan["interfaces"]
@@ -60,12 +68,13 @@ def vlans_fltr(req):
     dictionary key will not exist if no interfaces belong to the VLAN,
     which will then raise an error.
 
-    :param req: The results of an API request for "show vlans"
+    :param req: The results of an API request for "show vlans" or
+    "show vlan brief"
 
     :return: A list of dictionaries for each VLAN consisting of ID,
     Name, and associated interfaces.
     """
-    sw_vlans_json = req.json()["result"]["body"]["TABLE_vlanbrief"]["ROW_vlanbrief"]
+    sw_vlans_json = vlan_rows(req.json())
 
     sw_vlans_list = []
     for vlan in sw_vlans_json:
@@ -86,4 +95,4 @@ def vlans_fltr(req):
 
 
 if __name__ == '__main__':
-    main(argv[1])
+    main(*argv[1:3])
@@ -1,13 +1,18 @@
 from sys import argv
 from functions import nx_login
+from datetime import datetime
+from nxapi_export import open_sink, with_keys
 from nxapi_class import NxAaa, NxSystem
+from nxapi_normalize import VERSION_FIELDS
 
 
-def main(switch):
+def main(switch, output=None):
     """
     This program is used to print a switches version information.
 
     :param switch: The switch to issue a "show version" command.
+    :param output: An optional csv or jsonl file to add the time and
+    version information to, for collecting it over time.
 
     :prints: The switches version information, or reason for http failure.
 
@@ -29,6 +34,9 @@ def main(switch):
 
     if sw_ver.ok:
         ver_dict = sh_ver_filter(sw_ver)
+        if output is not None:
+            with open_sink(output, ("time",) + VERSION_FIELDS, append=True) as sink:
+                sink.write_rows(with_keys([ver_dict], datetime.now().isoformat(), fields=VERSION_FIELDS))
         print("\n Hostname: {}\n Model: {}\n OS: {}\n Uptime: {}\n Reload Reason: {}".format(
             ver_dict["host"], ver_dict["model"], ver_dict["os"], ver_dict["up"], ver_dict["reason"]))
     else:
@@ -78,4 +86,4 @@ def sh_ver_filter(req):
 
 
 if __name__ == '__main__':
-    main(argv[1])
+    main(*argv[1:3])
@@ -0,0 +1,61 @@
+import asyncio
+from sys import argv
+from getpass import getpass
+from nxapi_async import fleet_run
+from nxapi_sh_ver import sh_ver_filter
+
+
+def main(switch_file, concurrency=50):
+    """
+    This program is used to print the version information of many
+    switches at once. The switches are polled concurrently, and each
+    one is printed as soon as it answers.
+
+    :param switch_file: A file with one switch per line.
+    :param concurrency: The number of switches to poll at once.
+
+    :prints: Each switches version information, or the reason it failed.
+
+    :example:
+    (py3) C:\\Users>python nxapi_sh_ver_fleet.py switches.txt 100
+    What is your username: admin
+    What is your password
+
+     10.1.1.2: switch2, Nexus9000 C9396PX Chassis, 7.0(3)I5(1)
+     10.1.1.1: switch1, Nexus9000 C9396PX Chassis, 7.0(3)I5(1)
+     10.1.1.3: FAILED: Cannot connect to host 10.1.1.3:443
+
+     3 switches, 1 failed
+    """
+    with open(switch_file) as f:
+        switches = [line.strip() for line in f if line.strip()]
+
+    user = input('What is your username: ')
+    pw = getpass('What is your password ')
+
+    failed = asyncio.run(sh_ver_fleet(switches, user, pw, int(concurrency)))
+
+    print("\n {} switches, {} failed".format(len(switches), failed))
+
+
+async def sh_ver_fleet(switches, user, pw, concurrency):
+    """
+    This function prints the "show version" results as they arrive.
+
+    :return: The number of switches that failed.
+    """
+    failed = 0
+    async for done in fleet_run(switches, user, pw, 'show version', concurrency):
+        if done.ok and done.result.ok:
+            ver_dict = sh_ver_filter(done.result)
+            print(" {}: {}, {}, {}".format(done.switch, ver_dict["host"], ver_dict["model"], ver_dict["os"]))
+        else:
+            failed += 1
+            reason = done.error if done.error is not None else done.result.reason
+            print(" {}: FAILED: {}".format(done.switch, reason))
+
+    return failed
+
+
+if __name__ == '__main__':
+    main(*argv[1:3])
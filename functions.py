@@ -1,8 +1,17 @@
-from getpass import getpass
+import os
+from nxapi_auth import CookieCache
 from nxapi_class import NxAaa,NxL2,NxSystem
 
-def nx_login(switch):
+COOKIE_FILE = os.environ.get('NXAPI_COOKIE_FILE')
+
+
+def nx_login(switch, session=None):
+    """
+    This logs in to a switch for the scripts. If the NXAPI_COOKIE_FILE
+    environment variable is set, cookies are cached in that file and the
+    password is only asked for once the cached cookie has expired.
+    """
     user = input('What is your username: ')
-    pw = getpass('What is your password ')
+    cache = CookieCache(path=COOKIE_FILE) if COOKIE_FILE else None
 
-    return NxAaa(user, switch, pw).nx_login()
+    return NxAaa(user, switch, session=session, cache=cache).nx_login()
@@ -0,0 +1,269 @@
+import os
+import csv
+import sys
+import logging
+import argparse
+import multiprocessing
+from time import perf_counter, time
+from functools import partial
+from getpass import getpass
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+for folder in ("System", "Layer2", "Interfaces"):
+    sys.path.insert(0, os.path.join(HERE, folder))
+
+from nxapi_export import open_sink, with_keys
+from nxapi_class import NxAaa, NxIntfc, NxL2, NxSession, NxSystem
+from nxapi_limit import Limiter
+from nxapi_metrics import Metrics
+from nxapi_query import INDEXED, FleetIndex
+from nxapi_result import NxResult
+from nxapi_retry import CircuitBreaker
+from nxapi_store import SnapshotStore
+from nxapi_wire import decode_reply
+from nxapi_normalize import INTFC_HEADERS, VERSION_FIELDS, VLAN_FIELDS
+from nxapi_sh_ver import sh_ver_filter
+from nxapi_sh_vlans import vlans_fltr
+from nxapi_sh_intfcs import sh_intfcs_fltr
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+try:
+    import keyring
+except ImportError:
+    keyring = None
+
+# Each command maps to the request to make, the filter for its results, and
+# the report headers of the filtered records.
+COMMANDS = {
+    "version": (lambda header, switch, url, session: NxSystem(header, switch, url, session).nx_sh_ver(),
+                sh_ver_filter, VERSION_FIELDS),
+    "vlans": (lambda header, switch, url, session: NxL2(header, switch, url=url, session=session).sh_vlan(brief=True),
+              vlans_fltr, VLAN_FIELDS),
+    "intfcs": (lambda header, switch, url, session: NxIntfc(header, switch, url=url, session=session).sh_intfcs(),
+               sh_intfcs_fltr, INTFC_HEADERS),
+    "intfc-brief": (lambda header, switch, url, session: NxIntfc(header, switch, url=url, session=session)
+                    .sh_intfcs(view="brief"), partial(sh_intfcs_fltr, view="brief"), INTFC_HEADERS),
+    "intfc-errors": (lambda header, switch, url, session: NxIntfc(header, switch, url=url, session=session)
+                     .sh_intfcs(view="errors"), partial(sh_intfcs_fltr, view="errors"), INTFC_HEADERS),
+}
+
+# The switch command of each command, for the metrics of the decode and filter.
+SHOW_CMDS = {"version": "show version", "vlans": "show vlan brief", "intfcs": "show interface",
+             "intfc-brief": "show interface brief", "intfc-errors": "show interface counters errors"}
+
+
+def main(args=None):
+    """
+    This program runs one of the show filters over every switch in an
+    inventory. The switches are fetched by a pool of threads, and the
+    responses are decoded and filtered by a pool of processes, so parsing
+    large responses does not hold up the fetches.
+
+    :prints: The number of records from each switch, the reason any switch
+    failed, and the throughput of the run.
+
+    :example:
+    $ export NXAPI_USER=admin NXAPI_PASSWORD=...
+    $ python nxapi.py intfcs inventory.yaml --workers 50 --parsers 4 --output intfcs.parquet
+    10.1.1.2: 54 records
+    10.1.1.1: 54 records
+    10.1.1.3: FAILED: HTTPSConnectionPool(host='10.1.1.3', port=443): Read timed out.
+
+     3 switches, 1 failed, 108 records in 1.84 s
+     1.6 switches/s, 58.7 records/s, 0.41 MB received
+     fetch 2.91 s, parse 0.12 s (summed over workers)
+    """
+    parser = argparse.ArgumentParser(prog="nxapi", description="Run a show filter over a switch inventory.")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("inventory", help="A YAML or CSV file of switches.")
+    parser.add_argument("--workers", type=int, default=20, help="Switches to fetch at once.")
+    parser.add_argument("--parsers", type=int, default=os.cpu_count(), help="Processes to parse with.")
+    parser.add_argument("--output", help="A csv, jsonl, xlsx, arrow or parquet file for the records.")
+    parser.add_argument("--timeout", type=float, default=30, help="Seconds to wait for each switch to answer.")
+    parser.add_argument("--connect-timeout", type=float, default=10, help="Seconds to wait to connect to a switch.")
+    parser.add_argument("--retries", type=int, default=2, help="Times to resend a show command that failed.")
+    parser.add_argument("--max-in-flight", type=int, help="Requests in flight across the fleet; "
+                                                              "defaults to --workers.")
+    parser.add_argument("--per-switch", type=int, default=4, help="Most requests in flight to one switch.")
+    parser.add_argument("--rate", type=float, help="Most requests a second to one switch.")
+    parser.add_argument("--format", default="jsonrpc", choices=("jsonrpc", "json", "xml"),
+                        help="The wire format to request the command in.")
+    parser.add_argument("--store", help="A snapshot store file to archive the records in.")
+    parser.add_argument("--index", help="A fleet index file to add the intfcs or vlans records to.")
+    parser.add_argument("--metrics", help="A file to write Prometheus request metrics to.")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus request metrics on this port.")
+    parser.add_argument("--log-events", action="store_true", help="Log each request as JSON to stderr.")
+    args = parser.parse_args(args)
+
+    metrics = None
+    if args.metrics or args.metrics_port or args.log_events:
+        metrics = Metrics()
+    if args.log_events:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logging.getLogger("nxapi.metrics").addHandler(handler)
+        logging.getLogger("nxapi.metrics").setLevel(logging.INFO)
+    server = metrics.serve(args.metrics_port) if args.metrics_port else None
+
+    limiter = Limiter(args.max_in_flight or args.workers, args.per_switch, args.rate)
+    transport = {"connect_timeout": args.connect_timeout, "show_retries": args.retries, "breaker": CircuitBreaker(),
+                 "limiter": limiter, "metrics": metrics, "fmt": args.format}
+    switches = read_inventory(args.inventory)
+    user, passw = credentials()
+    headers = COMMANDS[args.command][2]
+
+    sink = open_sink(args.output, ("switch",) + tuple(headers)) if args.output else None
+    store = SnapshotStore(args.store) if args.store else None
+    taken = time()
+    index = FleetIndex(args.index) if args.index and args.command in INDEXED else None
+    stats = {"failed": 0, "records": 0, "bytes": 0, "fetch": 0.0, "parse": 0.0}
+    start = perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.workers) as fetchers, \
+            ProcessPoolExecutor(max_workers=args.parsers, mp_context=multiprocessing.get_context("spawn")) as parsers:
+        fetches = dict((fetchers.submit(fetch, args.command, switch, url, user, passw, args.timeout, **transport),
+                        switch) for switch, url in switches)
+        parses = {}
+        for done in as_completed(fetches):
+            switch = fetches[done]
+            try:
+                content, took = done.result()
+            except Exception as error:
+                stats["failed"] += 1
+                print("{}: FAILED: {}".format(switch, error))
+                continue
+            stats["fetch"] += took
+            stats["bytes"] += len(content)
+            parses[parsers.submit(parse, args.command, content, args.format)] = switch
+
+        for done in as_completed(parses):
+            switch = parses[done]
+            try:
+                records, decode, filtr = done.result()
+            except Exception as error:
+                stats["failed"] += 1
+                print("{}: FAILED: {!r}".format(switch, error))
+                continue
+            stats["parse"] += decode + filtr
+            if metrics is not None:
+                metrics.observe("decode", switch, SHOW_CMDS[args.command], decode)
+                metrics.observe("filter", switch, SHOW_CMDS[args.command], filtr)
+            stats["records"] += len(records)
+            if sink is not None:
+                sink.write_rows(with_keys(records, switch, fields=headers))
+            if store is not None:
+                store.add(switch, args.command, records, taken)
+            if index is not None:
+                index.add(switch, args.command, records)
+            print("{}: {} records".format(switch, len(records)))
+
+    if sink is not None:
+        sink.close()
+    if store is not None:
+        store.close()
+    if index is not None:
+        index.optimize()
+        index.close()
+    if args.metrics:
+        metrics.write(args.metrics)
+    if server is not None:
+        server.shutdown()
+
+    took = perf_counter() - start
+    print("\n {} switches, {} failed, {} records in {:.2f} s"
+          "\n {:.1f} switches/s, {:.1f} records/s, {:.2f} MB received"
+          "\n fetch {:.2f} s, parse {:.2f} s (summed over workers)".format(
+        len(switches), stats["failed"], stats["records"], took,
+        len(switches) / took, stats["records"] / took, stats["bytes"] / 1e6, stats["fetch"], stats["parse"]))
+
+
+def read_inventory(path):
+    """
+    This reads the switches from an inventory file. A YAML inventory is a
+    list of switches, or has them under a "switches" key; each switch is a
+    name, or a mapping with a "switch" (or "host") and an optional "url". A
+    CSV inventory has a "switch" column, and an optional "url" column.
+
+    :param path: The inventory file.
+
+    :return: A list of (switch, url) tuples; url is None unless given.
+    """
+    with open(path) as f:
+        if path.endswith((".yml", ".yaml")):
+            if yaml is None:
+                raise ImportError("PyYAML is needed to read {}".format(path))
+            entries = yaml.safe_load(f) or []
+            if isinstance(entries, dict):
+                entries = entries.get("switches", [])
+        else:
+            entries = list(csv.DictReader(f))
+
+    switches = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            switches.append((str(entry.get("switch") or entry["host"]), entry.get("url") or None))
+        else:
+            switches.append((str(entry), None))
+
+    return switches
+
+
+def credentials():
+    """
+    This returns the username and password for the run. The username is
+    taken from NXAPI_USER, and the password from NXAPI_PASSWORD, or from the
+    "nxapi" service of the system keyring; either is asked for if not found.
+    """
+    user = os.environ.get("NXAPI_USER") or input('What is your username: ')
+    passw = os.environ.get("NXAPI_PASSWORD")
+    if passw is None and keyring is not None:
+        passw = keyring.get_password("nxapi", user)
+    if passw is None:
+        passw = getpass('What is your password ')
+
+    return user, passw
+
+
+def fetch(command, switch, url, user, passw, timeout, **options):
+    """
+    This logs in to a switch and runs a command in a fetch thread.
+
+    :param options: More NxSession options, as the metrics and limiter.
+
+    :return: The response body, and the seconds it took.
+    """
+    start = perf_counter()
+    with NxSession(switch, timeout=timeout, url=url, **options) as session:
+        header = NxAaa(user, switch, passw, url=url, session=session).nx_login()
+        resp = COMMANDS[command][0](header, switch, url, session)
+        if not resp.ok:
+            raise ValueError("{} {}".format(resp.status_code, resp.reason))
+
+        return resp.content, perf_counter() - start
+
+
+def parse(command, content, fmt="jsonrpc"):
+    """
+    This decodes and filters a response body in a parser process.
+
+    :return: A list of the filtered records, and the seconds the decode
+    and the filter took.
+    """
+    start = perf_counter()
+    reply = decode_reply(content, fmt)
+    decoded = perf_counter()
+    records = COMMANDS[command][1](NxResult(reply=reply))
+    if isinstance(records, dict):
+        records = [records]
+    records = list(records)
+
+    return records, decoded - start, perf_counter() - decoded
+
+
+if __name__ == '__main__':
+    main()
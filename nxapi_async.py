@@ -0,0 +1,311 @@
+import asyncio
+import aiohttp
+from nxapi_class import req_body
+from nxapi_result import NxResult
+from nxapi_retry import NxApiError
+
+
+class NxAsyncSession:
+    """
+    This class holds an aiohttp connection pool that is shared by the
+    async wrapper classes. One session can be used for a single switch,
+    or for a whole fleet of switches.
+    """
+
+    def __init__(self, limit=100, limit_per_host=4, timeout=30, verify=False):
+        """
+        This initializes an asyncio connection pool.
+
+        :param limit: The number of connections to keep open in total.
+        :param limit_per_host: The number of connections to keep open
+        to each switch.
+        :param timeout: The number of seconds to wait for a switch
+        before giving up on a request.
+        :param verify: Whether to verify the switch certificates.
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.verify = verify
+        self.session = None
+
+    async def open(self):
+        """
+        This method opens the pool; it must be called from a running loop.
+        """
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             ssl=None if self.verify else False)
+            # Cookies are passed in the header from nx_login(), so the jar
+            # is disabled to keep one switch's cookie away from the others.
+            self.session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar(),
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+        return self
+
+    async def post(self, url, body, header, auth=None):
+        """
+        This method posts a request body over a pooled connection.
+
+        :param url: The url to post to.
+        :param body: The request body, or list of request bodies.
+        :param header: The header from AsyncNxAaa.nx_login().
+        :param auth: An optional (user, password) tuple.
+
+        :return: A NxResult with the results of the request.
+        """
+        await self.open()
+        if auth is not None:
+            auth = aiohttp.BasicAuth(*auth)
+
+        async with self.session.post(url, json=body, headers=header, auth=auth) as resp:
+            content = await resp.read()
+
+            return NxResult(status_code=resp.status, reason=resp.reason, headers=resp.headers, content=content)
+
+    async def close(self):
+        """
+        This method closes all pooled connections.
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class AsyncNxAaa:
+    """
+    This class is the asyncio version of NxAaa.
+    """
+
+    def __init__(self, user, switch, passw, session, url=None):
+        """
+        This initializes a switch login object.
+
+        :param user: The username used to login.
+        :param switch: The switch to connect to.
+        :param passw: The password for the user.
+        :param session: The NxAsyncSession to login through.
+        :param url: The url to post to; leaving to None
+        should configure the appropriate URL.
+        """
+        self.user = user
+        self.passw = passw
+        self.switch = switch
+        self.session = session
+        if url is None:
+            self.url = 'https://{}/ins'.format(switch)
+        else:
+            self.url = url
+
+    async def nx_login(self):
+        """
+        This method is used to login to the switch and
+        return a header with cookie for future interactions.
+
+        :return: A header with content type and cookie; NxApiError
+        is raised if the switch does not return a cookie.
+
+        :example:
+        >>> async with NxAsyncSession() as session:
+        ...     switch_login = await AsyncNxAaa('user', '10.1.1.1', 'pass', session).nx_login()
+        """
+        header = {"content-type": "application/json-rpc"}
+        body = req_body("show version")
+
+        resp = await self.session.post(self.url, body, header, auth=(self.user, self.passw))
+        if "Set-Cookie" not in resp.headers:
+            raise NxApiError("{} did not return a login cookie: {} {}".format(
+                self.switch, resp.status_code, resp.reason))
+        header["Cookie"] = resp.headers["Set-Cookie"]
+
+        return header
+
+
+class AsyncNxApi:
+    """
+    This is the base for the async wrapper classes, it holds the
+    switch details and posts the commands through the session.
+    """
+
+    def __init__(self, header, switch, session, url=None):
+        self.header = header
+        self.switch = switch
+        self.session = session
+        if url is None:
+            self.url = 'https://{}/ins'.format(switch)
+        else:
+            self.url = url
+
+    async def cli(self, body):
+        """
+        This method posts a request body to the switch.
+
+        :param body: The request body, or list of request bodies.
+
+        :return: A NxResult with the results of the request.
+        """
+        return await self.session.post(self.url, body, self.header)
+
+
+class AsyncNxSystem(AsyncNxApi):
+    """
+    This class is the asyncio version of NxSystem.
+    """
+
+    async def nx_sh_ver(self):
+        """
+        This method is used to collect the "show version" data.
+
+        :return: A NxResult with the switch version information.
+        """
+        return await self.cli(req_body('show version'))
+
+
+class AsyncNxL2(AsyncNxApi):
+    """
+    This class is the asyncio version of NxL2.
+    """
+
+    def __init__(self, header, switch, session, vlan=None, url=None):
+        AsyncNxApi.__init__(self, header, switch, session, url)
+        self.vlan = vlan
+
+    async def sh_vlan(self):
+        """
+        This method is used to collect the "show vlan" data.
+
+        :return: A NxResult with the switch VLAN information.
+        """
+        return await self.cli(req_body('show vlan'))
+
+    async def sh_vlan_id(self, vlan=None):
+        """
+        This method is used to collect the "show vlan" data
+        for a particular VLAN.
+
+        :param vlan: The VLAN ID to view; defaults to VLAN
+        used to initialize the object.
+
+        :return: A NxResult with the VLAN information.
+        """
+        if vlan is None:
+            vlan = self.vlan
+
+        return await self.cli(req_body("show vlan id {}".format(vlan)))
+
+    async def conf_vlan(self, name, vlan=None):
+        """
+        This method is used to create a new VLAN ID on a switch.
+
+        :param name: The name of the new VLAN
+        :param vlan: The VLAN ID to create; defaults to VLAN
+        used to initialize the object.
+
+        :return: A NxResult with the results of the configuration.
+        """
+        if vlan is None:
+            vlan = self.vlan
+
+        body = [req_body('conf t', 1), req_body('vlan {}'.format(vlan), 2),
+                req_body('name {}'.format(name), 3)]
+
+        return await self.cli(body)
+
+
+class AsyncNxIntfc(AsyncNxApi):
+    """
+    This class is the asyncio version of NxIntfc.
+    """
+
+    def __init__(self, header, switch, session, intfc=None, url=None):
+        AsyncNxApi.__init__(self, header, switch, session, url)
+        self.intfc = intfc
+
+    async def sh_intfcs(self):
+        """
+        This method is used to collect "show interface" results.
+
+        :return: A NxResult with the "show interface" information.
+        """
+        return await self.cli(req_body('show interface'))
+
+
+class FleetResult:
+    """
+    This class holds the outcome of a fleet_run() for one switch. Only
+    one of result and error is set.
+    """
+    __slots__ = ("switch", "result", "error")
+
+    def __init__(self, switch, result=None, error=None):
+        self.switch = switch
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+async def fleet_run(switches, user, passw, command, concurrency=50, session=None):
+    """
+    This function logs in and runs a command on many switches at once.
+    At most concurrency switches are worked on at the same time, and the
+    results are given back as each switch finishes. A switch that fails
+    has its error kept in the FleetResult, the other switches carry on.
+
+    :param switches: The switches to run the command on.
+    :param user: The username used to login.
+    :param passw: The password for the user.
+    :param command: A cli command such as "show version", or a coroutine
+    function called as command(header, switch, session), for example
+    lambda h, sw, s: AsyncNxIntfc(h, sw, s).sh_intfcs().
+    :param concurrency: The number of switches to work on at once.
+    :param session: An optional NxAsyncSession; one is opened for the run
+    if not given.
+
+    :return: An async generator of FleetResult, in order of completion.
+
+    :example:
+    >>> async for done in fleet_run(switches, 'admin', passw, 'show version'):
+    ...     if done.ok:
+    ...         print(done.switch, sh_ver_filter(done.result)["os"])
+    ...     else:
+    ...         print(done.switch, "FAILED:", done.error)
+    """
+    own_session = session is None
+    if own_session:
+        session = NxAsyncSession(limit=concurrency)
+    await session.open()
+
+    if isinstance(command, str):
+        cmd = command
+
+        def command(header, switch, session):
+            return AsyncNxApi(header, switch, session).cli(req_body(cmd))
+
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run(switch):
+        async with limit:
+            try:
+                header = await AsyncNxAaa(user, switch, passw, session).nx_login()
+                return FleetResult(switch, result=await command(header, switch, session))
+            except Exception as error:
+                return FleetResult(switch, error=error)
+
+    tasks = [asyncio.ensure_future(run(switch)) for switch in switches]
+    try:
+        for done in asyncio.as_completed(tasks):
+            yield await done
+    finally:
+        for task in tasks:
+            task.cancel()
+        if own_session:
+            await session.close()
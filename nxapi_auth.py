@@ -0,0 +1,131 @@
+import os
+import json
+import tempfile
+from time import time
+from threading import Lock
+
+
+class CookieCache:
+    """
+    This class is used to keep the nxapi_auth cookies from NxAaa.nx_login()
+    so they can be used again until they expire, instead of logging in to
+    the switch for every script run. Cookies are kept for each (user, switch)
+    pair, and can be saved to a file that only the owner can read.
+    """
+
+    def __init__(self, ttl=540, path=None):
+        """
+        This initializes a cookie cache.
+
+        :param ttl: The number of seconds a cookie is used for; NX-API
+        expires its cookies after 600 seconds by default.
+        :param path: The file to save the cookies to; leaving to None
+        keeps them in memory only.
+
+        :example:
+        >>> cache = CookieCache(path=os.path.expanduser('~/.nxapi_cookies'))
+        >>> switch_login = NxAaa('user', '10.1.1.1', cache=cache).nx_login()
+        """
+        self.ttl = ttl
+        self.path = path
+        self.cookies = {}
+        self.lock = Lock()
+        if path is not None:
+            self.load()
+
+    @staticmethod
+    def key(user, switch):
+        return "{}@{}".format(user, switch)
+
+    def get(self, user, switch):
+        """
+        This method looks up an unexpired cookie.
+
+        :param user: The username the cookie was issued to.
+        :param switch: The switch the cookie was issued by.
+
+        :return: The cookie, or None if there is no unexpired cookie.
+        """
+        key = self.key(user, switch)
+        with self.lock:
+            try:
+                cookie, expires = self.cookies[key]
+            except KeyError:
+                return None
+            if expires <= time():
+                del self.cookies[key]
+                return None
+
+        return cookie
+
+    def set(self, user, switch, cookie):
+        """
+        This method stores a new cookie, and saves the cache if it has a file.
+
+        :param user: The username the cookie was issued to.
+        :param switch: The switch the cookie was issued by.
+        :param cookie: The Set-Cookie value from the switch.
+        """
+        with self.lock:
+            self.cookies[self.key(user, switch)] = (cookie, time() + self.ttl)
+        self.save()
+
+    def discard(self, user, switch):
+        """
+        This method removes a cookie, for example after the switch rejected it.
+
+        :param user: The username the cookie was issued to.
+        :param switch: The switch the cookie was issued by.
+        """
+        with self.lock:
+            found = self.cookies.pop(self.key(user, switch), None)
+        if found is not None:
+            self.save()
+
+    def evict(self):
+        """
+        This method removes all expired cookies.
+        """
+        now = time()
+        with self.lock:
+            for key in [key for key, (_, expires) in self.cookies.items() if expires <= now]:
+                del self.cookies[key]
+
+    def load(self):
+        """
+        This method reads the unexpired cookies from the cache file. A
+        missing or unreadable file leaves the cache empty.
+        """
+        try:
+            with open(self.path) as f:
+                cookies = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        with self.lock:
+            for key, (cookie, expires) in cookies.items():
+                self.cookies[key] = (cookie, expires)
+        self.evict()
+
+    def save(self):
+        """
+        This method writes the unexpired cookies to the cache file. The file
+        is written with owner only permissions, and replaced in one step so
+        a script reading it never sees half a file.
+        """
+        if self.path is None:
+            return
+
+        self.evict()
+        with self.lock:
+            cookies = dict(self.cookies)
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+        try:
+            os.chmod(tmp, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(cookies, f)
+            os.replace(tmp, self.path)
+        except Exception:
+            os.unlink(tmp)
+            raise
@@ -0,0 +1,136 @@
+from time import time
+from threading import Lock
+from collections import OrderedDict
+
+# The number of seconds each read only command is cached for. A command uses
+# the entry of its longest matching prefix, so "show vlan id 10" uses the
+# "show vlan" entry. Commands that match no entry use the cache default.
+COMMAND_TTLS = {
+    "show version": 3600,
+    "show vlan": 60,
+    "show interface": 10,
+}
+
+
+class ResponseCache:
+    """
+    This class is used to keep the responses of read only show commands, so
+    tools asking for the same data within seconds do not each send it to the
+    switch. Responses are kept per (switch, command) for a time that depends
+    on the command, the least recently used are dropped once the cache is
+    full, and all of a switch's responses are dropped when it is configured.
+    """
+
+    def __init__(self, max_entries=1024, ttl=10, ttls=COMMAND_TTLS):
+        """
+        This initializes a response cache. One cache can be shared by the
+        NxSession of every switch.
+
+        :param max_entries: The number of responses to keep.
+        :param ttl: The number of seconds to keep commands not in ttls.
+        :param ttls: A dictionary of command prefixes and their seconds to keep.
+
+        :example:
+        >>> cache = ResponseCache()
+        >>> session = NxSession('10.1.1.1', cache=cache)
+        >>> NxSystem(switch_login, '10.1.1.1', session=session).nx_sh_ver()  # sent
+        >>> NxSystem(switch_login, '10.1.1.1', session=session).nx_sh_ver()  # cached
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.ttls = sorted(ttls.items(), key=lambda item: len(item[0]), reverse=True)
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cmd_ttl(self, cmd):
+        """
+        This returns the number of seconds to keep the response of a command.
+        """
+        for prefix, ttl in self.ttls:
+            if cmd.startswith(prefix):
+                return ttl
+
+        return self.ttl
+
+    def get(self, switch, cmd):
+        """
+        This method looks up an unexpired response.
+
+        :param switch: The switch the command was sent to.
+        :param cmd: The command, or a tuple of the commands of a batch.
+
+        :return: The response, or None if there is no unexpired response.
+        """
+        key = (switch, cmd)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= time():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+        return entry[0]
+
+    def set(self, switch, cmd, resp):
+        """
+        This method stores a response, dropping the least recently used
+        response if the cache is full.
+
+        :param switch: The switch the command was sent to.
+        :param cmd: The command, or a tuple of the commands of a batch; a
+        batch is kept for the shortest time of its commands.
+        :param resp: The response to keep.
+        """
+        cmds = cmd if isinstance(cmd, tuple) else (cmd,)
+        expires = time() + min(self.cmd_ttl(one) for one in cmds)
+        with self.lock:
+            self.entries[(switch, cmd)] = (resp, expires)
+            self.entries.move_to_end((switch, cmd))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, switch):
+        """
+        This method drops every response from a switch, for example after
+        its configuration was changed.
+
+        :param switch: The switch to drop the responses of.
+        """
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == switch]:
+                del self.entries[key]
+
+    def clear(self):
+        """
+        This method drops every response.
+        """
+        with self.lock:
+            self.entries.clear()
+
+
+def body_cmds(body):
+    """
+    This returns the commands in a request body.
+
+    :param body: The request body, or list of request bodies.
+
+    :return: The command, or a tuple of the commands of a list of bodies.
+    """
+    if isinstance(body, list):
+        return tuple(one["params"]["cmd"] for one in body)
+
+    return body["params"]["cmd"]
+
+
+def read_only(cmd):
+    """
+    This returns True if a command, or every command of a batch, is a show command.
+    """
+    cmds = cmd if isinstance(cmd, tuple) else (cmd,)
+
+    return all(one.lstrip().startswith("show ") for one in cmds)
@@ -1,12 +1,31 @@
 import requests
+from time import sleep
 from getpass import getpass
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+from nxapi_cache import body_cmds, read_only
+from nxapi_metrics import TimedAdapter
+from nxapi_result import NxResult
+from nxapi_retry import NxApiError, backoff_delay, server_error
+from nxapi_vlan import expand_intfcs, intfc_ranges
+from nxapi_wire import FORMATS, wire_post
 
+# The (connect, read) seconds to wait for a switch when no NxSession is used.
+TIMEOUT = (10, 30)
 
-def req_body(cmd):
+# The error message of a batch command the response has no reply for.
+NO_REPLY = "No reply for command"
+
+# The command suffix of each reduced view of "show interface".
+INTFC_VIEWS = {None: "", "brief": " brief", "errors": " counters errors"}
+
+
+def req_body(cmd, req_id=1):
     return {
         "jsonrpc": "2.0",
         "method": "cli",
-        "id": 1,
+        "id": req_id,
         "params": {
             "cmd": cmd,
             "version": 1
@@ -14,6 +33,286 @@ def req_body(cmd):
     }
 
 
+def intfc_cmds(intfcs=None, view=None, per_cmd=32):
+    """
+    This builds the narrowest "show interface" commands for a set of
+    interfaces. The interfaces are written as ranges, and split over more
+    than one command when there are more than per_cmd ranges, so each
+    command stays short enough for the switch CLI.
+
+    :param intfcs: A list, or comma separated string, of interfaces and
+    ranges in any short form; None for every interface.
+    :param view: None for every field, "brief" for "show interface brief",
+    or "errors" for "show interface counters errors".
+    :param per_cmd: The number of interfaces and ranges per command.
+
+    :return: A list of commands.
+
+    :example:
+    >>> intfc_cmds(["eth1/1-48", "po10"], "errors")
+    ['show interface Ethernet1/1-48, port-channel10 counters errors']
+    """
+    suffix = INTFC_VIEWS[view]
+    if not intfcs:
+        return ["show interface" + suffix]
+    if not isinstance(intfcs, str):
+        intfcs = ",".join(intfcs)
+
+    ranges = intfc_ranges(expand_intfcs(intfcs))
+
+    return ["show interface {}{}".format(", ".join(ranges[start:start + per_cmd]), suffix)
+            for start in range(0, len(ranges), per_cmd)]
+
+
+def cmds_body(cmds):
+    """
+    This returns the request body for one or more commands; more than one
+    is sent as a JSON-RPC batch.
+    """
+    if len(cmds) == 1:
+        return req_body(cmds[0])
+
+    return [req_body(cmd, req_id) for req_id, cmd in enumerate(cmds, 1)]
+
+
+def nx_post(url, body, header, session=None, **kwargs):
+    """
+    This function posts a request body to the NX-API. When a
+    NxSession is given the request goes through its connection
+    pool, otherwise a new connection is opened for the request.
+
+    :param url: The url to post to.
+    :param body: The request body, or list of request bodies.
+    :param header: The header from NxAaa.nx_login().
+    :param session: An optional NxSession for the switch.
+
+    :return: A NxResult with the results from the http request.
+    """
+    if session is None:
+        kwargs.setdefault('timeout', TIMEOUT)
+        return NxResult(requests.post(url, json=body, headers=header, verify=False, **kwargs), cmd=body_cmds(body))
+
+    return session.post(body, header, url, **kwargs)
+
+
+class NxSession:
+    """
+    This class holds a keep-alive connection pool for a switch.
+    Passing the same session to NxAaa, NxSystem, NxL2 and NxIntfc
+    lets every request reuse an open connection, instead of doing
+    a TCP connect and TLS handshake for each request.
+    """
+
+    def __init__(self, switch, pool_size=4, timeout=30, retries=0, backoff=0.5, url=None, verify=False,
+                 cache=None, metrics=None, fmt="jsonrpc", formats=None, compress=True, limiter=None,
+                 connect_timeout=10, show_retries=2, breaker=None):
+        """
+        This initializes a connection pool for a switch.
+
+        :param switch: The switch to connect to.
+        :param pool_size: The number of connections to keep open
+        to the switch.
+        :param timeout: The number of seconds to wait for the switch
+        to answer before giving up on a request; None waits forever.
+        :param retries: The number of times to retry a connection
+        that could not be established, for any command.
+        :param backoff: The backoff factor in seconds between retries.
+        :param url: The url to post to; leaving to None
+        should configure the appropriate URL.
+        :param verify: Whether to verify the switch certificate.
+        :param cache: An optional nxapi_cache.ResponseCache; show
+        commands are answered from it while fresh, and the switch's
+        entries are dropped whenever a config command is sent.
+        :param metrics: An optional nxapi_metrics.Metrics to record the
+        connect, TLS, wait, download and decode time and the size of
+        each request sent to the switch.
+        :param fmt: The wire format of show commands; one of
+        nxapi_wire.FORMATS. Responses are decoded back to the JSON-RPC
+        reply, so the filters work with any format but "ascii", which
+        answers with the CLI text. The login and streamed requests are
+        always sent as JSON-RPC.
+        :param formats: An optional dictionary of command prefixes and
+        the wire format of the commands that start with them, as
+        {"show interface": "json"}; the longest prefix wins.
+        :param compress: Set to False to ask the switch for uncompressed
+        responses; by default gzip or deflate is accepted, and used when
+        the switch offers it.
+        :param limiter: An optional nxapi_limit.Limiter shared by the
+        sessions of a fleet run; each request waits until the limiter
+        allows it, so the switch and the fleet are not overloaded.
+        :param connect_timeout: The number of seconds to wait for a
+        connection to the switch, so an unreachable switch fails fast;
+        None uses timeout.
+        :param show_retries: The number of times to resend a request of
+        show commands that timed out, could not connect or had a 5xx
+        error, after a jittered exponential backoff. Config commands
+        are never resent, as they may have been applied.
+        :param breaker: An optional nxapi_retry.CircuitBreaker shared by
+        the sessions of a run; while the switch's breaker is open,
+        requests raise nxapi_retry.CircuitOpenError without being sent.
+
+        :example:
+        >>> session = NxSession('10.1.1.1', pool_size=2, timeout=10)
+        >>> switch_login = NxAaa('user', '10.1.1.1', session=session).nx_login()
+        >>> switch_system = NxSystem(switch_login, '10.1.1.1', session=session)
+        >>> switch_vlan = NxL2(switch_login, '10.1.1.1', session=session)
+        """
+        self.switch = switch
+        self.timeout = timeout if connect_timeout is None else (connect_timeout, timeout)
+        self.backoff = backoff
+        self.show_retries = show_retries
+        self.breaker = breaker
+        self.verify = verify
+        if url is None:
+            self.url = 'https://{}/ins'.format(switch)
+        else:
+            self.url = url
+
+        if not verify:
+            requests.packages.urllib3.disable_warnings()
+
+        retry = Retry(total=None, connect=retries, read=0, redirect=0, status=0, backoff_factor=backoff)
+        adapter_cls = HTTPAdapter if metrics is None else TimedAdapter
+        adapter = adapter_cls(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.aaa = None
+        self.cache = cache
+        self.metrics = metrics
+        self.limiter = limiter
+        self.fmt = fmt
+        self.formats = sorted((formats or {}).items(), key=lambda item: -len(item[0]))
+        for wire_fmt in [fmt] + [item[1] for item in self.formats]:
+            if wire_fmt not in FORMATS:
+                raise ValueError("Unknown wire format {!r}; use one of {}".format(wire_fmt, ", ".join(FORMATS)))
+        self.session.headers["Accept-Encoding"] = "gzip, deflate" if compress else "identity"
+
+    def post(self, body, header, url=None, **kwargs):
+        """
+        This method posts a request body over a pooled connection.
+        If the switch rejects the cookie and the session was used to
+        login, the session logs in again, updates the header with the
+        new cookie and resends the request.
+
+        :param body: The request body, or list of request bodies.
+        :param header: The header from NxAaa.nx_login().
+        :param url: The url to post to; defaults to the session url.
+
+        :return: A NxResult with the results from the http request.
+        """
+        if self.cache is None or "auth" in kwargs or kwargs.get("stream"):
+            return self.send(body, header, url, **kwargs)
+
+        cmd = body_cmds(body)
+        if not read_only(cmd):
+            resp = self.send(body, header, url, **kwargs)
+            self.cache.invalidate(self.switch)
+            return resp
+
+        resp = self.cache.get(self.switch, cmd)
+        if resp is None:
+            resp = self.send(body, header, url, **kwargs)
+            if resp.ok:
+                self.cache.set(self.switch, cmd, resp)
+
+        return resp
+
+    def send(self, body, header, url=None, **kwargs):
+        """
+        This method posts a request body without using the cache.
+        """
+        if url is None:
+            url = self.url
+        kwargs.setdefault('timeout', self.timeout)
+
+        cmds = body_cmds(body)
+        post = self.session.post
+        fmt = self.wire_format(cmds) if "auth" not in kwargs and not kwargs.get("stream") else "jsonrpc"
+        if fmt != "jsonrpc":
+            post = wire_post(post, cmds, fmt)
+        if self.metrics is not None:
+            post = self.metrics.timed(post, self.switch, cmds)
+        if self.limiter is not None:
+            post = self.limiter.limited(post, self.switch, cmds)
+
+        attempts = self.show_retries + 1 if read_only(cmds) else 1
+        resp = self.attempt(post, attempts, url, json=body, headers=header, verify=self.verify, **kwargs)
+        if resp.status_code == 401 and self.aaa is not None and "auth" not in kwargs:
+            header.update(self.aaa.nx_login(refresh=True))
+            resp = self.attempt(post, attempts, url, json=body, headers=header, verify=self.verify, **kwargs)
+
+        return NxResult(resp, cmd=cmds)
+
+    def attempt(self, post, attempts, *args, **kwargs):
+        """
+        This method posts a request up to attempts times, until it gets
+        a response that is not a 5xx error, and keeps the breaker of the
+        switch up to date.
+
+        :return: The last response; the error of the last attempt is
+        raised if it did not get one.
+        """
+        for attempt in range(attempts):
+            if self.breaker is not None:
+                self.breaker.check(self.switch)
+            last = attempt + 1 == attempts
+            try:
+                resp = post(*args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if self.breaker is not None:
+                    self.breaker.failure(self.switch)
+                if last:
+                    raise
+            except BaseException:
+                # Any other error, as a broken chunked body or an error from
+                # the limiter, is not resent, but it still ends a trial
+                # request, or the breaker would stay open for good.
+                if self.breaker is not None:
+                    self.breaker.failure(self.switch)
+                raise
+            else:
+                failed = server_error(resp)
+                if self.breaker is not None:
+                    if failed:
+                        self.breaker.failure(self.switch)
+                    else:
+                        self.breaker.success(self.switch)
+                if last or not failed:
+                    return resp
+                resp.close()
+            sleep(backoff_delay(attempt, self.backoff))
+
+    def wire_format(self, cmd):
+        """
+        This returns the wire format to send a command, or a batch of
+        commands, in. Config commands are sent as JSON-RPC, and a batch
+        whose commands have different formats in the session format.
+
+        :param cmd: The command, or tuple of commands, from body_cmds().
+        """
+        if not read_only(cmd):
+            return "jsonrpc"
+
+        fmts = set()
+        for one in cmd if isinstance(cmd, tuple) else (cmd,):
+            fmts.add(next((fmt for prefix, fmt in self.formats if one.lstrip().startswith(prefix)), self.fmt))
+
+        return fmts.pop() if len(fmts) == 1 else self.fmt
+
+    def close(self):
+        """
+        This method closes all pooled connections to the switch.
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 class NxAaa:
     """
     This class is used to gather a authentication Cookie.
@@ -22,29 +321,47 @@ class NxAaa:
     each time.
     """
 
-    def __init__(self, user, switch, passw=None):
+    def __init__(self, user, switch, passw=None, url=None, session=None, cache=None):
         """
         This initializes a switch login object.
         :param user: The username used to login.
         :param passw: The password for the users;
         defaults to using getpass for security.
         :param switch: The switch to connect to.
+        :param url: The url to post to; leaving to None
+        should configure the appropriate URL.
+        :param session: An optional NxSession to login through;
+        the session will login again if the cookie is rejected.
+        :param cache: An optional nxapi_auth.CookieCache; a cached
+        cookie is used instead of logging in, and the password is
+        only asked for when there is no cached cookie.
         """
         self.user = user
+        self.switch = switch
+        self.cache = cache
 
-        if passw is None:
+        if passw is None and (cache is None or cache.get(user, switch) is None):
             self.passw = getpass('What is your password: ')
         else:
             self.passw = passw
 
-        self.switch = switch
+        if url is None:
+            self.url = 'https://{}/ins'.format(switch)
+        else:
+            self.url = url
+        self.session = session
 
-    def nx_login(self):
+    def nx_login(self, refresh=False):
         """
         This method is used to login to the switch and
         return a header with cookie for future interactions.
 
-        :return: A header with content type and cookie.
+        :param refresh: Set to True to login even if the
+        cache has a cookie for the switch.
+
+        :return: A header with content type and cookie; NxApiError
+        is raised if the switch does not return a cookie, as when the
+        login is refused.
 
         :example:
         >>> switch = NxAaa('user', '10.1.1.1')
@@ -54,18 +371,33 @@ class NxAaa:
         {'Cookie': 'nxapi_auth=user:148095010189978541', 'content-type': 'application/json-rpc'}
         """
         requests.packages.urllib3.disable_warnings()
-        url = "https://{}/ins".format(self.switch)
         header = {"content-type": "application/json-rpc"}
-        body = req_body("show version")
 
-        header["Cookie"] = requests.post(url, json=body, headers=header,
-                                         auth=(self.user, self.passw), verify=False).headers["Set-Cookie"]
+        cookie = None
+        if self.cache is not None and not refresh:
+            cookie = self.cache.get(self.user, self.switch)
+
+        if cookie is None:
+            if self.passw is None:
+                self.passw = getpass('What is your password: ')
+            body = req_body("show version")
+            resp = nx_post(self.url, body, header, self.session, auth=(self.user, self.passw))
+            if "Set-Cookie" not in resp.headers:
+                raise NxApiError("{} did not return a login cookie: {} {}".format(
+                    self.switch, resp.status_code, resp.reason))
+            cookie = resp.headers["Set-Cookie"]
+            if self.cache is not None:
+                self.cache.set(self.user, self.switch, cookie)
+
+        header["Cookie"] = cookie
+        if self.session is not None:
+            self.session.aaa = self
 
         return header
 
 
 class NxSystem:
-    def __init__(self, header, switch, url=None):
+    def __init__(self, header, switch, url=None, session=None):
         """
         This initializes a NX-OS object for interacting
         with the system parameters.
@@ -74,6 +406,8 @@ class NxSystem:
         :param switch: The switch to interact with.
         :param url: The url to post to; leaving to None
         should configure the appropriate URL.
+        :param session: An optional NxSession shared with the
+        other objects for this switch.
         """
         self.header = header
         self.switch = switch
@@ -81,6 +415,7 @@ class NxSystem:
             self.url = 'https://{}/ins'.format(switch)
         else:
             self.url = url
+        self.session = session
 
     def nx_sh_ver(self):
         """
@@ -125,11 +460,11 @@ class NxSystem:
         """
         body = req_body('show version')
 
-        return requests.post(self.url, json=body, headers=self.header, verify=False)
+        return nx_post(self.url, body, self.header, self.session)
 
 
 class NxL2:
-    def __init__(self, header, switch, vlan=None, url=None):
+    def __init__(self, header, switch, vlan=None, url=None, session=None):
         """
         This initializes a NX-OS object for interacting with
         Layer 2 parameters.
@@ -140,6 +475,8 @@ class NxL2:
         with a particular VLAN.
         :param url: The url to post to; leaving to None
         should configure the appropriate URL.
+        :param session: An optional NxSession shared with the
+        other objects for this switch.
         """
         self.header = header
         self.switch = switch
@@ -148,11 +485,16 @@ class NxL2:
             self.url = 'https://{}/ins'.format(switch)
         else:
             self.url = url
+        self.session = session
 
-    def sh_vlan(self):
+    def sh_vlan(self, brief=False):
         """
         This method is used to collect the "show vlan" data.
 
+        :param brief: Set to True to collect "show vlan brief", which
+        leaves out the MTU table; its rows are in TABLE_vlanbriefxbrief,
+        see nxapi_normalize.vlan_rows().
+
         :return: This returns the results from a http request
         to collect switch VLAN information.
 
@@ -221,9 +563,9 @@ class NxL2:
             }
         }}}
         """
-        body = req_body('show vlan')
+        body = req_body('show vlan brief' if brief else 'show vlan')
 
-        return requests.post(self.url, json=body, headers=self.header, verify=False)
+        return nx_post(self.url, body, self.header, self.session)
 
     def sh_vlan_id(self, vlan=None):
         """
@@ -270,7 +612,7 @@ class NxL2:
 
         body = req_body("show vlan id {}".format(vlan))
 
-        return requests.post(self.url, json=body, headers=self.header, verify=False)
+        return nx_post(self.url, body, self.header, self.session)
 
     def conf_vlan(self, name, vlan=None):
         """
@@ -296,14 +638,14 @@ class NxL2:
         if vlan is None:
             vlan = self.vlan
 
-        body = [req_body('conf t'), req_body('vlan {}'.format(vlan)),
-                req_body('name {}'.format(name))]
+        body = [req_body('conf t', 1), req_body('vlan {}'.format(vlan), 2),
+                req_body('name {}'.format(name), 3)]
 
-        return requests.post(self.url, json=body, headers=self.header, verify=False)
+        return nx_post(self.url, body, self.header, self.session)
 
 
 class NxIntfc:
-    def __init__(self, header, switch, intfc=None, url=None):
+    def __init__(self, header, switch, intfc=None, url=None, session=None):
         """
         This initializes a NX-OS object for interacting with interfaces.
 
@@ -312,6 +654,8 @@ class NxIntfc:
         :param intfc: The particular interface to interact with.
         :param url: The url to post to; leaving to None should
         configure the appropriate URL.
+        :param session: An optional NxSession shared with the
+        other objects for this switch.
         """
         self.header = header
         self.switch = switch
@@ -320,11 +664,23 @@ class NxIntfc:
             self.url = 'https://{}/ins'.format(switch)
         else:
             self.url = url
+        self.session = session
 
-    def sh_intfcs(self):
+    def sh_intfcs(self, stream=False, intfcs=None, view=None):
         """
         This method is used to collect "show interface" results.
 
+        :param stream: Set to True to leave the body unread, so it
+        can be parsed a row at a time with nxapi_stream.stream_rows()
+        instead of loading the whole response with .json().
+        :param intfcs: Only collect these interfaces, as a list or
+        comma separated string of names and ranges ("eth1/1-48").
+        :param view: "brief" or "errors" to collect the smaller
+        "show interface brief" or "show interface counters errors";
+        see intfc_cmds(). A long interface list is sent as a batch
+        of commands; nxapi_normalize.reply_rows() and stream_rows()
+        read the rows of every reply.
+
         :return: This returns the results from an http request
         to display "show interfaces."
 
@@ -374,6 +730,122 @@ class NxIntfc:
           }
         }
         """
-        body = req_body('show interface')
+        body = cmds_body(intfc_cmds(intfcs, view))
+
+        return nx_post(self.url, body, self.header, self.session, stream=stream)
+
+
+class NxBatch:
+    """
+    This class is used to send several commands to a switch in a
+    single JSON-RPC request. Each command is given a unique id, and
+    the replies are matched back to their command by that id.
+    """
+
+    def __init__(self, header, switch, url=None, session=None):
+        """
+        This initializes an empty batch of commands.
+
+        :param header: The header from NxAAA.nx_login().
+        :param switch: The switch to interact with.
+        :param url: The url to post to; leaving to None
+        should configure the appropriate URL.
+        :param session: An optional NxSession shared with the
+        other objects for this switch.
+        """
+        self.header = header
+        self.switch = switch
+        if url is None:
+            self.url = 'https://{}/ins'.format(switch)
+        else:
+            self.url = url
+        self.session = session
+        self.cmds = []
+
+    def add(self, cmd):
+        """
+        This method adds a command to the batch. A show command that
+        is already in the batch is only sent once; config commands are
+        always added, as the same "name" line can follow different
+        "vlan" lines.
+
+        :param cmd: The command to add.
+
+        :return: The JSON-RPC id of the command.
+        """
+        if cmd in self.cmds and read_only(cmd):
+            return self.cmds.index(cmd) + 1
+        self.cmds.append(cmd)
+
+        return len(self.cmds)
+
+    def body(self):
+        """
+        This method builds the JSON-RPC array for the batch.
+
+        :return: A list of request bodies with unique ids.
+        """
+        return [req_body(cmd, req_id) for req_id, cmd in enumerate(self.cmds, 1)]
+
+    def post(self, by_id=False):
+        """
+        This method posts all the commands in one request.
 
-        return requests.post(self.url, json=body, headers=self.header, verify=False)
+        :param by_id: Set to True to key the replies by JSON-RPC id
+        instead of by command, for batches that repeat a command.
+
+        :return: An ordered dictionary of each command and its NxResult.
+
+        :example:
+        >>> batch = NxBatch(switch_login, '10.1.1.1')
+        >>> batch.add('show version')
+        >>> batch.add('show vlan')
+        >>> replies = batch.post()
+        >>> sh_ver_filter(replies['show version'])['os']
+        '7.0(3)I5(1)'
+        >>> vlans_fltr(replies['show vlan'])[1]['name']
+        'web'
+        """
+        resp = nx_post(self.url, self.body(), self.header, self.session)
+        if by_id:
+            return self.replies_by_id(resp)
+
+        return self.replies(resp)
+
+    def replies(self, resp):
+        """
+        This method matches the replies in a response to their command.
+
+        :param resp: The results of posting the batch.
+
+        :return: An ordered dictionary of each command and its NxResult.
+        """
+        return OrderedDict((reply.cmd, reply) for reply in self.replies_by_id(resp).values())
+
+    def replies_by_id(self, resp):
+        """
+        This method matches the replies in a response to their JSON-RPC id.
+        A reply that is missing from the response is given an error, so
+        every command in the batch gets a NxResult.
+
+        :param resp: The results of posting the batch.
+
+        :return: An ordered dictionary of each id and its NxResult.
+        """
+        try:
+            reply_json = resp.json()
+        except ValueError:
+            reply_json = []
+        if isinstance(reply_json, dict):
+            reply_json = [reply_json]
+
+        by_id = {}
+        for reply in reply_json:
+            by_id[reply.get("id")] = reply
+
+        replies = OrderedDict()
+        for req_id, cmd in enumerate(self.cmds, 1):
+            reply = by_id.get(req_id, {"id": req_id, "error": {"message": NO_REPLY}})
+            replies[req_id] = NxResult(resp, reply, cmd)
+
+        return replies
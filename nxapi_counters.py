@@ -0,0 +1,173 @@
+import numpy as np
+from time import time
+
+COUNTERS = (
+    "vdc_lvl_in_pkts", "vdc_lvl_in_ucast", "vdc_lvl_in_mcast", "vdc_lvl_in_bcast", "vdc_lvl_in_bytes",
+    "vdc_lvl_out_pkts", "vdc_lvl_out_ucast", "vdc_lvl_out_mcast", "vdc_lvl_out_bcast", "vdc_lvl_out_bytes",
+    "eth_crc", "eth_inerr", "eth_indiscard", "eth_outerr", "eth_outdiscard", "eth_coll"
+)
+
+
+class CounterTable:
+    """
+    This class holds the counters of a "show interface" request as columns.
+    Each counter is a uint64 array with one value per interface, in the order
+    of names, so deltas and rates for every interface are computed at once
+    instead of looping over per-interface dictionaries.
+    """
+
+    def __init__(self, names, columns, timestamp=None):
+        """
+        This initializes a counter table.
+
+        :param names: The interface names, in row order. For a fleet table
+        made with concat() these are (switch, interface) tuples.
+        :param columns: A dictionary of each counter and its array of values.
+        :param timestamp: The time the counters were collected; defaults to now.
+        """
+        self.names = tuple(names)
+        self.index = dict((name, pos) for pos, name in enumerate(self.names))
+        self.columns = columns
+        self.timestamp = time() if timestamp is None else timestamp
+
+    @classmethod
+    def from_rows(cls, rows, counters=COUNTERS, timestamp=None):
+        """
+        This builds a counter table from "show interface" rows. NX-API gives
+        some counters as strings and some as ints, and leaves out counters an
+        interface does not have; all are stored as ints, with missing as 0.
+
+        :param rows: The ROW_interface value of a "show interface" request,
+        or any iterable of rows.
+        :param counters: The counters to keep.
+        :param timestamp: The time the counters were collected; defaults to now.
+
+        :return: A CounterTable.
+
+        :example:
+        >>> rows = req.json()['result']['body']['TABLE_interface']['ROW_interface']
+        >>> before = CounterTable.from_rows(rows)
+        >>> ... 30 seconds later ...
+        >>> after = CounterTable.from_rows(rows_later)
+        >>> crc_rate = after.rates(before)['eth_crc']
+        >>> after.names[crc_rate.argmax()]
+        'Ethernet1/47'
+        """
+        if timestamp is None:
+            timestamp = time()
+        if isinstance(rows, dict):
+            rows = [rows]
+
+        names = []
+        values = [[] for _ in counters]
+        for row in rows:
+            names.append(row["interface"])
+            get = row.get
+            for column, counter in zip(values, counters):
+                column.append(int(get(counter, 0)))
+
+        columns = dict((counter, np.array(column, dtype=np.uint64)) for counter, column in zip(counters, values))
+
+        return cls(names, columns, timestamp)
+
+    @classmethod
+    def concat(cls, tables):
+        """
+        This joins the tables of many switches into one fleet table, so the
+        deltas and rates for the whole fleet are computed in one step.
+
+        :param tables: A dictionary of each switch and its CounterTable.
+
+        :return: A CounterTable named by (switch, interface), with the
+        oldest timestamp of the tables.
+        """
+        names = [(switch, name) for switch, table in tables.items() for name in table.names]
+        counters = next(iter(tables.values())).columns if tables else {}
+        columns = dict((counter, np.concatenate([table.columns[counter] for table in tables.values()]))
+                       for counter in counters)
+        timestamp = min(table.timestamp for table in tables.values()) if tables else None
+
+        return cls(names, columns, timestamp)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, counter):
+        return self.columns[counter]
+
+    def row(self, name):
+        """
+        This returns the counters of one interface.
+
+        :param name: The interface name.
+
+        :return: A dictionary of each counter and its value.
+        """
+        pos = self.index[name]
+
+        return dict((counter, int(column[pos])) for counter, column in self.columns.items())
+
+    def align(self, other):
+        """
+        This finds the rows of other that match the interfaces of this table.
+
+        :param other: Another CounterTable.
+
+        :return: An array of positions in other, and a boolean array of the
+        interfaces of this table that other has. When both tables have the
+        same interfaces in the same order no lookup is done.
+        """
+        if other.names == self.names:
+            return slice(None), np.ones(len(self), dtype=bool)
+
+        found = np.fromiter((name in other.index for name in self.names), dtype=bool, count=len(self))
+        positions = np.fromiter((other.index.get(name, 0) for name in self.names), dtype=np.intp, count=len(self))
+
+        return positions, found
+
+    def delta(self, prev, wrap=None, cleared=False):
+        """
+        This computes how much each counter changed since a previous table.
+        A counter that wrapped past its maximum still gives the right delta;
+        64 bit counters wrap by themselves in uint64, and 32 bit counters are
+        handled by passing wrap=2 ** 32. Interfaces that are not in prev, such
+        as a new sub-interface, get a delta of 0.
+
+        :param prev: The CounterTable from the previous poll.
+        :param wrap: The counter width as a modulus; None for 64 bit counters.
+        :param cleared: Set to True to take a counter that went down as
+        cleared, so its delta is its new value instead of a wrap.
+
+        :return: A CounterTable of the deltas, with the elapsed seconds as
+        its timestamp.
+        """
+        positions, found = self.align(prev)
+        columns = {}
+        with np.errstate(over="ignore"):
+            for counter, column in self.columns.items():
+                before = prev.columns[counter][positions]
+                diff = column - before
+                if wrap is not None:
+                    diff %= np.uint64(wrap)
+                if cleared:
+                    down = column < before
+                    diff[down] = column[down]
+                diff[~found] = 0
+                columns[counter] = diff
+
+        return CounterTable(self.names, columns, self.timestamp - prev.timestamp)
+
+    def rates(self, prev, wrap=None, cleared=False):
+        """
+        This computes the per second rate of each counter since a previous table.
+
+        :param prev: The CounterTable from the previous poll.
+        :param wrap: The counter width as a modulus; None for 64 bit counters.
+        :param cleared: See delta().
+
+        :return: A dictionary of each counter and a float64 array of its rate.
+        """
+        delta = self.delta(prev, wrap, cleared)
+        elapsed = delta.timestamp if delta.timestamp > 0 else 1.0
+
+        return dict((counter, column / elapsed) for counter, column in delta.columns.items())
@@ -0,0 +1,418 @@
+import os
+import re
+import csv
+import json
+import xlsxwriter
+from time import time
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+# The type of each report column that is not a string, for the columnar
+# sinks. NX-API gives most of these as strings of digits.
+COLUMN_TYPES = {
+    "MTU": "int", "BWIDTH": "int", "DELAY": "int", "TX LOAD": "int", "RX LOAD": "int",
+    "RELIABILITY": "int", "LOAD INTERVAL": "int", "CRC": "int", "RX ERRORS": "int",
+    "RX DISCARDS": "int", "TX ERRORS": "int", "TX DISCARDS": "int", "vlan_id": "int",
+}
+
+# The values that stand for a missing value, and are written as null.
+MISSING = (None, "N/A")
+
+
+class XlsxExporter:
+    """
+    This class writes rows to a xlsx workbook as they are produced. The
+    workbook is opened in xlsxwriter's constant memory mode, so each row
+    is written to disk once the next row starts, and memory does not grow
+    with the number of rows. A workbook can hold one sheet per switch.
+    """
+
+    def __init__(self, path):
+        """
+        This initializes a workbook.
+
+        :param path: The xlsx file to write.
+
+        :example:
+        >>> with XlsxExporter('fleet.xlsx') as export:
+        ...     for switch in switches:
+        ...         sheet = export.add_sheet(switch, INTFC_HEADERS)
+        ...         sheet.write_rows(sh_intfcs_stream(NxIntfc(header, switch).sh_intfcs(stream=True)))
+        """
+        self.path = path
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        self.bold = self.workbook.add_format({'bold': True})
+        self.sheets = {}
+
+    def add_sheet(self, name, headers):
+        """
+        This method adds a sheet with a bold, frozen header row.
+
+        :param name: The sheet name, such as the switch name. Characters
+        xlsx does not allow are replaced, and it is cut to 31 characters.
+        xlsx sheet names ignore case, so a name that is already taken, as
+        for a switch listed twice or two long names that are the same once
+        cut, gets a suffix such as "~2".
+        :param headers: The column headers.
+
+        :return: A XlsxSheet to write the rows to.
+        """
+        base = SHEET_CHARS.sub("_", str(name))
+        name = base[:31]
+        taken = set(sheet.lower() for sheet in self.sheets)
+        count = 1
+        while name.lower() in taken:
+            count += 1
+            suffix = "~{}".format(count)
+            name = base[:31 - len(suffix)] + suffix
+
+        self.sheets[name] = XlsxSheet(self.workbook.add_worksheet(name), headers, self.bold)
+
+        return self.sheets[name]
+
+    def close(self):
+        """
+        This method finishes writing the workbook.
+        """
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class XlsxSheet:
+    """
+    This class holds the position of the next row of a sheet.
+    """
+
+    def __init__(self, worksheet, headers, bold):
+        self.worksheet = worksheet
+        self.worksheet.write_row(0, 0, headers, bold)
+        self.worksheet.freeze_panes(1, 0)
+        self.row = 1
+
+    def write(self, values):
+        """
+        This method writes one row after the last one written.
+
+        :param values: The values of the row, in header order.
+        """
+        self.worksheet.write_row(self.row, 0, values)
+        self.row += 1
+
+    def write_rows(self, rows):
+        """
+        This method writes rows as they are taken from an iterable.
+
+        :param rows: An iterable of rows, such as a generator of IntfcRecord.
+
+        :return: The number of rows written.
+        """
+        start = self.row
+        for values in rows:
+            self.write(values)
+
+        return self.row - start
+
+
+class Sink:
+    """
+    This is the base for the report sinks. A sink is opened with the column
+    headers, and written to a row at a time, so rows can come straight from
+    a streaming normalizer. A row is a sequence in header order, such as an
+    IntfcRecord, or a dictionary keyed by header, such as the dictionaries
+    from vlans_fltr and sh_ver_filter.
+    """
+
+    def __init__(self, path, headers, append=False, types=None):
+        """
+        This initializes a sink.
+
+        :param path: The file to write.
+        :param headers: The column headers.
+        :param append: Set to True to add to an existing file, for
+        collecting a time series, instead of replacing it.
+        :param types: A dictionary of header and "int" or "float", for the
+        columns that are not strings; defaults to COLUMN_TYPES. Only the
+        columnar sinks use it.
+        """
+        self.path = path
+        self.headers = tuple(headers)
+        self.append = append
+        self.types = COLUMN_TYPES if types is None else types
+        self.rows = 0
+
+    def values(self, row):
+        if isinstance(row, dict):
+            return [row.get(header) for header in self.headers]
+        return row
+
+    def write(self, row):
+        """
+        This method writes one row.
+
+        :param row: A sequence in header order, or a dictionary keyed by header.
+        """
+        raise NotImplementedError
+
+    def write_rows(self, rows):
+        """
+        This method writes rows as they are taken from an iterable.
+
+        :param rows: An iterable of rows.
+
+        :return: The number of rows written.
+        """
+        start = self.rows
+        for row in rows:
+            self.write(row)
+
+        return self.rows - start
+
+    def close(self):
+        """
+        This method finishes writing the file.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvSink(Sink):
+    """
+    This sink writes comma separated values. In append mode the header row
+    is only written if the file is new or empty.
+    """
+
+    def __init__(self, path, headers, append=False, types=None):
+        Sink.__init__(self, path, headers, append, types)
+        new = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a" if append else "w", newline="")
+        self.writer = csv.writer(self.file)
+        if new:
+            self.writer.writerow(self.headers)
+
+    def write(self, row):
+        self.writer.writerow(self.values(row))
+        self.rows += 1
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlSink(Sink):
+    """
+    This sink writes one JSON object per line, keyed by header.
+    """
+
+    def __init__(self, path, headers, append=False, types=None):
+        Sink.__init__(self, path, headers, append, types)
+        self.file = open(path, "a" if append else "w")
+        self.encode = json.JSONEncoder(separators=(",", ":")).encode
+
+    def write(self, row):
+        if not isinstance(row, dict):
+            row = dict(zip(self.headers, row))
+        self.file.write(self.encode(row))
+        self.file.write("\n")
+        self.rows += 1
+
+    def close(self):
+        self.file.close()
+
+
+class XlsxSink(Sink):
+    """
+    This sink writes a single sheet xlsx workbook with XlsxExporter. A xlsx
+    file can not be added to, so append mode is not supported.
+    """
+
+    def __init__(self, path, headers, append=False, types=None, sheet="Sheet1"):
+        if append:
+            raise ValueError("xlsx files can not be appended to: {}".format(path))
+        Sink.__init__(self, path, headers, types=types)
+        self.export = XlsxExporter(path)
+        self.sheet = self.export.add_sheet(sheet, self.headers)
+
+    def write(self, row):
+        self.sheet.write(self.values(row))
+        self.rows += 1
+
+    def close(self):
+        self.export.close()
+
+
+class ArrowSink(Sink):
+    """
+    This sink writes columnar Apache Arrow IPC, or Parquet with
+    ParquetSink. Rows are gathered into record batches of batch_size rows,
+    so memory stays bounded. The schema is declared from the headers and
+    types before any row is written: a column is int64 or float64 if its
+    type says so, and a string otherwise, so every part file of a report
+    has the same schema. None and "N/A" are written as null, and any other
+    value that does not fit its column raises ValueError.
+
+    Neither format can be added to, so in append mode path is a directory,
+    and each sink writes a new part file named by the time it was opened.
+    """
+    suffix = ".arrow"
+
+    def __init__(self, path, headers, append=False, types=None, batch_size=65536):
+        if pyarrow is None:
+            raise ImportError("pyarrow is needed to write {} files".format(self.suffix))
+        Sink.__init__(self, path, headers, append, types)
+        if append:
+            os.makedirs(path, exist_ok=True)
+            self.path = os.path.join(path, "part-{:.6f}{}".format(time(), self.suffix))
+        self.batch_size = batch_size
+        self.batch = []
+        self.schema = pyarrow.schema([(header, arrow_type(self.types.get(header))) for header in self.headers])
+        self.writer = None
+
+    def write(self, row):
+        self.batch.append(self.values(row))
+        self.rows += 1
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        This method writes the gathered rows as one record batch.
+        """
+        if not self.batch:
+            return
+
+        columns = list(zip(*self.batch))
+        self.batch = []
+        if len(columns) != len(self.headers):
+            raise ValueError("{} has {} columns, but the rows have {}".format(self.path, len(self.headers),
+                                                                             len(columns)))
+        if self.writer is None:
+            self.writer = self.open_writer()
+
+        arrays = [pyarrow.array(convert(column, field), type=field.type)
+                  for column, field in zip(columns, self.schema)]
+        self.writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def open_writer(self):
+        return pyarrow.ipc.new_file(self.path, self.schema)
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ParquetSink(ArrowSink):
+    """
+    This sink writes Parquet; see ArrowSink.
+    """
+    suffix = ".parquet"
+
+    def open_writer(self):
+        return pyarrow.parquet.ParquetWriter(self.path, self.schema)
+
+
+def arrow_type(name):
+    if name is None or name == "string":
+        return pyarrow.string()
+    if name == "int":
+        return pyarrow.int64()
+    if name == "float":
+        return pyarrow.float64()
+
+    raise ValueError("Unknown column type {}, use int, float or string".format(name))
+
+
+def convert(column, field):
+    if field.type == pyarrow.string():
+        return [None if value is None else str(value) for value in column]
+
+    number = int if field.type == pyarrow.int64() else float
+    values = []
+    for value in column:
+        if value in MISSING:
+            values.append(None)
+            continue
+        try:
+            if isinstance(value, bool) or (number is int and isinstance(value, float)):
+                raise ValueError
+            values.append(number(value))
+        except (TypeError, ValueError):
+            raise ValueError("Column {} is {}, but has {!r}".format(field.name, field.type, value))
+
+    return values
+
+
+SINKS = {
+    "csv": CsvSink,
+    "jsonl": JsonlSink,
+    "xlsx": XlsxSink,
+    "arrow": ArrowSink,
+    "parquet": ParquetSink,
+}
+
+
+def open_sink(path, headers, fmt=None, append=False, types=None):
+    """
+    This opens the sink for a report format.
+
+    :param path: The file to write.
+    :param headers: The column headers.
+    :param fmt: One of csv, jsonl, xlsx, arrow or parquet; defaults
+    to the extension of path.
+    :param append: Set to True to add to an existing report.
+    :param types: The types of the columns that are not strings; see Sink.
+
+    :return: A Sink.
+
+    :example:
+    >>> with open_sink('vlans.csv', VLAN_FIELDS) as sink:
+    ...     sink.write_rows(vlans_fltr(sh_vlans))
+    3
+    >>> with open_sink('intfcs', ('switch', 'time') + INTFC_FIELDS, 'parquet', append=True) as sink:
+    ...     sink.write_rows(with_keys(sh_intfcs_stream(req), switch, time()))
+    54
+    """
+    if fmt is None:
+        fmt = os.path.splitext(path)[1].lstrip(".")
+    try:
+        sink = SINKS[fmt.lower()]
+    except KeyError:
+        raise ValueError("Unknown report format {}, use one of {}".format(fmt, ", ".join(SINKS)))
+
+    return sink(path, headers, append=append, types=types)
+
+
+def with_keys(rows, *keys, fields=None):
+    """
+    This puts key values such as the switch and time in front of each row,
+    for collecting many switches or polls in one report.
+
+    :param rows: An iterable of sequences, or of dictionaries.
+    :param keys: The values to put in front.
+    :param fields: The fields of dictionary rows, in column order, such as
+    VLAN_FIELDS; each value is looked up by its field, so the order of the
+    dictionary does not matter.
+
+    :return: A generator of tuples.
+    """
+    for row in rows:
+        if isinstance(row, dict):
+            if fields is None:
+                raise ValueError("fields is needed to put keys in front of dictionary rows")
+            row = [row.get(field) for field in fields]
+        yield keys + tuple(row)
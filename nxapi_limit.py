@@ -0,0 +1,233 @@
+import threading
+from time import monotonic, sleep
+from requests.exceptions import ConnectionError, Timeout
+from nxapi_metrics import command_label
+from nxapi_retry import server_error
+
+
+class TokenBucket:
+    """
+    This class spaces requests to rate a second on average, while letting
+    up to burst through at once after a quiet spell.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: The requests a second to allow on average.
+        :param burst: The requests to allow at once; defaults to one
+        second of the rate, and at least one.
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.tokens = self.burst
+        self.stamp = monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        This takes a token, borrowing it from the future if the bucket is
+        empty, so waiting callers are served in the order they asked.
+
+        :return: The seconds to wait before using the token.
+        """
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= 1
+
+            return max(-self.tokens / self.rate, 0.0)
+
+    def acquire(self):
+        """
+        This waits for a token.
+        """
+        wait = self.reserve()
+        if wait:
+            sleep(wait)
+
+
+class AimdLimit:
+    """
+    This class is the concurrency limit of one switch, adjusted from the
+    responses as TCP adjusts its window: each response that comes back
+    within tolerance times the usual latency of its command adds about one
+    to the limit per round of requests, and a slow response, a timeout or
+    a 5xx error cuts the limit by the backoff factor. Only one cut is made
+    per round, so the requests that were already in flight when the switch
+    slowed down do not cut the limit again.
+    """
+
+    def __init__(self, initial=1, minimum=1, maximum=4, tolerance=2.0, backoff=0.5):
+        """
+        :param initial: The limit to start from.
+        :param minimum: The lowest the limit is cut to.
+        :param maximum: The highest the limit grows to.
+        :param tolerance: How many times the usual latency a response may
+        take before the switch is taken to be overloaded.
+        :param backoff: The factor the limit is cut by.
+        """
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.baselines = {}
+        self.cut_at = 0.0
+
+    def update(self, cmd, started, latency, failed):
+        """
+        This adjusts the limit from one response.
+
+        :param cmd: The command label of the request; each command family
+        has its own usual latency, as "show interface" takes far longer
+        than "show version".
+        :param started: The monotonic time the request was sent.
+        :param latency: The seconds the request took.
+        :param failed: True if the request timed out or had a 5xx error.
+        """
+        baseline = self.baselines.get(cmd)
+        slow = baseline is not None and latency > baseline * self.tolerance
+        if not failed:
+            if baseline is None or latency < baseline:
+                self.baselines[cmd] = latency
+            elif not slow:
+                self.baselines[cmd] = baseline + (latency - baseline) * 0.01
+
+        if failed or slow:
+            if started >= self.cut_at:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                self.cut_at = monotonic()
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+
+class SwitchLimit:
+    """
+    This holds the token bucket, concurrency limit and requests in flight
+    of one switch.
+    """
+
+    def __init__(self, bucket, limit):
+        self.bucket = bucket
+        self.limit = limit
+        self.in_flight = 0
+
+    @property
+    def allowed(self):
+        return max(int(self.limit.limit), 1)
+
+
+class Limiter:
+    """
+    This class schedules the requests of many NxSessions, so a fleet run
+    goes as fast as the switches can answer without piling onto any one
+    supervisor. Each switch has a token bucket for its request rate and an
+    AimdLimit for its requests in flight, and the fleet has a cap on its
+    total requests in flight; a request waits until all three allow it.
+    Share one Limiter across every NxSession of a run.
+
+    :example:
+    >>> limiter = Limiter(max_in_flight=50, per_switch=4, rate=5)
+    >>> with NxSession('10.1.1.1', limiter=limiter) as session:
+    ...     switch_login = NxAaa('user', '10.1.1.1', session=session).nx_login()
+    """
+
+    def __init__(self, max_in_flight=64, per_switch=4, rate=None, burst=None, initial=1, tolerance=2.0,
+                 backoff=0.5):
+        """
+        :param max_in_flight: The most requests in flight across the fleet.
+        :param per_switch: The most requests in flight to one switch.
+        :param rate: The most requests a second to one switch; None for
+        no rate limit.
+        :param burst: The requests a switch may get at once under the rate.
+        :param initial: The requests in flight a switch starts with.
+        :param tolerance: See AimdLimit.
+        :param backoff: See AimdLimit.
+        """
+        self.max_in_flight = max_in_flight
+        self.per_switch = per_switch
+        self.rate = rate
+        self.burst = burst
+        self.initial = min(initial, per_switch)
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self.switches = {}
+        self.cond = threading.Condition()
+
+    def switch(self, switch):
+        """
+        This returns the SwitchLimit of a switch, making it the first time.
+        """
+        with self.cond:
+            if switch not in self.switches:
+                bucket = TokenBucket(self.rate, self.burst) if self.rate else None
+                limit = AimdLimit(self.initial, 1, self.per_switch, self.tolerance, self.backoff)
+                self.switches[switch] = SwitchLimit(bucket, limit)
+
+            return self.switches[switch]
+
+    def acquire(self, switch):
+        """
+        This waits until a request to a switch is allowed, and counts it
+        as in flight.
+
+        :return: The SwitchLimit, to pass to release().
+        """
+        limit = self.switch(switch)
+        if limit.bucket is not None:
+            limit.bucket.acquire()
+
+        with self.cond:
+            while self.in_flight >= self.max_in_flight or limit.in_flight >= limit.allowed:
+                self.cond.wait()
+            self.in_flight += 1
+            limit.in_flight += 1
+
+        return limit
+
+    def release(self, limit, cmd, started, failed):
+        """
+        This counts a request as finished, and adjusts the limit of its
+        switch from how it went.
+        """
+        with self.cond:
+            self.in_flight -= 1
+            limit.in_flight -= 1
+            limit.limit.update(command_label(cmd), started, monotonic() - started, failed)
+            self.cond.notify_all()
+
+    def limited(self, post, switch, cmd):
+        """
+        This wraps a requests post function so the request is scheduled.
+        A timeout, a failed connection or a 5xx error cuts the switch's
+        limit; see nxapi_retry.server_error().
+
+        :param post: The post function, as requests.Session.post.
+
+        :return: A function called as post is.
+        """
+        def limited_post(*args, **kwargs):
+            limit = self.acquire(switch)
+            started = monotonic()
+            failed = False
+            try:
+                resp = post(*args, **kwargs)
+                failed = server_error(resp)
+                return resp
+            except (ConnectionError, Timeout):
+                failed = True
+                raise
+            finally:
+                self.release(limit, cmd, started, failed)
+
+        return limited_post
+
+    def limits(self):
+        """
+        :return: A dictionary of each switch and its current limit of
+        requests in flight.
+        """
+        with self.cond:
+            return dict((switch, limit.allowed) for switch, limit in self.switches.items())
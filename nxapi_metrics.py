@@ -0,0 +1,331 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from nxapi_cache import read_only
+
+LOG = logging.getLogger("nxapi.metrics")
+
+# The phases of a request, in seconds: the TCP connect and TLS handshake of a
+# new connection, the wait for the switch to answer, reading the body, and the
+# decode and filter of the body by the caller. The connect includes the DNS
+# lookup of the switch name, as urllib3 resolves and connects in one call;
+# use addresses in the inventory to time the connect alone.
+PHASES = ("connect", "tls", "ttfb", "download", "decode", "filter")
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+# The show command families, longest first, so "show vlan id 10" is
+# "show vlan id" and not "show vlan".
+COMMAND_FAMILIES = tuple(family.split() for family in (
+    "show interface counters errors", "show interface brief", "show interface",
+    "show vlan brief", "show vlan id", "show vlan", "show version",
+))
+
+# The connect and TLS times of the last connection made by each thread; the
+# request that made the connection picks them up when it returns.
+CONNECTS = threading.local()
+
+
+class Histogram:
+    """
+    This class counts observations into fixed buckets, as a Prometheus
+    histogram does.
+    """
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        :return: A list of (upper bound, count) tuples, ending with "+Inf".
+        """
+        total = 0
+        bounds = []
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            bounds.append((bound, total))
+
+        return bounds
+
+
+class Metrics:
+    """
+    This class records how long each phase of a request took, and how big
+    the response was, per switch and command. The timings are kept as
+    histograms for Prometheus, and each request is also logged as one JSON
+    event to the "nxapi.metrics" logger when it is enabled for INFO.
+    Nothing is recorded by a NxSession without a Metrics.
+    """
+
+    def __init__(self, time_buckets=TIME_BUCKETS, size_buckets=SIZE_BUCKETS):
+        """
+        :param time_buckets: The upper bounds of the seconds histograms.
+        :param size_buckets: The upper bounds of the bytes histogram.
+        """
+        self.time_buckets = tuple(time_buckets)
+        self.size_buckets = tuple(size_buckets)
+        self.times = {}
+        self.sizes = {}
+        self.lock = threading.Lock()
+
+    def observe(self, phase, switch, cmd, seconds):
+        """
+        This records the seconds a phase took.
+        """
+        key = (switch, command_label(cmd), phase)
+        with self.lock:
+            if key not in self.times:
+                self.times[key] = Histogram(self.time_buckets)
+            self.times[key].observe(seconds)
+
+    def observe_size(self, switch, cmd, size):
+        """
+        This records the bytes of a response body.
+        """
+        key = (switch, command_label(cmd))
+        with self.lock:
+            if key not in self.sizes:
+                self.sizes[key] = Histogram(self.size_buckets)
+            self.sizes[key].observe(size)
+
+    def record(self, switch, cmd, phases, size=None, **fields):
+        """
+        This records the phases of one request, and logs them as an event.
+
+        :param phases: A dictionary of each phase and its seconds; phases
+        that are None did not happen, as the connect of a pooled connection.
+        :param size: The bytes of the response body, if known.
+        :param fields: More fields for the log event, as the status code.
+        """
+        for phase, seconds in phases.items():
+            if seconds is not None:
+                self.observe(phase, switch, cmd, seconds)
+        if size is not None:
+            self.observe_size(switch, cmd, size)
+
+        if LOG.isEnabledFor(logging.INFO):
+            event = {"event": "nxapi_request", "switch": switch, "cmd": command_label(cmd), "bytes": size}
+            event.update((phase, seconds) for phase, seconds in phases.items() if seconds is not None)
+            event.update(fields)
+            LOG.info(json.dumps(event))
+
+    @contextmanager
+    def timer(self, phase, switch, cmd):
+        """
+        This times the block it wraps as a phase, as the filter of a response.
+
+        :example:
+        >>> with metrics.timer("filter", '10.1.1.1', 'show interface'):
+        ...     records = sh_intfcs_fltr(sh_intfcs)
+        """
+        start = perf_counter()
+        yield
+        self.observe(phase, switch, cmd, perf_counter() - start)
+
+    def timed(self, post, switch, cmd):
+        """
+        This wraps a requests post function so the request is recorded. The
+        time to the response headers, less any connect and TLS handshake,
+        is the ttfb; reading the rest of the body is the download. The json()
+        method of the response is wrapped to record the decode.
+
+        :param post: The post function, as requests.Session.post.
+
+        :return: A function called as post is.
+        """
+        def timed_post(*args, **kwargs):
+            CONNECTS.connect = CONNECTS.tls = None
+            start = perf_counter()
+            resp = post(*args, **kwargs)
+            took = perf_counter() - start
+
+            connect, tls = CONNECTS.connect, CONNECTS.tls
+            wait = resp.elapsed.total_seconds()
+            phases = {"connect": connect, "tls": tls, "ttfb": max(wait - (connect or 0) - (tls or 0), 0.0)}
+            if kwargs.get("stream"):
+                size = int(resp.headers.get("Content-Length", 0)) or None
+            else:
+                phases["download"] = max(took - wait, 0.0)
+                size = len(resp.content)
+            self.record(switch, cmd, phases, size, status=resp.status_code)
+
+            decode = resp.json
+
+            def timed_json(**kwargs):
+                start = perf_counter()
+                reply = decode(**kwargs)
+                self.observe("decode", switch, cmd, perf_counter() - start)
+                return reply
+
+            resp.json = timed_json
+
+            return resp
+
+        return timed_post
+
+    def prometheus(self):
+        """
+        This returns the histograms in the Prometheus text format.
+        """
+        with self.lock:
+            times = sorted(self.times.items())
+            sizes = sorted(self.sizes.items())
+
+        lines = ["# HELP nxapi_request_seconds Seconds spent in each phase of a NX-API request.",
+                 "# TYPE nxapi_request_seconds histogram"]
+        for (switch, cmd, phase), histogram in times:
+            lines.extend(histogram_lines("nxapi_request_seconds", histogram,
+                                         'switch="{}",cmd="{}",phase="{}"'.format(
+                                             escape(switch), escape(cmd), phase)))
+
+        lines.extend(["# HELP nxapi_response_bytes Bytes in the body of a NX-API response.",
+                      "# TYPE nxapi_response_bytes histogram"])
+        for (switch, cmd), histogram in sizes:
+            lines.extend(histogram_lines("nxapi_response_bytes", histogram,
+                                         'switch="{}",cmd="{}"'.format(escape(switch), escape(cmd))))
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        This writes the histograms to a file for the node exporter textfile
+        collector. The file is replaced in one step, so a scrape never sees
+        half a file.
+        """
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.prometheus())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+    def serve(self, port, address="127.0.0.1"):
+        """
+        This serves the histograms on http://address:port/metrics in a
+        background thread.
+
+        :return: The running server; call shutdown() to stop it.
+        """
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((address, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        return server
+
+
+def histogram_lines(name, histogram, labels):
+    lines = ['{}_bucket{{{},le="{}"}} {}'.format(name, labels, bound, count)
+             for bound, count in histogram.cumulative()]
+    lines.append("{}_sum{{{}}} {}".format(name, labels, histogram.sum))
+    lines.append("{}_count{{{}}} {}".format(name, labels, histogram.count))
+
+    return lines
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def command_label(cmd):
+    """
+    This returns the command label of a request. Show commands are reduced
+    to their family, such as "show interface" for "show interface
+    Ethernet1/1" or "show vlan id" for "show vlan id 10", and other show
+    commands to their first two words; config commands and batches are
+    grouped. Interface names and VLAN IDs never each make a new series,
+    or a new latency baseline in nxapi_limit.
+    """
+    if isinstance(cmd, tuple):
+        return "batch"
+    if not read_only(cmd):
+        return "config"
+
+    words = cmd.lower().split()
+    for family in COMMAND_FAMILIES:
+        if words[:len(family)] == family:
+            return " ".join(family)
+
+    return " ".join(words[:2])
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        start = perf_counter()
+        sock = super()._new_conn()
+        CONNECTS.connect = perf_counter() - start
+
+        return sock
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        start = perf_counter()
+        sock = super()._new_conn()
+        CONNECTS.connect = perf_counter() - start
+
+        return sock
+
+    def connect(self):
+        start = perf_counter()
+        super().connect()
+        CONNECTS.tls = perf_counter() - start - (CONNECTS.connect or 0)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    """
+    This adapter makes its connections with the timed connection classes,
+    so the connect and TLS handshake of each new connection are recorded.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool,
+                                                   "https": TimedHTTPSConnectionPool}
@@ -0,0 +1,313 @@
+from collections import namedtuple
+from nxapi_retry import cli_error
+
+INTFC_FIELDS = (
+    "interface", "description", "type", "admin", "state", "reason", "speed", "duplex",
+    "negotiation", "mode", "ip", "mtu", "bwidth", "delay", "tx_load", "rx_load",
+    "reliability", "last_flap", "last_clear", "load_interval", "crc", "rx_errors",
+    "rx_discards", "tx_errors", "tx_discards", "pc_members"
+)
+
+INTFC_HEADERS = (
+    "INTERFACE", "DESCRIPTION", "TYPE", "ADMIN", "STATE", "REASON", "SPEED", "DUPLEX",
+    "NEGOTIATION", "MODE", "IP", "MTU", "BWIDTH", "DELAY", "TX LOAD", "RX LOAD",
+    "RELIABILITY", "LAST FLAP", "LAST CLEAR", "LOAD INTERVAL", "CRC", "RX ERRORS",
+    "RX DISCARDS", "TX ERRORS", "TX DISCARDS", "PC MEMBBERS"
+)
+
+VLAN_FIELDS = ("vlan_id", "name", "interfaces")
+
+VERSION_FIELDS = ("host", "model", "up", "os", "reason")
+
+
+class IntfcRecord(namedtuple("IntfcRecord", INTFC_FIELDS)):
+    """
+    This is a normalized "show interface" row. It is a tuple, so it has
+    no per-record dictionary, and the fields are in INTFC_HEADERS order.
+    """
+    __slots__ = ()
+
+
+# Each interface type maps the record fields to where the value comes from:
+#   "key"              the value of that key, or "N/A" if the switch left it out
+#   ("key", default)   the value of that key, or the default
+#   ("=", value)       always the value
+#   ("reason", state, reason)  the reason key if the state key is "down", else "up"
+#   ("ip", ip, mask)   "ip/mask", or "none/none" if the interface has no address
+# Fields that are not listed are "N/A".
+ETH_FIELDS = {
+    "interface": "interface",
+    "description": ("desc", "blank"),
+    "type": "eth_hw_desc",
+    "admin": "admin_state",
+    "state": "state",
+    "reason": ("reason", "state", "state_rsn_desc"),
+    "speed": "eth_speed",
+    "duplex": "eth_duplex",
+    "negotiation": "eth_autoneg",
+    "mode": ("eth_mode", "routed"),
+    "ip": ("ip", "eth_ip_addr", "eth_ip_mask"),
+    "mtu": "eth_mtu",
+    "bwidth": "eth_bw",
+    "delay": "eth_dly",
+    "tx_load": "eth_txload",
+    "rx_load": "eth_rxload",
+    "reliability": "eth_reliability",
+    "last_flap": "eth_link_flapped",
+    "last_clear": "eth_clear_counters",
+    "load_interval": "eth_load_interval1_rx",
+    "crc": "eth_crc",
+    "rx_errors": "eth_inerr",
+    "rx_discards": "eth_indiscard",
+    "tx_errors": "eth_outerr",
+    "tx_discards": "eth_outdiscard",
+}
+
+INTFC_TYPES = {
+    "Ethernet": ETH_FIELDS,
+    "port-channel": dict(
+        ETH_FIELDS,
+        negotiation=("=", "N/A"),
+        mode=("=", "N/A"),
+        last_flap=("=", "N/A"),
+        pc_members="eth_members",
+    ),
+    "mgmt": dict(
+        ETH_FIELDS,
+        last_flap=("=", "N/A"),
+        last_clear=("=", "N/A"),
+        load_interval=("=", "N/A"),
+        crc=("=", "N/A"),
+        rx_errors=("=", "N/A"),
+        rx_discards=("=", "N/A"),
+        tx_errors=("=", "N/A"),
+        tx_discards=("=", "N/A"),
+    ),
+    "Vlan": {
+        "interface": "interface",
+        "description": ("desc", "blank"),
+        "type": ("=", "SVI"),
+        "admin": "svi_admin_state",
+        "state": "svi_line_proto",
+        "reason": ("reason", "svi_admin_state", "svi_rsn_desc"),
+        "ip": ("ip", "svi_ip_addr", "svi_ip_mask"),
+        "mtu": "svi_mtu",
+        "bwidth": "svi_bw",
+        "delay": "svi_delay",
+        "tx_load": "svi_tx_load",
+        "rx_load": "svi_rx_load",
+        "last_clear": "svi_time_last_cleared",
+    },
+}
+
+
+# "show interface brief" has a few fields per interface, under other keys.
+ETH_BRIEF_FIELDS = {
+    "interface": "interface",
+    "type": "type",
+    "state": "state",
+    "reason": ("reason", "state", "state_rsn_desc"),
+    "speed": "speed",
+    "mode": ("portmode", "routed"),
+}
+
+BRIEF_TYPES = {
+    "Ethernet": ETH_BRIEF_FIELDS,
+    "port-channel": ETH_BRIEF_FIELDS,
+    "mgmt": {
+        "interface": "interface",
+        "state": "state",
+        "speed": "speed",
+        "ip": "ip_addr",
+        "mtu": "mtu",
+    },
+    "Vlan": {
+        "interface": "interface",
+        "type": ("=", "SVI"),
+        "admin": "svi_admin_state",
+        "reason": ("reason", "svi_admin_state", "svi_rsn_desc"),
+    },
+}
+
+# "show interface counters errors" has only the error counters.
+ERRORS_FIELDS = {
+    "interface": "interface",
+    "crc": "eth_fcs_err",
+    "rx_errors": "eth_rcv_err",
+    "rx_discards": "eth_indisc",
+    "tx_errors": "eth_xmit_err",
+    "tx_discards": "eth_outdisc",
+}
+
+ERRORS_TYPES = {"Ethernet": ERRORS_FIELDS, "port-channel": ERRORS_FIELDS, "mgmt": ERRORS_FIELDS}
+
+# The interface types of each view of "show interface"; see nxapi_class.intfc_cmds().
+VIEW_TYPES = {None: INTFC_TYPES, "brief": BRIEF_TYPES, "errors": ERRORS_TYPES}
+
+
+def compile_fields(spec, fields=INTFC_FIELDS):
+    """
+    This turns the field mapping of one interface type into a function that
+    builds the record values from a row. The mapping is only looked at here,
+    so normalizing a row is one dict.get() per field, plus a fix up of the
+    reason and ip fields.
+
+    :param spec: A field mapping such as ETH_FIELDS.
+    :param fields: The record fields, in order.
+
+    :return: A function taking a row dictionary and returning a list of values.
+    """
+    pairs = []
+    computed = []
+    for index, field in enumerate(fields):
+        source = spec.get(field, ("=", "N/A"))
+        if isinstance(source, str):
+            source = (source, "N/A")
+
+        if source[0] == "=":
+            # Rows never have a None key, so get(None, value) is always value.
+            pairs.append((None, source[1]))
+        elif source[0] == "reason":
+            pairs.append((None, "up"))
+            computed.append((index, lambda row, state=source[1], reason=source[2]:
+                             row.get(reason, "down") if row.get(state) == "down" else "up"))
+        elif source[0] == "ip":
+            pairs.append((None, "none/none"))
+            computed.append((index, lambda row, ip=source[1], mask=source[2]:
+                             "{}/{}".format(row[ip], row[mask]) if ip in row and mask in row else "none/none"))
+        else:
+            pairs.append(source)
+
+    pairs = tuple(pairs)
+    computed = tuple(computed)
+
+    def build(row):
+        get = row.get
+        values = [get(key, default) for key, default in pairs]
+        for index, compute in computed:
+            values[index] = compute(row)
+
+        return values
+
+    return build
+
+
+COMPILED_VIEWS = dict((view, dict((name, compile_fields(spec)) for name, spec in types.items()))
+                      for view, types in VIEW_TYPES.items())
+
+COMPILED_TYPES = COMPILED_VIEWS[None]
+
+
+def view_types(view=None, intfc_types=None):
+    """
+    This returns the compiled field mappings for normalize_intfcs() for a
+    view, keeping only some interface types if asked.
+
+    :param view: None, "brief" or "errors"; the view the rows came from.
+    :param intfc_types: The interface types to keep, such as
+    ("Ethernet", "port-channel"); None keeps every type.
+
+    :return: A dictionary of each interface type and its build function.
+    """
+    types = COMPILED_VIEWS[view]
+    if intfc_types is None:
+        return types
+
+    unknown = set(intfc_types) - set(types)
+    if unknown:
+        raise ValueError("Unknown interface types: {}".format(", ".join(sorted(unknown))))
+
+    return dict((name, types[name]) for name in intfc_types)
+
+
+def reply_rows(reply, table):
+    """
+    This returns the rows of a table from a decoded reply. A batch reply
+    gives the rows of every reply in order, and a table with one row,
+    which NX-API returns as a dictionary, gives that row. A reply that is
+    a JSON-RPC error, as for an interface the switch does not have, raises
+    NxApiError with the switch's message.
+
+    :param reply: The .json() of a request, or of a batch of requests.
+    :param table: The table name, such as "interface" for ROW_interface.
+
+    :return: A generator of row dictionaries.
+    """
+    for one in reply if isinstance(reply, list) else [reply]:
+        if "error" in one:
+            raise cli_error(one["error"], one.get("id"))
+        body = one["result"]["body"]
+        if not isinstance(body, dict) or "TABLE_" + table not in body:
+            continue
+        rows = body["TABLE_" + table]["ROW_" + table]
+        if isinstance(rows, dict):
+            yield rows
+        else:
+            for row in rows:
+                yield row
+
+
+def vlan_rows(reply):
+    """
+    This returns the VLAN rows of a "show vlan", "show vlan brief" or
+    "show vlan id" reply, always as a list.
+    """
+    for table in ("vlanbrief", "vlanbriefxbrief", "vlanbriefid"):
+        rows = list(reply_rows(reply, table))
+        if rows:
+            return rows
+
+    return []
+
+
+def intfc_type(name):
+    """
+    This returns the type of an interface from its name, for example
+    "Ethernet" for "Ethernet1/1.100", and "port-channel" for "port-channel10".
+    """
+    return name.rstrip("0123456789/.")
+
+
+def normalize_intfcs(rows, types=COMPILED_TYPES, record=IntfcRecord):
+    """
+    This normalizes "show interface" rows in one pass. Each row is matched
+    to its interface type, and interfaces of other types (loopback, tunnel,
+    nve) are skipped. Rows can be a list, a single row dictionary (a switch
+    with one interface), or any iterable of rows.
+
+    :param rows: The ROW_interface value of a "show interface" request.
+    :param types: The compiled field mappings for each interface type.
+    :param record: The record class to build.
+
+    :return: A generator of IntfcRecord, one per interface.
+
+    :example:
+    >>> rows = req.json()['result']['body']['TABLE_interface']['ROW_interface']
+    >>> for intfc in normalize_intfcs(rows):
+    ...     print(intfc.interface, intfc.state, intfc.crc)
+    Ethernet1/1 up 0
+    """
+    if isinstance(rows, dict):
+        rows = [rows]
+
+    make = tuple.__new__
+    for row in rows:
+        build = types.get(intfc_type(row["interface"]))
+        if build is not None:
+            yield make(record, build(row))
+
+
+def intfc_columns(records, fields=INTFC_FIELDS):
+    """
+    This turns normalized records into a columnar table.
+
+    :param records: An iterable of IntfcRecord.
+    :param fields: The record fields, in order.
+
+    :return: A dictionary of each field and a tuple of its values.
+    """
+    columns = list(zip(*records))
+    if not columns:
+        columns = [()] * len(fields)
+
+    return dict(zip(fields, columns))
@@ -0,0 +1,419 @@
+import os
+import gzip
+import json
+import queue
+import random
+import threading
+import numpy as np
+from heapq import heappop, heappush
+from collections import deque
+from time import monotonic, time
+from concurrent.futures import ThreadPoolExecutor
+from nxapi_class import NxAaa, NxIntfc, NxSession
+from nxapi_counters import COUNTERS, CounterTable
+from nxapi_retry import CircuitBreaker
+from nxapi_stream import stream_rows
+
+ERROR_COUNTERS = ("eth_crc", "eth_inerr", "eth_indiscard", "eth_outerr", "eth_outdiscard")
+
+
+class DeltaLog:
+    """
+    This class appends counter changes to a JSON lines file, gzipped when
+    the path ends in .gz. The first poll of a switch is written in full, and
+    after that only the interfaces whose counters or state changed, with only
+    the counters that changed, so the file grows with the amount of change
+    rather than with ports times polls. Interface names are written once and
+    then referred to by number.
+
+    The records are:
+    {"counters": [...]} - the counter of each counter number, first in a file.
+    {"switch": s, "time": t, "names": {id: name}, "base": [[id, value, ...]]}
+    - the full counters of every interface, in counter order.
+    {"switch": s, "time": t, "names": {...}, "delta": [[id, n, change, ...]],
+    "state": {id: state}, "added": [[id, value, ...]], "removed": [id, ...]}
+    - the changed counters as pairs of counter number and change, the
+    interfaces whose state changed, the full counters of interfaces that
+    were not in the previous poll, and the interfaces that are gone; names
+    is only given for interfaces never seen before.
+    """
+
+    def __init__(self, path, counters=COUNTERS):
+        self.path = path
+        self.counters = counters
+        self.lock = threading.Lock()
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        opener = gzip.open if path.endswith(".gz") else open
+        self.file = opener(path, "at")
+        if new:
+            self.append({"counters": list(counters)})
+
+    def append(self, record):
+        with self.lock:
+            self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_deltas(path):
+    """
+    This reads a DeltaLog file back.
+
+    :return: A generator of dictionaries with the "switch", the "time", "base"
+    set to True for a full record, "rows" of each interface name and its
+    {counter: value or change}, "state" of each interface whose state
+    changed, "added" of each interface that appeared and its
+    {counter: value}, and "removed", a list of the interfaces that went missing.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    counters = COUNTERS
+    names = {}
+    with opener(path, "rt") as f:
+        for line in f:
+            record = json.loads(line)
+            if "counters" in record:
+                counters = record["counters"]
+                continue
+
+            switch = record["switch"]
+            if "base" in record:
+                names[switch] = {}
+            ids = names.setdefault(switch, {})
+            ids.update((int(pos), name) for pos, name in record.get("names", {}).items())
+
+            rows = {}
+            for entry in record.get("base", ()):
+                rows[ids[entry[0]]] = dict(zip(counters, entry[1:]))
+            for entry in record.get("delta", ()):
+                rows[ids[entry[0]]] = dict((counters[pos], change) for pos, change in zip(entry[1::2], entry[2::2]))
+
+            yield {
+                "switch": switch,
+                "time": record["time"],
+                "base": "base" in record,
+                "rows": rows,
+                "state": dict((ids[int(pos)], state) for pos, state in record.get("state", {}).items()),
+                "added": dict((ids[entry[0]], dict(zip(counters, entry[1:]))) for entry in record.get("added", ())),
+                "removed": [ids[pos] for pos in record.get("removed", ())],
+            }
+
+
+class RollingRates:
+    """
+    This class keeps the counter deltas of the last window seconds of
+    polls, and running sums of them, so the rate over the window costs one
+    add and at most a few subtracts per poll however long the window is.
+    """
+
+    def __init__(self, window=300):
+        self.window = window
+        self.polls = deque()
+        self.sums = None
+        self.elapsed = 0.0
+        self.names = None
+
+    def add(self, delta):
+        """
+        This adds the deltas of a poll. A change in the interfaces starts the
+        window again, as the sums no longer line up.
+
+        :param delta: A CounterTable from CounterTable.delta().
+        """
+        if delta.names != self.names:
+            self.polls.clear()
+            self.names = delta.names
+            self.sums = dict((counter, np.zeros(len(delta), dtype=np.uint64)) for counter in delta.columns)
+            self.elapsed = 0.0
+
+        self.polls.append(delta)
+        self.elapsed += delta.timestamp
+        for counter, column in delta.columns.items():
+            self.sums[counter] += column
+
+        while len(self.polls) > 1 and self.elapsed - self.polls[0].timestamp >= self.window:
+            old = self.polls.popleft()
+            self.elapsed -= old.timestamp
+            for counter, column in old.columns.items():
+                self.sums[counter] -= column
+
+    def rates(self):
+        """
+        :return: A dictionary of each counter and a float64 array of its
+        per second rate over the window, or None before the second poll.
+        """
+        if not self.polls:
+            return None
+        elapsed = self.elapsed if self.elapsed > 0 else 1.0
+
+        return dict((counter, column / elapsed) for counter, column in self.sums.items())
+
+
+class SwitchPoller:
+    """
+    This class polls the interface counters of one switch, and keeps the
+    previous poll in memory to work out what changed.
+    """
+
+    def __init__(self, switch, user, passw, url=None, window=300, log=None, timeout=30, limiter=None,
+                 breaker=None):
+        """
+        :param switch: The switch to poll.
+        :param user: The username used to login.
+        :param passw: The password for the user.
+        :param url: The url to post to; leaving to None
+        should configure the appropriate URL.
+        :param window: The seconds the rolling rates are over.
+        :param log: An optional DeltaLog to append the changes to.
+        :param timeout: The number of seconds to wait for the switch.
+        :param limiter: An optional nxapi_limit.Limiter shared by the pollers.
+        :param breaker: An optional nxapi_retry.CircuitBreaker shared by the pollers.
+        """
+        self.switch = switch
+        self.user = user
+        self.passw = passw
+        self.url = url
+        self.log = log
+        self.session = NxSession(switch, timeout=timeout, url=url, limiter=limiter, breaker=breaker)
+        self.intfc = None
+        self.prev = None
+        self.states = {}
+        self.bandwidth = None
+        self.ids = {}
+        self.rolling = RollingRates(window)
+
+    def poll(self):
+        """
+        This polls the switch once, logging in first if needed, and records
+        the changes since the last poll.
+
+        :return: The number of interfaces that changed; every interface
+        on the first poll.
+        """
+        if self.intfc is None:
+            header = NxAaa(self.user, self.switch, self.passw, url=self.url, session=self.session).nx_login()
+            self.intfc = NxIntfc(header, self.switch, url=self.url, session=self.session)
+
+        resp = self.intfc.sh_intfcs(stream=True)
+        if not resp.ok:
+            resp.close()
+            raise ValueError("{} {}".format(resp.status_code, resp.reason))
+
+        states = []
+        bandwidth = []
+        table = CounterTable.from_rows(tap(stream_rows(resp, "interface"), states, bandwidth), timestamp=time())
+        self.bandwidth = np.array(bandwidth, dtype=np.float64) * 1000
+        new_names = dict((self.ids.setdefault(name, len(self.ids)), name)
+                         for name in table.names if name not in self.ids)
+        states = dict(zip(table.names, states))
+
+        record = {"switch": self.switch, "time": table.timestamp}
+        if new_names:
+            record["names"] = new_names
+
+        if self.prev is None:
+            record["base"] = full_rows(table, range(len(table)), self.ids)
+            changed = len(table)
+        else:
+            delta = table.delta(self.prev, cleared=True)
+            self.rolling.add(delta)
+            record["delta"], changed = changed_rows(delta, self.ids)
+            changed_states = dict((self.ids[name], state) for name, state in states.items()
+                                  if self.states.get(name) != state)
+            if changed_states:
+                record["state"] = changed_states
+            # Interfaces that were not in the previous poll have a delta of 0,
+            # so their starting counters are written in full, or a reader of
+            # the log would count them from 0.
+            added = [pos for pos, name in enumerate(table.names) if name not in self.prev.index]
+            if added:
+                record["added"] = full_rows(table, added, self.ids)
+            removed = [self.ids[name] for name in self.prev.names if name not in table.index]
+            if removed:
+                record["removed"] = removed
+            changed = max(changed, len(changed_states), len(added)) + len(removed)
+
+        if self.log is not None and (self.prev is None or record.get("delta") or record.get("state")
+                                     or record.get("added") or record.get("removed")):
+            self.log.append(record)
+
+        self.prev = table
+        self.states = states
+
+        return changed
+
+    def rates(self):
+        """
+        :return: The rolling rates; see RollingRates.rates().
+        """
+        return self.rolling.rates()
+
+    def summary(self, top=5):
+        """
+        This returns the busiest and most errored interfaces over the window.
+
+        :param top: The number of interfaces to return.
+
+        :return: A list of (interface, errors per second, in utilization,
+        out utilization) tuples, by errors and then utilization; the
+        utilization is a fraction of the interface bandwidth.
+        """
+        rates = self.rates()
+        if rates is None:
+            return []
+
+        errors = sum(rates[counter] for counter in ERROR_COUNTERS)
+        bandwidth = np.where(self.bandwidth > 0, self.bandwidth, np.inf)
+        in_util = rates["vdc_lvl_in_bytes"] * 8 / bandwidth
+        out_util = rates["vdc_lvl_out_bytes"] * 8 / bandwidth
+        order = np.lexsort((-np.maximum(in_util, out_util), -errors))[:top]
+
+        return [(self.rolling.names[pos], float(errors[pos]), float(in_util[pos]), float(out_util[pos]))
+                for pos in order]
+
+    def close(self):
+        self.session.close()
+
+
+def tap(rows, states, bandwidth):
+    """
+    This passes rows through, keeping the state and bandwidth of each.
+    """
+    for row in rows:
+        get = row.get
+        states.append(get("state", get("svi_admin_state")))
+        bandwidth.append(int(get("eth_bw", get("svi_bw", 0))))
+        yield row
+
+
+def full_rows(table, positions, ids):
+    """
+    This writes out the counters of some interfaces in full.
+
+    :return: A list of [id, value, ...] entries, in counter order.
+    """
+    columns = [table.columns[counter] for counter in COUNTERS]
+
+    return [[ids[table.names[pos]]] + [int(column[pos]) for column in columns] for pos in positions]
+
+
+def changed_rows(delta, ids):
+    """
+    This finds the interfaces with a counter that changed.
+
+    :return: A list of [id, counter number, change, ...] entries, and the
+    number of interfaces that changed.
+    """
+    columns = [delta.columns[counter] for counter in COUNTERS]
+    changed = np.zeros(len(delta), dtype=bool)
+    for column in columns:
+        changed |= column != 0
+
+    entries = []
+    for pos in np.flatnonzero(changed):
+        entry = [ids[delta.names[pos]]]
+        for num, column in enumerate(columns):
+            if column[pos]:
+                entry.extend((num, int(column[pos])))
+        entries.append(entry)
+
+    return entries, len(entries)
+
+
+class Poller:
+    """
+    This class polls many switches on a schedule. Each switch is polled
+    every interval seconds, give or take jitter, from a random start, so
+    the polls are spread out instead of hitting every switch at once. A
+    poll that is still running when its switch is due again is skipped.
+    """
+
+    def __init__(self, switches, user, passw, interval=30, jitter=0.1, window=300, log=None, workers=20,
+                 timeout=None, limiter=None):
+        """
+        :param switches: The switches to poll, as names or (switch, url) tuples.
+        :param user: The username used to login.
+        :param passw: The password for the user.
+        :param interval: The seconds between polls of a switch.
+        :param jitter: The fraction of the interval each poll moves by at random.
+        :param window: The seconds the rolling rates are over.
+        :param log: An optional DeltaLog to append the changes to.
+        :param workers: The number of switches to poll at once.
+        :param timeout: The seconds to wait for a switch; defaults to the interval.
+        :param limiter: An optional nxapi_limit.Limiter to schedule the polls
+        with; by default each switch has one poll in flight and the fleet
+        has workers. A switch that fails 3 polls in a row is skipped for
+        an interval.
+        """
+        self.interval = interval
+        self.jitter = jitter
+        self.workers = workers
+        self.switches = {}
+        self.breaker = CircuitBreaker(3, interval)
+        for switch in switches:
+            switch, url = switch if isinstance(switch, tuple) else (switch, None)
+            self.switches[switch] = SwitchPoller(switch, user, passw, url, window, log, timeout or interval,
+                                                 limiter, self.breaker)
+
+    def next_due(self, due):
+        return due + self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def run(self, rounds=None, stop=None):
+        """
+        This polls the switches until stopped.
+
+        :param rounds: The number of polls of each switch; None for ever.
+        :param stop: An optional threading.Event that stops the polling.
+
+        :return: A generator of (switch, changed, error) tuples as each poll
+        finishes, where changed is from SwitchPoller.poll(), or None if
+        error is set.
+
+        :example:
+        >>> poller = Poller(['10.1.1.1', '10.1.1.2'], 'admin', passw, log=DeltaLog('counters.jsonl.gz'))
+        >>> for switch, changed, error in poller.run():
+        ...     print(switch, poller.switches[switch].summary())
+        """
+        stop = stop or threading.Event()
+        done = queue.Queue()
+        now = monotonic()
+        heap = [(now + random.uniform(0, self.interval), switch) for switch in self.switches]
+        heap.sort()
+        polls = dict((switch, 0) for switch in self.switches)
+        running = set()
+
+        def poll(switch):
+            try:
+                done.put((switch, self.switches[switch].poll(), None))
+            except Exception as error:
+                done.put((switch, None, error))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while not stop.is_set() and (heap or running):
+                while heap and heap[0][0] <= monotonic():
+                    due, switch = heappop(heap)
+                    if switch not in running:
+                        running.add(switch)
+                        polls[switch] += 1
+                        pool.submit(poll, switch)
+                    if rounds is None or polls[switch] < rounds:
+                        heappush(heap, (self.next_due(due), switch))
+
+                wait = min(max(heap[0][0] - monotonic(), 0), 1) if heap else 1
+                try:
+                    switch, changed, error = done.get(timeout=wait)
+                except queue.Empty:
+                    continue
+                running.discard(switch)
+                yield switch, changed, error
+
+    def close(self):
+        for switch in self.switches.values():
+            switch.close()
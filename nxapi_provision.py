@@ -0,0 +1,404 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from nxapi_class import NO_REPLY, NxAaa, NxBatch, NxL2, NxSession
+from nxapi_normalize import vlan_rows
+
+# The VLAN IDs NX-OS accepts.
+VLAN_IDS = range(1, 4095)
+
+# The VLANs NX-OS keeps for internal use, unless moved with
+# "system vlan <id> reserve".
+RESERVED_VLANS = range(3968, 4095)
+
+
+def read_vlans(path):
+    """
+    This reads the VLANs to provision from a file. Each line is a VLAN ID
+    and an optional name, separated by a comma or spaces. Blank lines and
+    lines starting with # are skipped.
+
+    :param path: The file to read.
+
+    :return: A list of (vlan, name) tuples; name is None if not given.
+
+    :example:
+    $ cat vlans.txt
+    10,web
+    20 database
+    100-110
+    >>> read_vlans('vlans.txt')
+    [(10, 'web'), (20, 'database'), (100, None), ..., (110, None)]
+    """
+    pairs = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.replace(",", " ", 1).split(None, 1)
+            name = parts[1].strip() if len(parts) > 1 else None
+            if "-" in parts[0]:
+                first, last = parts[0].split("-")
+                pairs.extend((vlan, name) for vlan in range(int(first), int(last) + 1))
+            else:
+                pairs.append((int(parts[0]), name))
+
+    return pairs
+
+
+def vlan_range(vlans):
+    """
+    This writes VLAN IDs in NX-OS range syntax.
+
+    :example:
+    >>> vlan_range([10, 11, 12, 15])
+    '10-12,15'
+    """
+    vlans = sorted(set(vlans))
+    spans = [[vlans[0], vlans[0]]]
+    for vlan in vlans[1:]:
+        if vlan == spans[-1][1] + 1:
+            spans[-1][1] = vlan
+        else:
+            spans.append([vlan, vlan])
+
+    return ",".join(str(first) if first == last else "{}-{}".format(first, last) for first, last in spans)
+
+
+def vlan_error(vlan, reserved=RESERVED_VLANS):
+    """
+    This returns why a VLAN ID can not be configured, or None if it can.
+
+    :param vlan: The VLAN ID.
+    :param reserved: The VLAN IDs the switch keeps for itself.
+    """
+    if vlan not in VLAN_IDS:
+        return "VLAN ID {} is not in 1-4094".format(vlan)
+    if vlan in reserved:
+        return "VLAN {} is reserved".format(vlan)
+
+    return None
+
+
+def check_vlans(pairs, reserved=RESERVED_VLANS):
+    """
+    This takes the VLANs that can not be configured out of (vlan, name)
+    pairs, so a bad ID is reported on its own instead of failing every
+    VLAN in a range command with it.
+
+    :param pairs: An iterable of (vlan, name) tuples.
+    :param reserved: The VLAN IDs the switch keeps for itself.
+
+    :return: A list of the (vlan, name) tuples that can be configured,
+    and an ordered dictionary of each rejected VLAN ID and the reason.
+
+    :example:
+    >>> check_vlans([(10, 'web'), (4000, None), (4095, None)])
+    ([(10, 'web')], OrderedDict([(4000, 'VLAN 4000 is reserved'), (4095, 'VLAN ID 4095 is not in 1-4094')]))
+    """
+    valid = []
+    rejected = OrderedDict()
+    for vlan, name in pairs:
+        error = vlan_error(int(vlan), reserved)
+        if error is None:
+            valid.append((int(vlan), name))
+        else:
+            rejected[int(vlan)] = error
+
+    return valid, rejected
+
+
+def vlan_cmds(pairs, range_size=512):
+    """
+    This turns (vlan, name) pairs into the fewest config commands. NX-OS
+    can only name one VLAN at a time, so each named VLAN is a "vlan" and
+    "name" pair, while the unnamed VLANs are created together with range
+    syntax, up to range_size VLANs per command. A VLAN given twice uses
+    its last name. VLAN IDs outside 1-4094 raise ValueError; see
+    check_vlans() to take them out first.
+
+    :param pairs: An iterable of (vlan, name) tuples.
+    :param range_size: The number of unnamed VLANs per range command.
+
+    :return: A list of groups, each a list of (cmd, vlans) tuples that must
+    be sent together, where vlans are the VLAN IDs the command is for.
+
+    :example:
+    >>> vlan_cmds([(10, 'web'), (100, None), (101, None), (103, None)])
+    [[('vlan 10', [10]), ('name web', [10])], [('vlan 100-101,103', [100, 101, 103])]]
+    """
+    names = OrderedDict()
+    for vlan, name in pairs:
+        names[int(vlan)] = name
+    invalid = [vlan for vlan in names if vlan not in VLAN_IDS]
+    if invalid:
+        raise ValueError("VLAN IDs not in 1-4094: {}".format(", ".join(map(str, invalid))))
+
+    groups = []
+    unnamed = []
+    for vlan in sorted(names):
+        if names[vlan]:
+            groups.append([("vlan {}".format(vlan), [vlan]), ("name {}".format(names[vlan]), [vlan])])
+        else:
+            unnamed.append(vlan)
+
+    for start in range(0, len(unnamed), range_size):
+        vlans = unnamed[start:start + range_size]
+        groups.append([("vlan {}".format(vlan_range(vlans)), vlans)])
+
+    return groups
+
+
+def vlan_batches(groups, batch_size=100):
+    """
+    This packs command groups into JSON-RPC batches of about batch_size
+    commands. Each batch starts with "conf t", and a group is never split
+    across batches, so a "name" always follows its "vlan".
+
+    :param groups: The groups from vlan_cmds().
+    :param batch_size: The number of commands per batch.
+
+    :return: A list of batches, each a list of (cmd, vlans) tuples.
+    """
+    batches = []
+    batch = []
+    for group in groups:
+        if batch and len(batch) + len(group) > batch_size:
+            batches.append(batch)
+            batch = []
+        if not batch:
+            batch.append(("conf t", []))
+        batch.extend(group)
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def reply_ok(reply):
+    """
+    This returns True if the command of a batch reply was applied. NX-API
+    answers a whole batch with 500 when any command in it fails, so each
+    command is judged by its own JSON-RPC reply rather than by reply.ok.
+    """
+    return "error" not in reply.json()
+
+
+def reply_error(reply):
+    """
+    This returns the error message of a failed NxResult; the HTTP status
+    for a command the response has no reply for, as when the switch did
+    not answer with JSON.
+    """
+    error = reply.json().get("error")
+    if error is None or (error.get("message") == NO_REPLY and reply.status_code >= 400):
+        return "{} {}".format(reply.status_code, reply.reason)
+
+    data = error.get("data") or {}
+
+    return data.get("msg", error.get("message", "Unknown error")).strip()
+
+
+def push_vlans(header, switch, pairs, url=None, session=None, batch_size=100, reserved=RESERVED_VLANS):
+    """
+    This provisions many VLANs on a switch with as few requests as possible,
+    and reports the result of each VLAN from the replies to its commands.
+    VLAN IDs that can not be configured are not sent; see check_vlans().
+
+    :param header: The header from NxAAA.nx_login().
+    :param switch: The switch to configure.
+    :param pairs: An iterable of (vlan, name) tuples.
+    :param url: The url to post to; leaving to None
+    should configure the appropriate URL.
+    :param session: An optional NxSession for the switch.
+    :param batch_size: The number of commands per request.
+    :param reserved: The VLAN IDs the switch keeps for itself.
+
+    :return: An ordered dictionary of each VLAN ID and "ok", or the error
+    message of its first failed command, or why it was not sent.
+
+    :example:
+    >>> push_vlans(switch_login, '10.1.1.1', [(10, 'web'), (20, 'database'), (4095, None)])
+    OrderedDict([(10, 'ok'), (20, 'ok'), (4095, 'VLAN ID 4095 is not in 1-4094')])
+    """
+    pairs, rejected = check_vlans(pairs, reserved)
+    results = push_groups(header, switch, vlan_cmds(pairs), url, session, batch_size)
+    results.update(rejected)
+
+    return results
+
+
+def push_groups(header, switch, groups, url=None, session=None, batch_size=100):
+    """
+    This sends command groups from vlan_cmds() or plan_cmds() in batches,
+    and reports the result of each VLAN; see push_vlans().
+    """
+    results = OrderedDict()
+    for batch_cmds in vlan_batches(groups, batch_size):
+        batch = NxBatch(header, switch, url, session)
+        for cmd, _ in batch_cmds:
+            batch.add(cmd)
+
+        replies = batch.post(by_id=True)
+        for (cmd, vlans), reply in zip(batch_cmds, replies.values()):
+            for vlan in vlans:
+                if reply_ok(reply):
+                    results.setdefault(vlan, "ok")
+                elif results.get(vlan, "ok") == "ok":
+                    results[vlan] = reply_error(reply)
+
+    return results
+
+
+def provision_fleet(switches, user, passw, pairs, workers=10, batch_size=100):
+    """
+    This provisions the same VLANs on many switches in parallel. Each switch
+    is logged in to once, and its results are given back as it finishes; a
+    switch that fails keeps its error, the other switches carry on.
+
+    :param switches: The switches to configure.
+    :param user: The username used to login.
+    :param passw: The password for the user.
+    :param pairs: A list of (vlan, name) tuples.
+    :param workers: The number of switches to configure at once.
+    :param batch_size: The number of commands per request.
+
+    :return: A generator of (switch, results, error) tuples, where results
+    is the dictionary from push_vlans(), or None if error is set.
+    """
+    def provision(switch):
+        with NxSession(switch) as session:
+            header = NxAaa(user, switch, passw, session=session).nx_login()
+            return push_vlans(header, switch, pairs, session=session, batch_size=batch_size)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = dict((pool.submit(provision, switch), switch) for switch in switches)
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as error:
+                yield futures[future], None, error
+
+
+def current_vlans(req):
+    """
+    This returns the VLANs on a switch from a "show vlan" request.
+
+    :param req: The results of an API request for "show vlan" or
+    "show vlan brief"
+
+    :return: A dictionary of each VLAN ID and its name.
+    """
+    rows = vlan_rows(req.json())
+
+    return dict((int(row["vlanshowbr-vlanid"]), row.get("vlanshowbr-vlanname", "")) for row in rows)
+
+
+def plan_vlans(current, pairs, delete=False, keep=(1,), reserved=RESERVED_VLANS):
+    """
+    This works out the changes that make a switch have the desired VLANs.
+    A desired VLAN without a name is only created if it is missing, and is
+    never renamed. A desired VLAN that can not be configured is rejected;
+    see check_vlans().
+
+    :param current: A dictionary of each VLAN ID on the switch and its name.
+    :param pairs: An iterable of the desired (vlan, name) tuples.
+    :param delete: Set to True to delete VLANs that are not desired.
+    :param keep: VLAN IDs that are never deleted.
+    :param reserved: The VLAN IDs the switch keeps for itself.
+
+    :return: A dictionary with lists of the VLANs to "create" as (vlan, name),
+    to "rename" as (vlan, old name, new name), to "delete" as VLAN IDs, and
+    the "rejected" VLANs as (vlan, reason).
+    """
+    pairs, rejected = check_vlans(pairs, reserved)
+    desired = OrderedDict()
+    for vlan, name in pairs:
+        desired[vlan] = name
+
+    plan = {"create": [], "rename": [], "delete": [], "rejected": list(rejected.items())}
+    for vlan in sorted(desired):
+        name = desired[vlan]
+        if vlan not in current:
+            plan["create"].append((vlan, name))
+        elif name and current[vlan] != name:
+            plan["rename"].append((vlan, current[vlan], name))
+
+    if delete:
+        plan["delete"] = [vlan for vlan in sorted(current)
+                          if vlan not in desired and vlan not in keep and vlan not in rejected]
+
+    return plan
+
+
+def plan_cmds(plan, range_size=512):
+    """
+    This turns a plan from plan_vlans() into command groups for push_groups().
+    Deletes are sent with range syntax, as "no vlan 30-39".
+    """
+    pairs = plan["create"] + [(vlan, new) for vlan, _, new in plan["rename"]]
+    groups = vlan_cmds(pairs, range_size)
+
+    for start in range(0, len(plan["delete"]), range_size):
+        vlans = plan["delete"][start:start + range_size]
+        groups.append([("no vlan {}".format(vlan_range(vlans)), vlans)])
+
+    return groups
+
+
+def format_plan(plan):
+    """
+    This returns a plan from plan_vlans() as lines of text for a dry run.
+
+    :example:
+    >>> print(format_plan(plan))
+    + vlan 30 name private
+    ~ vlan 10 name web -> www
+    - vlan 40
+    ! vlan 4095: VLAN ID 4095 is not in 1-4094
+    """
+    lines = ["+ vlan {}{}".format(vlan, " name {}".format(name) if name else "") for vlan, name in plan["create"]]
+    lines.extend("~ vlan {} name {} -> {}".format(vlan, old, new) for vlan, old, new in plan["rename"])
+    lines.extend("- vlan {}".format(vlan) for vlan in plan["delete"])
+    lines.extend("! vlan {}: {}".format(vlan, reason) for vlan, reason in plan.get("rejected", ()))
+
+    return "\n".join(lines)
+
+
+def reconcile_vlans(header, switch, pairs, delete=False, dry_run=False, url=None, session=None, batch_size=100):
+    """
+    This reads the VLANs on a switch once, and only sends the commands needed
+    to reach the desired VLANs. A switch that already has them is left alone
+    after that one read, so running a provisioning job again is cheap.
+
+    :param header: The header from NxAAA.nx_login().
+    :param switch: The switch to configure.
+    :param pairs: An iterable of the desired (vlan, name) tuples.
+    :param delete: Set to True to delete VLANs that are not desired.
+    :param dry_run: Set to True to work out the plan without sending it.
+    :param url: The url to post to; leaving to None
+    should configure the appropriate URL.
+    :param session: An optional NxSession for the switch.
+    :param batch_size: The number of commands per request.
+
+    :return: The plan from plan_vlans(), and the results from push_groups()
+    with the rejected VLANs added, which are None for a dry run or when
+    nothing needs to change.
+
+    :example:
+    >>> plan, results = reconcile_vlans(switch_login, '10.1.1.1', read_vlans('vlans.txt'), dry_run=True)
+    >>> print(format_plan(plan))
+    + vlan 30 name private
+    """
+    sh_vlans = NxL2(header, switch, url=url, session=session).sh_vlan(brief=True)
+    if not sh_vlans.ok:
+        raise ValueError("show vlan failed on {}: {} {}".format(switch, sh_vlans.status_code, sh_vlans.reason))
+
+    plan = plan_vlans(current_vlans(sh_vlans), pairs, delete)
+    if dry_run or not (plan["create"] or plan["rename"] or plan["delete"]):
+        return plan, None
+
+    results = push_groups(header, switch, plan_cmds(plan), url, session, batch_size)
+    results.update(plan["rejected"])
+
+    return plan, results
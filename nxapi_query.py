@@ -0,0 +1,468 @@
+import sys
+import json
+import sqlite3
+import argparse
+import threading
+from time import perf_counter
+from nxapi_normalize import INTFC_FIELDS
+from nxapi_store import SnapshotStore, parse_time
+from nxapi_vlan import expand_intfcs, expand_vlans, intfc_name
+
+# The interface fields kept as integers, so they can be compared; "N/A" is NULL.
+NUMBER_FIELDS = ("mtu", "bwidth", "delay", "load_interval", "crc", "rx_errors", "rx_discards", "tx_errors",
+                 "tx_discards")
+
+# The counters summed into the errors column.
+ERROR_FIELDS = ("crc", "rx_errors", "tx_errors")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS intfcs (
+    switch TEXT NOT NULL,
+    {},
+    errors INTEGER,
+    PRIMARY KEY (switch, interface)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS vlans (
+    switch TEXT NOT NULL,
+    vlan_id INTEGER NOT NULL,
+    name TEXT,
+    PRIMARY KEY (switch, vlan_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS vlan_ports (
+    vlan_id INTEGER NOT NULL,
+    switch TEXT NOT NULL,
+    interface TEXT NOT NULL,
+    {},
+    PRIMARY KEY (vlan_id, switch, interface)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS intfcs_interface ON intfcs (interface);
+CREATE INDEX IF NOT EXISTS intfcs_state ON intfcs (state);
+CREATE INDEX IF NOT EXISTS intfcs_crc ON intfcs (crc);
+CREATE INDEX IF NOT EXISTS intfcs_errors ON intfcs (errors);
+CREATE INDEX IF NOT EXISTS vlan_ports_intfc ON vlan_ports (switch, interface);
+CREATE INDEX IF NOT EXISTS vlan_ports_state ON vlan_ports (vlan_id, state);
+CREATE INDEX IF NOT EXISTS vlan_ports_crc ON vlan_ports (vlan_id, crc);
+CREATE INDEX IF NOT EXISTS vlan_ports_errors ON vlan_ports (vlan_id, errors);
+"""
+
+# The interface columns copied to the ports of each VLAN, so a query for the
+# ports of a VLAN by state or errors is answered from the VLAN's own indexes.
+PORT_FIELDS = ("state", "crc", "errors")
+
+SCHEMA = SCHEMA.format(",\n    ".join("{} {}".format(field, "INTEGER" if field in NUMBER_FIELDS else "TEXT")
+                                    for field in INTFC_FIELDS),
+                       ",\n    ".join("{} {}".format(field, "TEXT" if field == "state" else "INTEGER")
+                                      for field in PORT_FIELDS))
+
+INTFC_COLUMNS = ("switch",) + INTFC_FIELDS
+
+# The row positions of the number and error fields, after the switch.
+NUMBER_AT = tuple(INTFC_COLUMNS.index(field) for field in NUMBER_FIELDS)
+ERROR_AT = tuple(INTFC_COLUMNS.index(field) for field in ERROR_FIELDS)
+
+
+class FleetIndex:
+    """
+    This class indexes the interface and VLAN records of a fleet, as made
+    by sh_intfcs_fltr and vlans_fltr, in SQLite, so a question about every
+    switch at once is one indexed query instead of a new collection. The
+    interfaces are indexed by switch, name, state, CRC errors and total
+    errors. Each VLAN port keeps a copy of its interface's state and
+    errors, indexed with the VLAN, so a query on a VLAN only reads the
+    ports that match.
+
+    Adding the records of a switch replaces the ones it had. The index is
+    in memory unless a file is given, in which case it is kept for later
+    runs.
+
+    :example:
+    >>> index = FleetIndex()
+    >>> index.add_intfcs('10.1.1.1', sh_intfcs_fltr(sh_intfcs))
+    >>> index.add_vlans('10.1.1.1', vlans_fltr(sh_vlans))
+    >>> for intfc in index.intfcs(vlan=10, min_crc=1):
+    ...     print(intfc['switch'], intfc['interface'], intfc['crc'])
+    10.1.1.1 Ethernet1/12 41
+    """
+
+    def __init__(self, path=":memory:"):
+        """
+        :param path: The SQLite file to keep the index in; defaults to an
+        index in memory.
+        """
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def add_intfcs(self, switch, records):
+        """
+        This indexes the interfaces of a switch, replacing any it had.
+
+        :param records: An iterable of IntfcRecord or record dictionaries.
+
+        :return: The number of interfaces indexed.
+        """
+        rows = [intfc_row(switch, record) for record in records]
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM intfcs WHERE switch = ?", (switch,))
+            self.db.executemany("INSERT OR REPLACE INTO intfcs VALUES ({})".format(
+                ",".join("?" * (len(INTFC_COLUMNS) + 1))), rows)
+            self.copy_ports(switch)
+
+        return len(rows)
+
+    def add_vlans(self, switch, records):
+        """
+        This indexes the VLANs of a switch and their ports, replacing any
+        it had. Port ranges, as "Ethernet1/1-4", are expanded.
+
+        :param records: An iterable of vlans_fltr dictionaries.
+
+        :return: The number of VLANs indexed.
+        """
+        vlans, ports = [], set()
+        for record in records:
+            vlan_id = int(record["vlan_id"])
+            vlans.append((switch, vlan_id, record["name"]))
+            interfaces = record["interfaces"]
+            if not isinstance(interfaces, str):
+                interfaces = ",".join(interfaces)
+            ports.update((vlan_id, switch, intfc) for intfc in expand_intfcs(interfaces))
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM vlans WHERE switch = ?", (switch,))
+            self.db.execute("DELETE FROM vlan_ports WHERE switch = ?", (switch,))
+            self.db.executemany("INSERT OR REPLACE INTO vlans VALUES (?, ?, ?)", vlans)
+            self.db.executemany("INSERT INTO vlan_ports (vlan_id, switch, interface) VALUES (?, ?, ?)", ports)
+            self.copy_ports(switch)
+
+        return len(vlans)
+
+    def copy_ports(self, switch):
+        """
+        This copies the state and errors of a switch's interfaces to its
+        VLAN ports; a port without an interface gets NULL.
+        """
+        self.db.execute("UPDATE vlan_ports SET ({0}) = (SELECT {0} FROM intfcs i WHERE i.switch = vlan_ports.switch "
+                        "AND i.interface = vlan_ports.interface) WHERE switch = ?".format(", ".join(PORT_FIELDS)),
+                        (switch,))
+
+    def add(self, switch, cmd, records):
+        """
+        This indexes the records of a nxapi.py command; see INDEXED.
+        """
+        return getattr(self, INDEXED[cmd])(switch, records)
+
+    def load_store(self, store, when=None):
+        """
+        This indexes the interfaces and VLANs of every switch in a snapshot
+        store as they were at a time.
+
+        :param store: A SnapshotStore.
+        :param when: The epoch time; defaults to now.
+
+        :return: The number of switches indexed.
+        """
+        switches = set()
+        for cmd in INDEXED:
+            for switch, _, records in store.fleet_at(cmd, when):
+                self.add(switch, cmd, records)
+                switches.add(switch)
+        self.optimize()
+
+        return len(switches)
+
+    def optimize(self):
+        """
+        This updates the statistics the query planner picks indexes by.
+        It is worth running once the fleet is loaded.
+        """
+        with self.lock:
+            self.db.execute("ANALYZE")
+
+    def intfcs(self, switch=None, interface=None, state=None, admin=None, mode=None, vlan=None, min_crc=None,
+               min_errors=None, limit=None, fields=None):
+        """
+        This finds the interfaces that match every condition given. They
+        come in the order of the index that found them, not sorted, so a
+        limit stops at the first matches.
+
+        :param switch: A switch, or a glob such as "leaf*".
+        :param interface: An interface in any short form, as "eth1/1", or
+        a glob such as "Ethernet1/*".
+        :param state: The oper state, as "up" or "down".
+        :param admin: The admin state.
+        :param mode: The mode, as "access", "trunk" or "routed".
+        :param vlan: A VLAN or VLAN range, as 10 or "10-20,30"; only the
+        ports listed in the VLAN match.
+        :param min_crc: The fewest CRC errors.
+        :param min_errors: The fewest CRC, input and output errors summed.
+        :param limit: The most interfaces to return.
+        :param fields: The record fields to return, as ("interface", "crc");
+        defaults to every field. Fewer fields are quicker to read.
+
+        :return: A list of dictionaries of the switch and the record fields.
+        """
+        columns = INTFC_COLUMNS if fields is None else ("switch",) + tuple(
+            field for field in fields if field != "switch")
+        unknown = set(columns) - set(INTFC_COLUMNS)
+        if unknown:
+            raise ValueError("Unknown fields: {}".format(", ".join(sorted(unknown))))
+        where, params = intfc_where(switch, interface, state, admin, mode, vlan, min_crc, min_errors)
+        query = "SELECT {}{}".format(",".join("i." + column for column in columns), where)
+        if limit is not None:
+            query += " LIMIT {:d}".format(limit)
+        with self.lock:
+            rows = self.db.execute(query, params).fetchall()
+
+        return [dict(zip(columns, row)) for row in rows]
+
+    def count_intfcs(self, **conditions):
+        """
+        This counts the interfaces that intfcs() would return. A count of
+        the ports of one VLAN is read from the VLAN's indexes alone.
+        """
+        vlan = conditions.get("vlan")
+        if vlan is not None and len(expand_vlans(vlan)) == 1 and not any(
+                conditions.get(name) is not None for name in ("interface", "admin", "mode")):
+            where, params = port_where(conditions.get("switch"), conditions.get("state"), expand_vlans(vlan),
+                                       conditions.get("min_crc"), conditions.get("min_errors"))
+            # A port whose interface was not collected has no state or
+            # errors, so it is only left out by hand when neither is asked.
+            if all(conditions.get(name) is None for name in ("state", "min_crc", "min_errors")):
+                where.append("p.state IS NOT NULL")
+            query = "SELECT COUNT(*) FROM vlan_ports p WHERE " + " AND ".join(where)
+        else:
+            where, params = intfc_where(**conditions)
+            query = "SELECT COUNT(*)" + where
+        with self.lock:
+            return self.db.execute(query, params).fetchone()[0]
+
+    def vlans(self, switch=None, vlan=None, interface=None):
+        """
+        This finds the VLANs that match every condition given.
+
+        :param switch: A switch, or a glob such as "leaf*".
+        :param vlan: A VLAN or VLAN range, as 10 or "10-20,30".
+        :param interface: Only the VLANs this interface is listed in.
+
+        :return: A list of dictionaries of the switch, VLAN ID, name and
+        the list of interfaces.
+        """
+        where, params = [], []
+        if switch is not None:
+            where.append(match("v.switch", switch))
+            params.append(switch)
+        if vlan is not None:
+            vlan_ids = expand_vlans(vlan)
+            where.append("v.vlan_id IN ({})".format(",".join("?" * len(vlan_ids))))
+            params.extend(vlan_ids)
+        if interface is not None:
+            where.append("EXISTS (SELECT 1 FROM vlan_ports p WHERE p.switch = v.switch AND p.vlan_id = v.vlan_id "
+                         "AND p.interface = ?)")
+            params.append(intfc_name(interface))
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT v.switch, v.vlan_id, v.name, (SELECT group_concat(p.interface) FROM vlan_ports p "
+                "WHERE p.switch = v.switch AND p.vlan_id = v.vlan_id) FROM vlans v{} "
+                "ORDER BY v.switch, v.vlan_id".format(" WHERE " + " AND ".join(where) if where else ""),
+                params).fetchall()
+
+        return [{"switch": switch, "vlan_id": vlan_id, "name": name, "interfaces": ports.split(",") if ports else []}
+                for switch, vlan_id, name, ports in rows]
+
+    def sql(self, query, params=()):
+        """
+        This runs any SQL against the intfcs, vlans and vlan_ports tables.
+
+        :return: A list of row tuples.
+        """
+        with self.lock:
+            return self.db.execute(query, params).fetchall()
+
+    def stats(self):
+        """
+        :return: A dictionary of the number of switches, interfaces, VLANs
+        and VLAN ports indexed.
+        """
+        with self.lock:
+            return {
+                "switches": self.db.execute(
+                    "SELECT COUNT(*) FROM (SELECT switch FROM intfcs UNION SELECT switch FROM vlans)").fetchone()[0],
+                "interfaces": self.db.execute("SELECT COUNT(*) FROM intfcs").fetchone()[0],
+                "vlans": self.db.execute("SELECT COUNT(*) FROM vlans").fetchone()[0],
+                "vlan_ports": self.db.execute("SELECT COUNT(*) FROM vlan_ports").fetchone()[0],
+            }
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# The nxapi.py commands that are indexed, and the method that indexes them.
+INDEXED = {"intfcs": "add_intfcs", "vlans": "add_vlans"}
+
+
+def number(value):
+    """
+    This returns a counter as an integer, or None if the switch did not
+    give one, as "N/A".
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def intfc_row(switch, record):
+    """
+    This returns the intfcs table row of an interface record.
+    """
+    if not hasattr(record, "_fields"):
+        record = [record.get(field) for field in INTFC_FIELDS]
+    row = [switch]
+    row.extend(record)
+    for at in NUMBER_AT:
+        row[at] = number(row[at])
+    row.append(sum(row[at] or 0 for at in ERROR_AT))
+
+    return row
+
+
+def match(column, value):
+    """
+    This returns the condition for a column to equal a value, or to match
+    it as a glob if it has *, ? or [.
+    """
+    return "{} {} ?".format(column, "GLOB" if any(char in value for char in "*?[") else "=")
+
+
+def intfc_where(switch=None, interface=None, state=None, admin=None, mode=None, vlan=None, min_crc=None,
+                min_errors=None):
+    """
+    This returns the FROM and WHERE clauses and parameters of an interface
+    query, where the interfaces are i and the VLAN ports p; see
+    FleetIndex.intfcs().
+    """
+    vlan_ids = None if vlan is None else expand_vlans(vlan)
+    # The conditions the VLAN ports have too go on the ports when there is
+    # a VLAN, so the VLAN's indexes find only the ports that match.
+    where, params = port_where(switch, state, vlan_ids, min_crc, min_errors, "i" if vlan is None else "p")
+    if interface is not None:
+        interface = interface if any(char in interface for char in "*?[") else intfc_name(interface)
+        where.append(match("i.interface", interface))
+        params.append(interface)
+    for column, value in (("admin", admin), ("mode", mode)):
+        if value is not None:
+            where.append("i.{} = ?".format(column))
+            params.append(value)
+
+    if vlan_ids is None:
+        source = " FROM intfcs i"
+    elif len(vlan_ids) == 1:
+        # A port is in a VLAN once, so the join has no duplicates, and SQLite
+        # can start from the VLAN's ports or from an index of the interfaces.
+        source = " FROM vlan_ports p JOIN intfcs i ON i.switch = p.switch AND i.interface = p.interface"
+    else:
+        ports = [clause for clause in where if clause.startswith("p.")]
+        where = ["(i.switch, i.interface) IN (SELECT p.switch, p.interface FROM vlan_ports p WHERE {})".format(
+            " AND ".join(ports))] + where[len(ports):]
+        source = " FROM intfcs i"
+
+    return source + (" WHERE " + " AND ".join(where) if where else ""), params
+
+
+def port_where(switch=None, state=None, vlan_ids=None, min_crc=None, min_errors=None, table="p"):
+    """
+    This returns the conditions and parameters of a query that the VLAN
+    ports can answer as well as the interfaces, on the table named table.
+    """
+    where, params = [], []
+    if vlan_ids is not None:
+        where.append("{}.vlan_id IN ({})".format(table, ",".join("?" * len(vlan_ids))))
+        params.extend(vlan_ids)
+    if switch is not None:
+        where.append(match(table + ".switch", switch))
+        params.append(switch)
+    if state is not None:
+        where.append("{}.state = ?".format(table))
+        params.append(state)
+    for column, value in (("crc", min_crc), ("errors", min_errors)):
+        if value is not None:
+            where.append("{}.{} >= ?".format(table, column))
+            params.append(value)
+
+    return where, params
+
+
+def main(args=None):
+    """
+    This program queries a fleet index, loading it from a snapshot store
+    written by nxapi.py --store, or using one written by nxapi.py --index.
+
+    :prints: The matching records as JSON lines, and the number of them
+    and the query time to stderr.
+
+    :example:
+    $ python nxapi.py intfcs inventory.yaml --index fleet.db
+    $ python nxapi.py vlans inventory.yaml --index fleet.db
+    $ python nxapi_query.py fleet.db intfcs --vlan 10 --min-crc 1 --fields interface,crc
+    {"switch": "10.1.1.1", "interface": "Ethernet1/12", "crc": 41}
+    1 results in 0.42 ms
+    $ python nxapi_query.py fleet.db --store archive.db --at 2026-10-01 intfcs --state down --count
+    """
+    parser = argparse.ArgumentParser(prog="nxapi_query", description="Query the interfaces and VLANs of a fleet.")
+    parser.add_argument("index", help="The SQLite file of the index; :memory: with --store.")
+    parser.add_argument("--store", help="Load the index from this snapshot store first.")
+    parser.add_argument("--at", help="The time to load the store at, as epoch seconds or ISO; defaults to now.")
+    queries = parser.add_subparsers(dest="query", required=True)
+    intfcs = queries.add_parser("intfcs", help="Find interfaces.")
+    for flag in ("--switch", "--interface", "--state", "--admin", "--mode", "--vlan"):
+        intfcs.add_argument(flag)
+    intfcs.add_argument("--min-crc", type=int)
+    intfcs.add_argument("--min-errors", type=int)
+    intfcs.add_argument("--limit", type=int)
+    intfcs.add_argument("--fields", help="The record fields to print, as interface,crc; defaults to every field.")
+    intfcs.add_argument("--count", action="store_true", help="Only print the number of interfaces.")
+    vlans = queries.add_parser("vlans", help="Find VLANs.")
+    for flag in ("--switch", "--vlan", "--interface"):
+        vlans.add_argument(flag)
+    sql = queries.add_parser("sql", help="Run SQL against the intfcs, vlans and vlan_ports tables.")
+    sql.add_argument("statement")
+    queries.add_parser("stats", help="Print the size of the index.")
+    args = parser.parse_args(args)
+
+    with FleetIndex(args.index) as index:
+        if args.store:
+            with SnapshotStore(args.store) as store:
+                index.load_store(store, None if args.at is None else parse_time(args.at))
+
+        start = perf_counter()
+        if args.query == "intfcs":
+            conditions = dict(switch=args.switch, interface=args.interface, state=args.state, admin=args.admin,
+                              mode=args.mode, vlan=args.vlan, min_crc=args.min_crc, min_errors=args.min_errors)
+            if args.count:
+                results = [index.count_intfcs(**conditions)]
+            else:
+                results = index.intfcs(limit=args.limit, fields=args.fields.split(",") if args.fields else None,
+                                       **conditions)
+        elif args.query == "vlans":
+            results = index.vlans(args.switch, args.vlan, args.interface)
+        elif args.query == "sql":
+            results = index.sql(args.statement)
+        else:
+            results = [index.stats()]
+        took = perf_counter() - start
+
+        for result in results:
+            print(json.dumps(result))
+        print("{} results in {:.2f} ms".format(len(results) if not getattr(args, "count", False) else results[0],
+                                               took * 1000), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
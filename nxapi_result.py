@@ -0,0 +1,266 @@
+import json
+from nxapi_normalize import reply_rows
+
+
+class NxResult:
+    """
+    This class holds the result of a NX-API request. It has the same ok,
+    status_code, reason, headers, content and json() as a
+    requests.Response, so the filters work on it unchanged, and any other
+    attribute, as iter_content(), is the response's own. The body is
+    decoded once, the first time it is asked for, and the tables in it
+    are unwrapped by rows() and typed().
+
+    A result is made from a response, from a reply that is already
+    decoded, as one reply of a batch, or from the parts of a response, as
+    an aiohttp response once it is read.
+
+    :example:
+    >>> sh_intfcs = NxIntfc(switch_login, '10.1.1.1', session=session).sh_intfcs()
+    >>> for intfc in sh_intfcs.typed(IntfcRow):
+    ...     print(intfc.interface, intfc.state, intfc.crc)
+    Ethernet1/1 up 0
+    """
+    __slots__ = ("resp", "cmd", "status_code", "reason", "headers", "_content", "_reply")
+
+    def __init__(self, resp=None, reply=None, cmd=None, status_code=200, reason="OK", headers=None,
+                 content=None):
+        """
+        :param resp: The response, if there is one.
+        :param reply: The decoded reply, if it is already decoded.
+        :param cmd: The command, or tuple of commands, of the request.
+        :param status_code: The status code when there is no response.
+        :param reason: The reason when there is no response.
+        :param headers: The headers when there is no response.
+        :param content: The body bytes when there is no response.
+        """
+        self.resp = resp
+        self.cmd = cmd
+        if resp is not None:
+            status_code, reason, headers = resp.status_code, resp.reason, resp.headers
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers if headers is not None else {}
+        self._content = content
+        self._reply = reply
+
+    @property
+    def ok(self):
+        """
+        This is True for a status code below 400; a JSON-RPC error in a
+        reply that is already decoded, as one reply of a batch, is not ok.
+        """
+        return self.status_code < 400 and not (isinstance(self._reply, dict) and "error" in self._reply)
+
+    @property
+    def content(self):
+        if self._content is None:
+            if self.resp is not None:
+                self._content = self.resp.content
+            elif self._reply is not None:
+                self._content = json.dumps(self._reply).encode()
+            else:
+                self._content = b""
+
+        return self._content
+
+    def json(self, **kwargs):
+        """
+        This returns the decoded reply, decoding it the first time.
+        """
+        if self._reply is None:
+            if self.resp is not None:
+                self._reply = self.resp.json(**kwargs)
+            else:
+                self._reply = json.loads(self.content, **kwargs)
+
+        return self._reply
+
+    @property
+    def body(self):
+        """
+        The body of the reply, or a list of the bodies of a batch reply.
+        """
+        reply = self.json()
+        if isinstance(reply, list):
+            return [one.get("result", {}).get("body") for one in reply]
+
+        return reply["result"]["body"]
+
+    def rows(self, table):
+        """
+        This returns the rows of a table in the reply; a table with one
+        row, which NX-API gives as a dictionary, gives that row.
+
+        :param table: The table name, such as "interface" for ROW_interface.
+
+        :return: A generator of row dictionaries.
+        """
+        return reply_rows(self.json(), table)
+
+    def table(self, table):
+        """
+        This returns the rows of a table in the reply, always as a list.
+        """
+        return list(self.rows(table))
+
+    def typed(self, cls):
+        """
+        This returns the rows of the reply as a Row class. The rows come
+        from the first of the class's tables that has any; a class without
+        tables is made from each body, as for "show version".
+
+        :param cls: A Row class, as IntfcRow.
+
+        :return: A generator of cls.
+        """
+        if not cls.tables:
+            bodies = self.body
+            return (cls(body) for body in (bodies if isinstance(bodies, list) else [bodies])
+                    if isinstance(body, dict))
+        for table in cls.tables:
+            rows = self.table(table)
+            if rows:
+                return (cls(row) for row in rows)
+
+        return iter(())
+
+    def __getattr__(self, name):
+        if self.resp is None:
+            raise AttributeError(name)
+
+        return getattr(self.resp, name)
+
+    def __repr__(self):
+        return "<NxResult [{}] {!r}>".format(self.status_code, self.cmd)
+
+
+class Field:
+    """
+    This is a field of a Row class. It reads the first of its keys that
+    the row has and converts it, each time it is read, so only the fields
+    a filter reads are converted.
+    """
+    __slots__ = ("keys", "convert", "default")
+
+    def __init__(self, keys, convert=None, default=None):
+        """
+        :param keys: The row key, or a tuple of keys to try in order.
+        :param convert: A function to convert the value with, as int.
+        :param default: The value when the row has none of the keys.
+        """
+        self.keys = keys if isinstance(keys, tuple) else (keys,)
+        self.convert = convert
+        self.default = default
+
+    def __get__(self, row, owner):
+        if row is None:
+            return self
+        raw = row.raw
+        for key in self.keys:
+            if key in raw:
+                value = raw[key]
+                return value if self.convert is None else self.convert(value)
+
+        return self.default
+
+
+class Row:
+    """
+    This is the base of the typed rows. A row only holds the row
+    dictionary, and each Field of a subclass reads from it.
+    """
+    __slots__ = ("raw",)
+
+    # The tables the rows come from, in the order to try them.
+    tables = ()
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    @classmethod
+    def fields(cls):
+        """
+        :return: The names of the fields, in the order they are defined.
+        """
+        names = []
+        for klass in reversed(cls.__mro__):
+            names.extend(name for name, value in vars(klass).items()
+                         if isinstance(value, Field) and name not in names)
+
+        return names
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.fields())
+
+    def __repr__(self):
+        return "<{} {!r}>".format(type(self).__name__, self.raw)
+
+
+def split_list(value):
+    """
+    This splits a comma separated NX-OS list, as the ports of a VLAN.
+    """
+    return [one.strip() for one in value.split(",") if one.strip()]
+
+
+class VersionRow(Row):
+    """
+    This is the body of a "show version" request.
+    """
+    __slots__ = ()
+
+    host = Field("host_name")
+    chassis = Field("chassis_id")
+    os = Field(("nxos_ver_str", "sys_ver_str", "kickstart_ver_str"))
+    bios = Field("bios_ver_str")
+    serial = Field("proc_board_id")
+    memory = Field("memory", int)
+    uptime_days = Field("kern_uptm_days", int)
+    reason = Field("rr_reason")
+
+
+class VlanRow(Row):
+    """
+    This is a VLAN row of a "show vlan", "show vlan brief" or "show vlan id"
+    request.
+    """
+    __slots__ = ()
+
+    tables = ("vlanbrief", "vlanbriefxbrief", "vlanbriefid")
+
+    vlan_id = Field("vlanshowbr-vlanid", int)
+    name = Field("vlanshowbr-vlanname")
+    state = Field("vlanshowbr-vlanstate")
+    shutdown = Field("vlanshowbr-shutstate", lambda value: value != "noshutdown")
+    interfaces = Field("vlanshowplist-ifidx", split_list, [])
+
+
+class IntfcRow(Row):
+    """
+    This is a row of a "show interface" request. The fields are taken from
+    the ethernet or SVI keys, whichever the row has.
+    """
+    __slots__ = ()
+
+    tables = ("interface",)
+
+    interface = Field("interface")
+    description = Field("desc")
+    state = Field(("state", "svi_admin_state"))
+    admin_state = Field(("admin_state", "svi_admin_state"))
+    reason = Field(("state_rsn_desc", "svi_rsn_desc"))
+    mode = Field("eth_mode")
+    speed = Field("eth_speed")
+    mtu = Field(("eth_mtu", "svi_mtu"), int)
+    bandwidth = Field(("eth_bw", "svi_bw"), int)
+    ip = Field(("eth_ip_addr", "svi_ip_addr"))
+    in_pkts = Field("vdc_lvl_in_pkts", int, 0)
+    in_bytes = Field("vdc_lvl_in_bytes", int, 0)
+    out_pkts = Field("vdc_lvl_out_pkts", int, 0)
+    out_bytes = Field("vdc_lvl_out_bytes", int, 0)
+    crc = Field("eth_crc", int, 0)
+    rx_errors = Field("eth_inerr", int, 0)
+    rx_discards = Field("eth_indiscard", int, 0)
+    tx_errors = Field("eth_outerr", int, 0)
+    tx_discards = Field("eth_outdiscard", int, 0)
@@ -0,0 +1,124 @@
+import random
+import threading
+from time import monotonic
+
+
+class NxApiError(Exception):
+    """
+    This is raised when a switch answers in a way the client can not use,
+    as a login without a cookie.
+    """
+
+
+class CircuitOpenError(NxApiError):
+    """
+    This is raised instead of sending a request to a switch whose circuit
+    breaker is open.
+    """
+
+
+def cli_error(error, req_id=None):
+    """
+    This returns a NxApiError for a JSON-RPC error reply, with the switch's
+    CLI message, as "Invalid interface format at '^' marker.".
+
+    :param error: The "error" of the reply.
+    :param req_id: The id of the reply, to say which command failed.
+    """
+    data = error.get("data") or {}
+    msg = (data.get("msg") if isinstance(data, dict) else None) or error.get("message", "Unknown error")
+    if req_id is None:
+        return NxApiError("The switch rejected a command: {}".format(msg.strip()))
+
+    return NxApiError("The switch rejected command {}: {}".format(req_id, msg.strip()))
+
+
+def server_error(resp):
+    """
+    This returns True if a response is a 5xx error from the switch or its
+    web server. A 500 with a JSON body is the switch rejecting a command,
+    as NX-API answers a bad command, so it is not a server error.
+    """
+    return resp.status_code >= 500 and "json" not in resp.headers.get("Content-Type", "")
+
+
+def backoff_delay(attempt, backoff=0.5, cap=30.0):
+    """
+    This returns the seconds to wait before a retry: a random time up to
+    backoff doubled for each attempt so far, so retries from many clients
+    spread out instead of arriving together.
+
+    :param attempt: The number of the attempt that failed, from 0.
+    :param backoff: The longest wait after the first attempt.
+    :param cap: The longest wait after any attempt.
+    """
+    return random.uniform(0, min(cap, backoff * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    This class keeps a circuit breaker for each switch, shared by the
+    sessions of a run. After failures requests in a row to a switch have
+    failed, its breaker opens, and requests to it raise CircuitOpenError
+    at once for cooldown seconds instead of each waiting out a timeout.
+    After the cooldown one request is let through as a trial; if it works
+    the breaker closes, and if not it opens for another cooldown.
+
+    :example:
+    >>> breaker = CircuitBreaker(failures=3, cooldown=60)
+    >>> with NxSession('10.1.1.1', breaker=breaker) as session:
+    ...     switch_login = NxAaa('user', '10.1.1.1', session=session).nx_login()
+    """
+
+    def __init__(self, failures=3, cooldown=60.0):
+        """
+        :param failures: The failures in a row that open a breaker.
+        :param cooldown: The seconds a breaker stays open.
+        """
+        self.failures = failures
+        self.cooldown = cooldown
+        self.switches = {}
+        self.lock = threading.Lock()
+
+    def check(self, switch):
+        """
+        This raises CircuitOpenError if the breaker of a switch is open,
+        and otherwise lets a request through.
+        """
+        with self.lock:
+            state = self.switches.get(switch)
+            if state is None or state["opened"] is None:
+                return
+            if state["trial"] or monotonic() - state["opened"] < self.cooldown:
+                raise CircuitOpenError("{} is not answering; skipped for {:.0f} s after {} failures".format(
+                    switch, self.cooldown, state["failed"]))
+            state["trial"] = True
+
+    def success(self, switch):
+        """
+        This closes the breaker of a switch after a request to it worked.
+        """
+        with self.lock:
+            self.switches.pop(switch, None)
+
+    def failure(self, switch):
+        """
+        This counts a failed request to a switch, and opens its breaker
+        once enough have failed in a row.
+        """
+        with self.lock:
+            state = self.switches.setdefault(switch, {"failed": 0, "opened": None, "trial": False})
+            state["failed"] += 1
+            if state["trial"] or state["failed"] >= self.failures:
+                state["opened"] = monotonic()
+                state["trial"] = False
+
+    def is_open(self, switch):
+        """
+        :return: True if requests to a switch are being skipped.
+        """
+        with self.lock:
+            state = self.switches.get(switch)
+
+            return state is not None and state["opened"] is not None and \
+                (state["trial"] or monotonic() - state["opened"] < self.cooldown)
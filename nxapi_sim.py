@@ -0,0 +1,787 @@
+import os
+import ssl
+import gzip
+import json
+import zlib
+import base64
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from time import monotonic, sleep
+from xml.sax.saxutils import escape
+from xml.etree import ElementTree
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from nxapi_vlan import expand_intfcs, expand_vlans
+
+
+class SimError(Exception):
+    """
+    This is raised for a command the simulated switch rejects, and is
+    answered with a JSON-RPC error holding the message.
+    """
+
+
+class SimSwitch:
+    def __init__(self, name, interfaces=54, vlans=3, traffic=False):
+        """
+        This is the state of one simulated switch: its interfaces, its VLANs
+        and the encoded body of its show commands, which is encoded once per
+        output format and kept until a config command or traffic changes it.
+
+        :param name: The switch name, used as its host name.
+        :param interfaces: The number of rows "show interface" returns.
+        :param vlans: The number of VLANs the switch starts with; the
+        ethernet ports are spread across them.
+        :param traffic: Set to True to make the counters grow between each
+        "show interface", so a poller sees rates.
+        """
+        self.name = name
+        self.traffic = traffic
+        self.lock = threading.Lock()
+        self.polls = 0
+        self.rows = intfc_rows(interfaces)
+        self.vlans = dict((vlan, "default" if vlan == 1 else "VLAN{:04d}".format(vlan * 10))
+                          for vlan in [1] + [vlan * 10 for vlan in range(1, vlans)])
+        self.encoded = {}
+
+    def run(self, cmds, output="json"):
+        """
+        This runs the commands of one request in order; a "vlan" command
+        sets the VLANs the next "name" is for, as in config mode.
+
+        :param cmds: A list of the commands.
+        :param output: The output format of the bodies; one of ENCODERS.
+
+        :return: A list of the encoded body, None for a config command, or
+        the SimError, of each command.
+        """
+        results = []
+        context = []
+        with self.lock:
+            for cmd in cmds:
+                try:
+                    results.append(self.result(cmd.strip(), context, output))
+                except SimError as error:
+                    results.append(error)
+
+        return results
+
+    def result(self, cmd, context, output):
+        words = cmd.split()
+        lower = cmd.lower()
+        if lower in ("conf t", "configure terminal", "end"):
+            return None
+        if lower.startswith("show "):
+            return self.show(lower, words, output)
+        if lower.startswith("vlan "):
+            del context[:]
+            context.extend(self.vlan_ids(words[1]))
+            for vlan in context:
+                self.vlans.setdefault(vlan, "VLAN{:04d}".format(vlan))
+            return self.changed()
+        if lower.startswith("no vlan "):
+            for vlan in self.vlan_ids(words[2]):
+                if vlan == 1:
+                    raise SimError("Default VLAN 1 cannot be deleted")
+                self.vlans.pop(vlan, None)
+            return self.changed()
+        if lower.startswith("name ") and context:
+            if len(context) > 1:
+                raise SimError("Name can only be set for one VLAN at a time")
+            self.vlans[context[0]] = cmd.split(None, 1)[1]
+            return self.changed()
+
+        raise SimError("% Invalid command at '^' marker.")
+
+    def show(self, lower, words, output):
+        if lower == "show version":
+            return self.cached(lower, self.version, output)
+        if lower == "show vlan":
+            return self.cached(lower, self.vlan_body, output)
+        if lower == "show vlan brief":
+            return self.cached(lower, self.vlan_brief_body, output)
+        if lower.startswith("show vlan id "):
+            vlans = self.vlan_ids(words[3])
+            return self.cached(lower, lambda: self.vlan_id_body(vlans), output)
+        if lower.startswith("show interface"):
+            if self.traffic:
+                self.count()
+            return self.cached(lower, lambda: self.intfc_body(" ".join(words[2:])), output)
+
+        raise SimError("% Invalid command at '^' marker.")
+
+    def cached(self, cmd, build, output):
+        if (cmd, output) not in self.encoded:
+            self.encoded[(cmd, output)] = ENCODERS[output](build())
+
+        return self.encoded[(cmd, output)]
+
+    def changed(self):
+        self.encoded.clear()
+
+    def count(self):
+        """
+        This adds a poll interval of traffic to the counters of every port.
+        """
+        self.polls += 1
+        for i, row in enumerate(self.rows):
+            if "vdc_lvl_in_bytes" not in row:
+                continue
+            for key, rate in (("vdc_lvl_in_pkts", 1000), ("vdc_lvl_in_bytes", 125000),
+                              ("vdc_lvl_out_pkts", 900), ("vdc_lvl_out_bytes", 110000)):
+                row[key] = type(row[key])(int(row[key]) + rate * (i % 10 + 1))
+        for key in [key for key in self.encoded if key[0].startswith("show interface")]:
+            del self.encoded[key]
+
+    @staticmethod
+    def vlan_ids(vlans):
+        try:
+            vlan_ids = expand_vlans(vlans)
+        except ValueError:
+            raise SimError("Invalid range")
+        if not vlan_ids or not all(1 <= vlan <= 4094 for vlan in vlan_ids):
+            raise SimError("Invalid range")
+
+        return vlan_ids
+
+    def version(self):
+        return {
+            "header_str": "Cisco Nexus Operating System (NX-OS) Software",
+            "bios_ver_str": "07.59",
+            "kickstart_ver_str": "7.0(3)I7(6)",
+            "sys_ver_str": "7.0(3)I7(6)",
+            "bios_cmpl_time": "08/26/2016",
+            "kick_file_name": "bootflash:///nxos.7.0.3.I7.6.bin",
+            "kick_cmpl_time": " 3/5/2019 13:00:00",
+            "kick_tmstmp": "03/05/2019 22:06:45",
+            "chassis_id": "Nexus9000 C93180YC-EX chassis",
+            "cpu_name": "Intel(R) Xeon(R) CPU  @ 1.80GHz",
+            "memory": 24633476,
+            "mem_type": "kB",
+            "proc_board_id": "FDO{:08d}".format(abs(hash(self.name)) % 10 ** 8),
+            "host_name": self.name,
+            "bootflash_size": 53298520,
+            "kern_uptm_days": 45,
+            "kern_uptm_hrs": 3,
+            "kern_uptm_mins": 7,
+            "kern_uptm_secs": 12 + self.polls % 48,
+            "rr_usecs": 318471,
+            "rr_ctime": "Mon Jan  7 10:15:55 2019",
+            "rr_reason": "Reset Requested by CLI command reload",
+            "rr_sys_ver": "7.0(3)I7(5a)",
+            "rr_service": "",
+            "manufacturer": "Cisco Systems, Inc.",
+        }
+
+    def members(self):
+        """
+        This spreads the ethernet ports across the VLANs.
+
+        :return: A dictionary of each VLAN ID and its list of ports.
+        """
+        vlans = sorted(self.vlans)
+        members = dict((vlan, []) for vlan in vlans)
+        ports = [row["interface"] for row in self.rows if row["interface"].startswith("Ethernet")]
+        for i, port in enumerate(ports):
+            members[vlans[i % len(vlans)]].append(port)
+
+        return members
+
+    def vlan_rows(self, vlans, members):
+        rows = []
+        for vlan in vlans:
+            row = {
+                "vlanshowbr-vlanid": str(vlan),
+                "vlanshowbr-vlanid-utf": str(vlan),
+                "vlanshowbr-vlanname": self.vlans[vlan],
+                "vlanshowbr-vlanstate": "active",
+                "vlanshowbr-shutstate": "noshutdown",
+            }
+            if members[vlan]:
+                row["vlanshowplist-ifidx"] = ",".join(members[vlan])
+            rows.append(row)
+
+        return rows
+
+    def vlan_body(self):
+        vlans = sorted(self.vlans)
+        rows = self.vlan_rows(vlans, self.members())
+
+        return {
+            "TABLE_vlanbrief": {"ROW_vlanbrief": rows[0] if len(rows) == 1 else rows},
+            "TABLE_mtuinfo": {"ROW_mtuinfo": [
+                {"vlanshowinfo-vlanid": str(vlan), "vlanshowinfo-media-type": "enet",
+                 "vlanshowinfo-vlanmode": "ce-vlan"} for vlan in vlans]},
+        }
+
+    def vlan_brief_body(self):
+        rows = self.vlan_rows(sorted(self.vlans), self.members())
+
+        return {"TABLE_vlanbriefxbrief": {"ROW_vlanbriefxbrief": rows[0] if len(rows) == 1 else rows}}
+
+    def vlan_id_body(self, vlans):
+        vlans = [vlan for vlan in vlans if vlan in self.vlans]
+        if not vlans:
+            return ""
+        rows = self.vlan_rows(vlans, self.members())
+
+        return {
+            "TABLE_vlanbriefid": {"ROW_vlanbriefid": rows[0] if len(rows) == 1 else rows},
+            "TABLE_mtuinfoid": {"ROW_mtuinfoid": {
+                "vlanshowinfo-vlanid": str(vlans[0]), "vlanshowinfo-media-type": "enet",
+                "vlanshowinfo-vlanmode": "ce-vlan"}},
+            "is-vtp-manageable": "enabled",
+            "vlanshowrspan-vlantype": "notrspan",
+        }
+
+    def intfc_body(self, args):
+        """
+        This answers "show interface [interfaces] [brief | counters errors]",
+        where interfaces is a comma separated list of names and ranges.
+        """
+        view = None
+        for suffix, name in (("counters errors", "errors"), ("brief", "brief")):
+            if args.lower().endswith(suffix):
+                view, args = name, args[:-len(suffix)].strip()
+
+        rows = self.rows
+        if args:
+            wanted = set(expand_intfcs(args))
+            rows = [row for row in rows if row["interface"] in wanted]
+            if not rows:
+                raise SimError("Invalid interface format at '^' marker.")
+        if view == "brief":
+            rows = [brief_row(row) for row in rows]
+        elif view == "errors":
+            rows = [errors_row(row) for row in rows if "eth_crc" in row]
+
+        return {"TABLE_interface": {"ROW_interface": rows[0] if len(rows) == 1 else rows}}
+
+
+class SimServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, user=None, passw=None, interfaces=54, vlans=3, latency=0.0, jitter=0.0,
+                 error_rate=0.0, cookie_ttl=None, traffic=False, compress=False):
+        """
+        This is a stand-in for the /ins endpoint of any number of switches.
+        A request is for the switch named by its url path ("/<switch>/ins"),
+        or else by its Host header, so one server can act as a whole fleet;
+        each switch is made the first time it is asked for. Requests may be
+        JSON-RPC ("cli" or "cli_ascii"), or ins_api JSON or XML.
+
+        :param address: The (host, port) to listen on; port 0 picks a free port.
+        :param user: The username to accept; None accepts any login.
+        :param passw: The password to accept; None accepts any login.
+        :param interfaces: The number of interfaces on each switch.
+        :param vlans: The number of VLANs each switch starts with.
+        :param latency: Seconds to wait before answering each request.
+        :param jitter: Up to this many more seconds are added to the latency.
+        :param error_rate: The fraction of requests answered with a 500 error.
+        :param cookie_ttl: Seconds a login cookie is good for; None for ever.
+        :param traffic: Set to True to make the counters grow; see SimSwitch.
+        :param compress: Set to True to gzip or deflate responses for
+        clients that accept it.
+        """
+        super().__init__(address, SimHandler)
+        self.user = user
+        self.passw = passw
+        self.interfaces = interfaces
+        self.vlans = vlans
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.cookie_ttl = cookie_ttl
+        self.traffic = traffic
+        self.compress = compress
+        self.cookies = {}
+        self.switches = {}
+        self.lock = threading.Lock()
+
+    def switch(self, name):
+        with self.lock:
+            if name not in self.switches:
+                self.switches[name] = SimSwitch(name, self.interfaces, self.vlans, self.traffic)
+
+            return self.switches[name]
+
+    def login(self, auth):
+        """
+        This checks a Basic Authorization header.
+
+        :return: A new cookie, or None if the login is refused.
+        """
+        try:
+            user, passw = base64.b64decode(auth.split(None, 1)[1]).decode().split(":", 1)
+        except (IndexError, ValueError):
+            return None
+        if (self.user is not None and user != self.user) or (self.passw is not None and passw != self.passw):
+            return None
+
+        cookie = "nxapi_auth={}:{}".format(user, random.getrandbits(60))
+        with self.lock:
+            self.cookies[cookie] = None if self.cookie_ttl is None else monotonic() + self.cookie_ttl
+
+        return cookie
+
+    def logged_in(self, cookie):
+        cookie = cookie.split(";")[0].strip()
+        with self.lock:
+            if cookie not in self.cookies:
+                return False
+            expires = self.cookies[cookie]
+            if expires is not None and expires < monotonic():
+                del self.cookies[cookie]
+                return False
+
+        return True
+
+    @property
+    def url(self):
+        scheme = "https" if isinstance(self.socket, ssl.SSLSocket) else "http"
+
+        return "{}://127.0.0.1:{}/ins".format(scheme, self.server_port)
+
+    def switch_url(self, name):
+        """
+        This returns the url of a switch on this server by its path.
+        """
+        return self.url.replace("/ins", "/{}/ins".format(name))
+
+
+class SimHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        content = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        delay = server.latency + (random.uniform(0, server.jitter) if server.jitter else 0)
+        if delay:
+            sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            return self.reply(500, b"Internal Server Error", "text/plain")
+
+        parts = self.path.strip("/").split("/")
+        if parts[-1] != "ins":
+            return self.reply(404, b"Not Found", "text/plain")
+        name = parts[0] if len(parts) > 1 else self.headers.get("Host", "localhost").rsplit(":", 1)[0]
+
+        cookie = None
+        if "Authorization" in self.headers:
+            cookie = server.login(self.headers["Authorization"])
+            if cookie is None:
+                return self.reply(401, b"Unauthorized", "text/plain")
+        elif not server.logged_in(self.headers.get("Cookie", "")):
+            return self.reply(401, b"Unauthorized", "text/plain")
+
+        switch = server.switch(name)
+        if content.lstrip().startswith(b"<"):
+            return self.ins_api_xml(switch, content, cookie)
+        try:
+            requests = json.loads(content)
+        except ValueError:
+            return self.reply(400, b'{"jsonrpc": "2.0", "error": {"code": -32700, "message": "Parse error"}, '
+                                   b'"id": null}', "application/json-rpc")
+        if isinstance(requests, dict) and "ins_api" in requests:
+            return self.ins_api_json(switch, requests["ins_api"], cookie)
+
+        batch = isinstance(requests, list)
+        if not batch:
+            requests = [requests]
+
+        text = requests[0].get("method") == "cli_ascii"
+        results = switch.run([request.get("params", {}).get("cmd", "") for request in requests],
+                             "ascii" if text else "json")
+        replies = []
+        for request, result in zip(requests, results):
+            if isinstance(result, SimError):
+                replies.append('{{"jsonrpc": "2.0", "error": {{"code": -32602, "message": "Invalid params", '
+                               '"data": {{"msg": {}}}}}, "id": {}}}'.format(
+                    json.dumps(str(result) + "\n"), json.dumps(request.get("id"))))
+            else:
+                replies.append('{{"jsonrpc": "2.0", "result": {}, "id": {}}}'.format(
+                    "null" if result is None else '{{"{}": {}}}'.format("msg" if text else "body", result),
+                    json.dumps(request.get("id"))))
+
+        body = "[{}]".format(", ".join(replies)) if batch else replies[0]
+        # A switch answers 500 when any command of a batch fails, with the
+        # replies of the commands that worked still in the body.
+        failed = any(isinstance(result, SimError) for result in results)
+        self.reply(500 if failed else 200, body.encode(), "application/json-rpc", cookie)
+
+    def ins_api_json(self, switch, request, cookie):
+        """
+        This answers an ins_api request with JSON output; the commands are
+        separated by ";" in its input.
+        """
+        cmd_type = request.get("type", "cli_show")
+        cmds = [cmd.strip() for cmd in request.get("input", "").split(";")]
+        results = switch.run(cmds, "ascii" if cmd_type == "cli_show_ascii" else "json")
+        outputs = []
+        for cmd, result in zip(cmds, results):
+            if isinstance(result, SimError):
+                outputs.append('{{"input": {}, "clierror": {}, "msg": "Input CLI command error", "code": "400"}}'
+                               .format(json.dumps(cmd), json.dumps(str(result) + "\n")))
+            else:
+                outputs.append('{{"input": {}, "msg": "Success", "code": "200", "body": {}}}'.format(
+                    json.dumps(cmd), '""' if result is None else result))
+
+        body = '{{"ins_api": {{"type": {}, "version": "1.0", "sid": "eoc", "outputs": {{"output": {}}}}}}}'.format(
+            json.dumps(cmd_type), outputs[0] if len(outputs) == 1 else "[{}]".format(", ".join(outputs)))
+        self.reply(200, body.encode(), "application/json", cookie)
+
+    def ins_api_xml(self, switch, content, cookie):
+        """
+        This answers an ins_api request in XML, with XML output.
+        """
+        try:
+            request = ElementTree.fromstring(content)
+        except ElementTree.ParseError:
+            return self.reply(400, b"Bad Request", "text/plain")
+        cmd_type = request.findtext("type", "cli_show")
+        cmds = [cmd.strip() for cmd in request.findtext("input", "").split(";")]
+        results = switch.run(cmds, "text" if cmd_type == "cli_show_ascii" else "xml")
+        outputs = []
+        for cmd, result in zip(cmds, results):
+            if isinstance(result, SimError):
+                outputs.append("<output><input>{}</input><clierror>{}</clierror><msg>Input CLI command error</msg>"
+                               "<code>400</code></output>".format(escape(cmd), escape(str(result))))
+            else:
+                outputs.append("<output><body>{}</body><input>{}</input><msg>Success</msg><code>200</code>"
+                               "</output>".format(result or "", escape(cmd)))
+
+        body = ('<?xml version="1.0"?>\n<ins_api><type>{}</type><version>1.0</version><sid>eoc</sid>'
+                '<outputs>{}</outputs></ins_api>').format(escape(cmd_type), "".join(outputs))
+        self.reply(200, body.encode(), "application/xml", cookie)
+
+    def reply(self, status, body, content_type, cookie=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if self.server.compress:
+            accept = self.headers.get("Accept-Encoding", "")
+            if "gzip" in accept:
+                body = gzip.compress(body, 6)
+                self.send_header("Content-Encoding", "gzip")
+            elif "deflate" in accept:
+                body = zlib.compress(body, 6)
+                self.send_header("Content-Encoding", "deflate")
+        self.send_header("Content-Length", str(len(body)))
+        if cookie is not None:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start(port=0, tls=False, **options):
+    """
+    This starts a simulator on a local port in a background thread.
+
+    :param port: The port to listen on; 0 picks a free port.
+    :param tls: Set to True to serve HTTPS with a throw away
+    self-signed certificate.
+    :param options: The SimServer options.
+
+    :return: The running SimServer; its url is the url to post to.
+
+    :example:
+    >>> server = start(interfaces=5000, latency=0.02)
+    >>> header = NxAaa('admin', 'sim1', 'admin', url=server.switch_url('sim1')).nx_login()
+    >>> server.shutdown()
+    """
+    server = SimServer(("127.0.0.1", port), **options)
+    if tls:
+        server.socket = tls_context().wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def start_fleet(count, tls=False, **options):
+    """
+    This starts one simulator per switch, each on its own port, for
+    clients that need a separate host and port per switch. A large
+    fleet is cheaper as virtual hosts on one server; see SimServer.
+
+    :param count: The number of switches.
+
+    :return: A list of the running SimServers.
+    """
+    return [start(tls=tls, **options) for _ in range(count)]
+
+
+def tls_context():
+    """
+    This makes a server SSL context with a throw away self-signed
+    certificate from openssl.
+    """
+    cert_dir = tempfile.mkdtemp()
+    cert = os.path.join(cert_dir, "sim.pem")
+    try:
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=localhost", "-keyout", cert, "-out", cert],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert)
+    finally:
+        shutil.rmtree(cert_dir)
+
+    return context
+
+
+def intfc_rows(count):
+    """
+    This builds a synthetic "show interface" ROW_interface list with every
+    key the filters use. The mix is mostly ethernet ports and sub-interfaces,
+    with a SVI every 10th row, a port-channel every 50th row and one mgmt0.
+
+    :param count: The number of interfaces to build.
+
+    :return: A list of interface row dictionaries.
+    """
+    rows = [mgmt_row()]
+    for i in range(1, count):
+        if i % 50 == 0:
+            rows.append(pc_row(i))
+        elif i % 10 == 0:
+            rows.append(svi_row(i))
+        else:
+            rows.append(eth_row(i))
+
+    return rows
+
+
+def eth_row(i):
+    slot, port, sub = i // 2304 + 1, i // 48 % 48 + 1, i % 48
+    name = "Ethernet{}/{}".format(slot, port) if sub == 0 else "Ethernet{}/{}.{}".format(slot, port, sub)
+    row = {
+        "interface": name,
+        "desc": "host-{}".format(i),
+        "state": "up" if i % 7 else "down",
+        "admin_state": "up",
+        "eth_hw_desc": "100/1000/10000 Ethernet",
+        "eth_hw_addr": "5087.89d4.32de",
+        "eth_bia_addr": "5087.89d4.32de",
+        "eth_mtu": "9216",
+        "eth_bw": 10000000,
+        "eth_dly": 10,
+        "eth_reliability": "255",
+        "eth_txload": "1",
+        "eth_rxload": "1",
+        "medium": "broadcast",
+        "eth_mode": "trunk",
+        "eth_duplex": "full",
+        "eth_speed": "10 Gb/s",
+        "eth_autoneg": "on",
+        "eth_link_flapped": "3d18h",
+        "eth_clear_counters": "never",
+        "eth_load_interval1_rx": 30,
+        "vdc_lvl_in_pkts": i * 1000,
+        "vdc_lvl_in_bytes": str(i * 125000),
+        "vdc_lvl_out_pkts": str(i * 900),
+        "vdc_lvl_out_bytes": str(i * 110000),
+        "eth_crc": i % 3,
+        "eth_inerr": str(i % 5),
+        "eth_indiscard": "0",
+        "eth_outerr": "0",
+        "eth_outdiscard": str(i % 2),
+        "eth_coll": "0",
+    }
+    if row["state"] == "down":
+        row["state_rsn_desc"] = "Link not connected"
+    if sub:
+        row["eth_ip_addr"] = "10.{}.{}.1".format(i // 256 % 256, i % 256)
+        row["eth_ip_mask"] = 24
+
+    return row
+
+
+def svi_row(i):
+    return {
+        "interface": "Vlan{}".format(i % 4094 + 1),
+        "svi_admin_state": "up" if i % 3 else "down",
+        "svi_rsn_desc": "Administratively down",
+        "svi_line_proto": "up",
+        "svi_ip_addr": "10.200.{}.1".format(i % 256),
+        "svi_ip_mask": 24,
+        "svi_mtu": 1500,
+        "svi_bw": 1000000,
+        "svi_delay": 10,
+        "svi_tx_load": 1,
+        "svi_rx_load": 1,
+        "svi_time_last_cleared": "never",
+    }
+
+
+def pc_row(i):
+    row = eth_row(i)
+    row["interface"] = "port-channel{}".format(i)
+    row["eth_members"] = "Ethernet1/1, Ethernet1/2"
+    del row["eth_mode"]
+
+    return row
+
+
+def mgmt_row():
+    row = eth_row(1)
+    row.update({
+        "interface": "mgmt0",
+        "eth_hw_desc": "GigabitEthernet",
+        "eth_ip_addr": "10.1.1.1",
+        "eth_ip_mask": 25,
+        "eth_speed": "1000 Mb/s",
+    })
+
+    return row
+
+
+def brief_row(row):
+    """
+    This turns a "show interface" row into its "show interface brief" row.
+    """
+    name = row["interface"]
+    if name.startswith("Vlan"):
+        return {"interface": name, "svi_admin_state": row["svi_admin_state"], "svi_rsn_desc": row["svi_rsn_desc"]}
+    if name.startswith("mgmt"):
+        return {"interface": name, "state": row["state"], "ip_addr": row["eth_ip_addr"],
+                "speed": row["eth_speed"].split()[0], "mtu": int(row["eth_mtu"])}
+
+    brief = {
+        "interface": name,
+        "vlan": "1",
+        "type": "eth",
+        "portmode": row.get("eth_mode", "routed"),
+        "state": row["state"],
+        "state_rsn_desc": row.get("state_rsn_desc", "none"),
+        "speed": "10G",
+        "ratemode": "D",
+    }
+    if name.startswith("port-channel"):
+        brief["protocol"] = "lacp"
+
+    return brief
+
+
+def errors_row(row):
+    """
+    This turns a "show interface" row into its "show interface counters errors" row.
+    """
+    return {
+        "interface": row["interface"],
+        "eth_align_err": "0",
+        "eth_fcs_err": str(row["eth_crc"]),
+        "eth_xmit_err": row["eth_outerr"],
+        "eth_rcv_err": row["eth_inerr"],
+        "eth_undersize": "0",
+        "eth_outdisc": row["eth_outdiscard"],
+        "eth_single_col": "0",
+        "eth_multi_col": "0",
+        "eth_late_col": "0",
+        "eth_excess_col": "0",
+        "eth_carri_sen": "0",
+        "eth_runts": "0",
+        "eth_giants": "0",
+        "eth_sqetest": "0",
+        "eth_deferred_tx": "0",
+        "eth_inmac_tx_err": "0",
+        "eth_symbol_err": "0",
+        "eth_inmac_rx_err": "0",
+    }
+
+
+def xml_text(value):
+    """
+    This encodes a body as the XML NX-OS sends: each key is a tag, and each
+    item of a list, as a ROW_interface, repeats the tag.
+    """
+    if isinstance(value, dict):
+        parts = []
+        for key, inner in value.items():
+            for item in inner if isinstance(inner, list) else [inner]:
+                parts.append("<{0}>{1}</{0}>".format(key, xml_text(item)))
+        return "".join(parts)
+
+    return escape(str(value))
+
+
+def ascii_text(value, indent=""):
+    """
+    This renders a body as indented "key: value" lines, standing in for
+    the CLI text of a command; each table row is followed by a blank line.
+    """
+    lines = []
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            if isinstance(inner, (dict, list)):
+                lines.append(ascii_text(inner, indent))
+            else:
+                lines.append("{}{}: {}".format(indent, key, inner))
+    elif isinstance(value, list):
+        for item in value:
+            lines.append(ascii_text(item, indent + "  ") + "\n")
+    else:
+        lines.append(indent + str(value))
+
+    return "\n".join(lines)
+
+
+# The encoder of each output format, from a body to the text put in a reply.
+ENCODERS = {
+    "json": json.dumps,
+    "xml": lambda body: "<__readonly__>{}</__readonly__>".format(xml_text(body)) if body else "",
+    "ascii": lambda body: json.dumps(ascii_text(body) if body else ""),
+    "text": lambda body: escape(ascii_text(body)) if body else "",
+}
+
+
+def main(args=None):
+    """
+    This program runs the simulator until it is stopped, for load testing
+    the collectors without a switch. Each switch is reached by its name in
+    the url path, so an inventory of "sim1", "sim2", ... with urls of
+    http://127.0.0.1:8080/sim1/ins, ... is a fleet on one port.
+
+    :example:
+    $ python nxapi_sim.py --port 8080 --interfaces 2000 --latency 0.05 --error-rate 0.01
+    NX-API simulator on http://127.0.0.1:8080/ins
+    """
+    parser = argparse.ArgumentParser(prog="nxapi_sim", description="Serve a simulated NX-API fleet.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--ports", type=int, default=1, help="Listen on this many ports from --port.")
+    parser.add_argument("--tls", action="store_true", help="Serve HTTPS with a self-signed certificate.")
+    parser.add_argument("--user", help="The only username to accept.")
+    parser.add_argument("--password", help="The only password to accept.")
+    parser.add_argument("--interfaces", type=int, default=54)
+    parser.add_argument("--vlans", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cookie-ttl", type=float)
+    parser.add_argument("--traffic", action="store_true", help="Make the counters grow between polls.")
+    parser.add_argument("--compress", action="store_true", help="Gzip responses for clients that accept it.")
+    args = parser.parse_args(args)
+
+    servers = [start(args.port + offset, args.tls, user=args.user, passw=args.password,
+                     interfaces=args.interfaces, vlans=args.vlans, latency=args.latency, jitter=args.jitter,
+                     error_rate=args.error_rate, cookie_ttl=args.cookie_ttl, traffic=args.traffic,
+                     compress=args.compress)
+               for offset in range(args.ports)]
+    for server in servers:
+        print("NX-API simulator on {}".format(server.url))
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
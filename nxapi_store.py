@@ -0,0 +1,304 @@
+import json
+import zlib
+import sqlite3
+import argparse
+import hashlib
+import threading
+from time import time
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshots (
+    switch TEXT NOT NULL,
+    cmd TEXT NOT NULL,
+    taken REAL NOT NULL,
+    manifest TEXT NOT NULL,
+    records INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_at ON snapshots (switch, cmd, taken);
+CREATE INDEX IF NOT EXISTS snapshots_cmd ON snapshots (cmd, taken);
+"""
+
+# The most digests looked up in one query, under the SQLite variable limit.
+CHUNK = 500
+
+
+class SnapshotStore:
+    """
+    This class archives the records of show commands in one SQLite file.
+    Each record is stored once, compressed and keyed by the hash of its
+    JSON, so an interface that did not change since the last snapshot
+    costs nothing more. A snapshot is a manifest, the list of its record
+    hashes, which is itself stored by hash, so a snapshot with no change
+    at all is one index row. Snapshots are indexed by switch, command and
+    time, and reading one only reads its own records.
+
+    The records are those of the nxapi.py filters, as dictionaries, or
+    namedtuples such as IntfcRecord, which are stored as dictionaries.
+
+    :example:
+    >>> store = SnapshotStore('archive.db')
+    >>> store.add('10.1.1.1', 'intfcs', sh_intfcs_fltr(sh_intfcs))
+    >>> for record in store.at('10.1.1.1', 'intfcs', datetime(2026, 10, 1).timestamp()):
+    ...     print(record['interface'], record['state'])
+    """
+
+    def __init__(self, path, codec=None):
+        """
+        :param path: The SQLite file; it is made if it does not exist.
+        :param codec: "zstd" or "deflate" for new records; defaults to
+        "zstd" when zstandard is installed. Either can be read back.
+        """
+        self.path = path
+        self.codec = codec or ("zstd" if zstandard is not None else "deflate")
+        if self.codec == "zstd" and zstandard is None:
+            raise ImportError("zstandard is needed to compress with zstd")
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def add(self, switch, cmd, records, taken=None):
+        """
+        This stores a snapshot of the records of a command.
+
+        :param switch: The switch the records are from.
+        :param cmd: The command, as "intfcs" or "show interface".
+        :param records: An iterable of the records.
+        :param taken: The epoch time of the snapshot; defaults to now.
+
+        :return: The manifest hash of the snapshot, and the number of
+        records that were not already stored.
+        """
+        blobs = {}
+        digests = []
+        for record in records:
+            if hasattr(record, "_asdict"):
+                record = record._asdict()
+            data = encode(record)
+            digest = hash_data(data)
+            digests.append(digest)
+            blobs[digest] = data
+        manifest = encode(digests)
+        manifest_digest = hash_data(manifest)
+        blobs[manifest_digest] = manifest
+
+        with self.lock, self.db:
+            new = set(blobs) - self.known(list(blobs))
+            self.db.executemany("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?)",
+                                [(digest, self.codec, compress(blobs[digest], self.codec)) for digest in new])
+            self.db.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                            (switch, cmd, time() if taken is None else taken, manifest_digest, len(digests)))
+
+        return manifest_digest, len(new - {manifest_digest})
+
+    def known(self, digests):
+        """
+        :return: The set of the digests that are already stored.
+        """
+        found = set()
+        for start in range(0, len(digests), CHUNK):
+            chunk = digests[start:start + CHUNK]
+            found.update(row[0] for row in self.db.execute(
+                "SELECT digest FROM blobs WHERE digest IN ({})".format(",".join("?" * len(chunk))), chunk))
+
+        return found
+
+    def blobs(self, digests):
+        """
+        This reads stored blobs, a chunk at a time.
+
+        :return: A generator of the decoded value of each digest, in order.
+        """
+        for start in range(0, len(digests), CHUNK):
+            chunk = digests[start:start + CHUNK]
+            with self.lock:
+                rows = self.db.execute("SELECT digest, codec, data FROM blobs WHERE digest IN ({})".format(
+                    ",".join("?" * len(set(chunk)))), list(set(chunk))).fetchall()
+            values = dict((digest, json.loads(decompress(data, codec))) for digest, codec, data in rows)
+            for digest in chunk:
+                yield values[digest]
+
+    def records(self, manifest):
+        """
+        This reads the records of a snapshot by its manifest hash.
+
+        :return: A generator of record dictionaries.
+        """
+        digests = next(self.blobs([manifest]))
+
+        return self.blobs(digests)
+
+    def snapshot_at(self, switch, cmd, when=None):
+        """
+        This finds the snapshot of a command that was current at a time:
+        the last one taken at or before it.
+
+        :param when: The epoch time; defaults to now.
+
+        :return: A (taken, manifest, records) tuple, or None if there was
+        no snapshot yet.
+        """
+        with self.lock:
+            return self.db.execute(
+                "SELECT taken, manifest, records FROM snapshots WHERE switch = ? AND cmd = ? AND taken <= ? "
+                "ORDER BY taken DESC LIMIT 1", (switch, cmd, time() if when is None else when)).fetchone()
+
+    def at(self, switch, cmd, when=None):
+        """
+        This returns the records of a command as they were at a time.
+
+        :return: A generator of record dictionaries; nothing if there was
+        no snapshot yet.
+        """
+        snapshot = self.snapshot_at(switch, cmd, when)
+        if snapshot is None:
+            return iter(())
+
+        return self.records(snapshot[1])
+
+    def fleet_at(self, cmd, when=None):
+        """
+        This returns the records of a command for every switch as they
+        were at a time.
+
+        :return: A generator of (switch, taken, records) tuples, where
+        records is a generator of record dictionaries.
+        """
+        with self.lock:
+            # SQLite takes the other columns from the row with the MAX().
+            rows = self.db.execute(
+                "SELECT switch, MAX(taken), manifest FROM snapshots WHERE cmd = ? AND taken <= ? "
+                "GROUP BY switch ORDER BY switch", (cmd, time() if when is None else when)).fetchall()
+        for switch, taken, manifest in rows:
+            yield switch, taken, self.records(manifest)
+
+    def history(self, switch=None, cmd=None, since=None, until=None):
+        """
+        This lists the snapshots, oldest first.
+
+        :return: A list of (switch, cmd, taken, manifest, records) tuples;
+        the same manifest on two snapshots means nothing changed.
+        """
+        where, params = [], []
+        for clause, value in (("switch = ?", switch), ("cmd = ?", cmd), ("taken >= ?", since),
+                              ("taken <= ?", until)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        with self.lock:
+            return self.db.execute("SELECT switch, cmd, taken, manifest, records FROM snapshots{} "
+                                   "ORDER BY taken".format(" WHERE " + " AND ".join(where) if where else ""),
+                                   params).fetchall()
+
+    def stats(self):
+        """
+        :return: A dictionary of the number of snapshots, the records in
+        them, the blobs stored, and the compressed bytes of the blobs.
+        """
+        with self.lock:
+            snapshots, records = self.db.execute("SELECT COUNT(*), TOTAL(records) FROM snapshots").fetchone()
+            blobs, size = self.db.execute("SELECT COUNT(*), TOTAL(LENGTH(data)) FROM blobs").fetchone()
+
+        return {"snapshots": snapshots, "records": int(records), "blobs": blobs, "bytes": int(size)}
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def encode(value):
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def hash_data(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def compress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == "deflate":
+        return zlib.compress(data, 6)
+
+    raise ValueError("Unknown codec {}, use zstd or deflate".format(codec))
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("zstandard is needed to read zstd records")
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    return zlib.decompress(data)
+
+
+def parse_time(value):
+    """
+    This reads a time as epoch seconds, or as an ISO date and time in
+    local time, such as 2026-10-01 or 2026-10-01T06:00.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main(args=None):
+    """
+    This program reads a snapshot store written by nxapi.py --store.
+
+    :example:
+    $ python nxapi.py intfcs inventory.yaml --store archive.db
+    $ python nxapi_store.py archive.db at intfcs 2026-10-01T06:00 --switch 10.1.1.1
+    {"interface": "Ethernet1/1", "description": "web01", ...}
+    $ python nxapi_store.py archive.db stats
+    {"snapshots": 3650, "records": 1971000, "blobs": 48213, "bytes": 9120441}
+    """
+    parser = argparse.ArgumentParser(prog="nxapi_store", description="Read a NX-API snapshot store.")
+    parser.add_argument("store", help="The SQLite file of the store.")
+    commands = parser.add_subparsers(dest="action", required=True)
+    at = commands.add_parser("at", help="Print the records of a command as they were at a time.")
+    at.add_argument("cmd", help="The command, as intfcs.")
+    at.add_argument("when", nargs="?", help="Epoch seconds or an ISO time; defaults to now.")
+    at.add_argument("--switch", help="Only this switch; defaults to every switch.")
+    history = commands.add_parser("history", help="List the snapshots.")
+    history.add_argument("--switch")
+    history.add_argument("--cmd")
+    commands.add_parser("stats", help="Print the size of the store.")
+    args = parser.parse_args(args)
+
+    with SnapshotStore(args.store) as store:
+        if args.action == "stats":
+            print(json.dumps(store.stats()))
+        elif args.action == "history":
+            for switch, cmd, taken, manifest, records in store.history(args.switch, args.cmd):
+                print("{}  {:<16} {:<14} {:>6} records  {}".format(
+                    datetime.fromtimestamp(taken).isoformat(timespec="seconds"), switch, cmd, records, manifest))
+        else:
+            when = None if args.when is None else parse_time(args.when)
+            if args.switch:
+                snapshots = [(args.switch, None, store.at(args.switch, args.cmd, when))]
+            else:
+                snapshots = store.fleet_at(args.cmd, when)
+            for switch, _, records in snapshots:
+                for record in records:
+                    print(json.dumps(dict([("switch", switch)] + list(record.items()))))
+
+
+if __name__ == '__main__':
+    main()
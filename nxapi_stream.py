@@ -0,0 +1,148 @@
+import re
+import json
+import codecs
+from nxapi_retry import cli_error
+
+WHITESPACE = " \t\n\r"
+
+ERROR_KEY = '"error"'
+
+REPLY_ID = re.compile(r'^\s*,\s*"id"\s*:\s*(\d+)')
+
+
+def iter_rows(chunks, table):
+    """
+    This parses a NX-API response incrementally, and yields the rows of
+    one table as they are read. Only the row being decoded and the current
+    chunk are held in memory, so the memory used does not grow with the
+    number of rows in the response. A table with a single row, which NX-API
+    returns as a dictionary instead of a list, yields that one row, and a
+    batch reply yields the rows of the table in every reply. A JSON-RPC
+    error reply raises NxApiError, as nxapi_normalize.reply_rows() does.
+
+    :param chunks: An iterable of bytes from the response body, such as
+    requests.Response.iter_content().
+    :param table: The table name, such as "interface" for ROW_interface.
+
+    :return: A generator of row dictionaries.
+
+    :example:
+    >>> req = sw_intfcs.sh_intfcs(stream=True)
+    >>> for row in iter_rows(req.iter_content(65536), 'interface'):
+    ...     print(row['interface'])
+    mgmt0
+    Ethernet1/1
+    """
+    marker = '"ROW_{}"'.format(table)
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buf = ""
+
+    def more():
+        for chunk in chunks:
+            if chunk:
+                return text.decode(chunk)
+        return None
+
+    # A batch reply has the table once per command, so after each table
+    # the search starts again from where it ended.
+    while True:
+        # Skip ahead to the row key, keeping only enough of the buffer to
+        # find a key that is split across two chunks. Rows are decoded
+        # whole, so the error key is only searched for between replies.
+        while True:
+            found = buf.find(marker)
+            failed = buf.find(ERROR_KEY)
+            if failed >= 0 and (found < 0 or failed < found):
+                raise read_error(buf[failed + len(ERROR_KEY):], more, decoder)
+            if found >= 0:
+                buf = buf[found + len(marker):]
+                break
+            buf = buf[-max(len(marker), len(ERROR_KEY)):]
+            chunk = more()
+            if chunk is None:
+                return
+            buf += chunk
+
+        # Skip the ":" and find out if the rows are a list or a single row.
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in WHITESPACE + ":":
+                pos += 1
+            if pos < len(buf):
+                break
+            chunk = more()
+            if chunk is None:
+                return
+            buf, pos = buf[pos:] + chunk, 0
+
+        single = buf[pos] != "["
+        if not single:
+            pos += 1
+
+        while True:
+            while pos < len(buf) and buf[pos] in WHITESPACE + ",":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                buf = buf[pos + 1:]
+                break
+
+            try:
+                row, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # The row is not complete yet, so read another chunk.
+                chunk = more()
+                if chunk is None:
+                    return
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+
+            yield row
+            pos = end
+            if single:
+                buf = buf[pos:]
+                break
+
+
+def read_error(buf, more, decoder):
+    """
+    This reads the value of the "error" key of a reply, and the id after
+    it, reading more chunks until they are complete.
+
+    :return: The NxApiError of the reply.
+    """
+    while True:
+        try:
+            buf = buf.lstrip(WHITESPACE + ":")
+            error, end = decoder.raw_decode(buf)
+            while "}" not in buf[end:]:
+                chunk = more()
+                if chunk is None:
+                    break
+                buf += chunk
+            req_id = REPLY_ID.match(buf[end:])
+            return cli_error(error, None if req_id is None else int(req_id.group(1)))
+        except ValueError:
+            chunk = more()
+            if chunk is None:
+                return cli_error({"message": "The reply ended in an error that could not be read"})
+            buf += chunk
+
+
+def stream_rows(req, table, chunk_size=65536):
+    """
+    This yields the rows of a streamed request, and closes the connection
+    when the rows are done or the caller stops early.
+
+    :param req: The results of an API request made with stream=True.
+    :param table: The table name, such as "interface" for ROW_interface.
+    :param chunk_size: The number of bytes to read at a time.
+
+    :return: A generator of row dictionaries.
+    """
+    try:
+        for row in iter_rows(req.iter_content(chunk_size), table):
+            yield row
+    finally:
+        req.close()
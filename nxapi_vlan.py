@@ -0,0 +1,254 @@
+import re
+
+INTFC_PREFIXES = (
+    ("ethernet", "Ethernet"), ("eth", "Ethernet"), ("e", "Ethernet"),
+    ("port-channel", "port-channel"), ("po", "port-channel"),
+    ("vlan", "Vlan"), ("mgmt", "mgmt"), ("loopback", "loopback"), ("lo", "loopback"),
+)
+
+INTFC_NAME = re.compile(r"^\s*([A-Za-z-]+)\s*([\d/.]+)\s*$")
+
+INTFC_RANGE = re.compile(r"^(.*/)(\d+)-(\d+)$")
+
+
+def intfc_name(name):
+    """
+    This returns the full NX-OS name of an interface, so "eth1/47", "e1/47"
+    and "Ethernet1/47" are all "Ethernet1/47", and "po10" is "port-channel10".
+    Names that are not recognized are returned unchanged.
+    """
+    match = INTFC_NAME.match(name)
+    if match is None:
+        return name.strip()
+
+    prefix = match.group(1).lower()
+    for short, full in INTFC_PREFIXES:
+        if prefix == short:
+            return full + match.group(2)
+
+    return match.group(1) + match.group(2)
+
+
+def expand_vlans(vlans):
+    """
+    This expands a VLAN range string.
+
+    :param vlans: A VLAN range such as "1-10,20".
+
+    :return: A list of VLAN IDs.
+
+    :example:
+    >>> expand_vlans("1-3,10")
+    [1, 2, 3, 10]
+    """
+    vlan_ids = []
+    for part in str(vlans).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-")
+            vlan_ids.extend(range(int(first), int(last) + 1))
+        else:
+            vlan_ids.append(int(part))
+
+    return vlan_ids
+
+
+def expand_intfcs(intfcs):
+    """
+    This expands an interface list as given in "vlanshowplist-ifidx", where
+    a range of ports is written as "Ethernet1/1-4".
+
+    :param intfcs: A comma separated interface list.
+
+    :return: A list of full interface names.
+
+    :example:
+    >>> expand_intfcs("Ethernet1/1-3,eth1/47,port-channel10")
+    ['Ethernet1/1', 'Ethernet1/2', 'Ethernet1/3', 'Ethernet1/47', 'port-channel10']
+    """
+    names = []
+    for part in intfcs.split(","):
+        part = part.strip()
+        if not part or part == "None":
+            continue
+        ports = INTFC_RANGE.match(part)
+        if ports is not None:
+            base, first, last = ports.groups()
+            names.extend(intfc_name("{}{}".format(base, port)) for port in range(int(first), int(last) + 1))
+        else:
+            names.append(intfc_name(part))
+
+    return names
+
+
+def intfc_ranges(intfcs):
+    """
+    This writes interfaces in NX-OS range syntax, the reverse of
+    expand_intfcs(). Consecutive ports of a slot become one range.
+
+    :param intfcs: An iterable of interface names, in any short form.
+
+    :return: A list of interface names and ranges.
+
+    :example:
+    >>> intfc_ranges(["eth1/1", "eth1/2", "eth1/3", "eth1/47", "po10"])
+    ['Ethernet1/1-3', 'Ethernet1/47', 'port-channel10']
+    """
+    ranges = []
+    for name in intfcs:
+        name = intfc_name(name)
+        base, port = name.rstrip("0123456789"), name[len(name.rstrip("0123456789")):]
+        last = ranges[-1] if ranges else None
+        if base.endswith("/") and port and last and last[0] == base and last[2] == int(port) - 1:
+            last[2] = int(port)
+        elif base.endswith("/") and port:
+            ranges.append([base, int(port), int(port)])
+        else:
+            ranges.append([name, None, None])
+
+    return [base if first is None else "{}{}".format(base, first) if first == last
+            else "{}{}-{}".format(base, first, last) for base, first, last in ranges]
+
+
+def bits(number):
+    """
+    This yields the position of each set bit of a number, lowest first.
+    """
+    while number:
+        low = number & -number
+        yield low.bit_length() - 1
+        number ^= low
+
+
+class VlanTable:
+    """
+    This class holds the VLAN membership of a switch, indexed both ways.
+    Each interface is given a small integer id, each VLAN keeps a bitset of
+    its interface ids, and each interface keeps a bitset of its VLAN IDs, so
+    "is Ethernet1/47 in VLAN 10", "which VLANs is Ethernet1/47 in" and
+    "which ports are in VLAN 10" are answered without splitting any strings.
+    """
+
+    def __init__(self):
+        self.names = {}
+        self.port_ids = {}
+        self.ports = []
+        self.vlan_ports = {}
+        self.port_vlans = []
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        This builds a table from the rows of "show vlan" or "show vlan id".
+
+        :param rows: The ROW_vlanbrief (or ROW_vlanbriefid) value, a list of
+        rows or a single row dictionary.
+
+        :return: A VlanTable.
+
+        :example:
+        >>> rows = sh_vlans.json()['result']['body']['TABLE_vlanbrief']['ROW_vlanbrief']
+        >>> vlans = VlanTable.from_rows(rows)
+        >>> vlans.vlans_of('eth1/47')
+        [10]
+        >>> vlans.ports_of(10)
+        ['Ethernet1/45', 'Ethernet1/47']
+        """
+        if isinstance(rows, dict):
+            rows = [rows]
+
+        table = cls()
+        for row in rows:
+            table.add(row["vlanshowbr-vlanid"], row.get("vlanshowbr-vlanname", ""),
+                      row.get("vlanshowplist-ifidx", ""))
+
+        return table
+
+    @classmethod
+    def from_vlans(cls, vlans):
+        """
+        This builds a table from the dictionaries returned by vlans_fltr.
+        """
+        table = cls()
+        for vlan in vlans:
+            table.add(vlan["vlan_id"], vlan["name"], vlan["interfaces"])
+
+        return table
+
+    def port_id(self, name):
+        """
+        This returns the integer id of an interface, giving it one if it is new.
+        """
+        name = intfc_name(name)
+        port_id = self.port_ids.get(name)
+        if port_id is None:
+            port_id = self.port_ids[name] = len(self.ports)
+            self.ports.append(name)
+            self.port_vlans.append(0)
+
+        return port_id
+
+    def add(self, vlan, name, intfcs=""):
+        """
+        This method adds a VLAN and its member interfaces.
+
+        :param vlan: The VLAN ID.
+        :param name: The VLAN name.
+        :param intfcs: A comma separated interface list, or a list of names.
+        """
+        vlan = int(vlan)
+        self.names[vlan] = name
+        if isinstance(intfcs, str):
+            intfcs = expand_intfcs(intfcs)
+
+        members = self.vlan_ports.get(vlan, 0)
+        for intfc in intfcs:
+            port_id = self.port_id(intfc)
+            members |= 1 << port_id
+            self.port_vlans[port_id] |= 1 << vlan
+        self.vlan_ports[vlan] = members
+
+    def __contains__(self, vlan):
+        return int(vlan) in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    def name(self, vlan):
+        return self.names[int(vlan)]
+
+    def has(self, vlan, intfc):
+        """
+        This returns True if an interface is a member of a VLAN.
+        """
+        port_id = self.port_ids.get(intfc_name(intfc))
+        if port_id is None:
+            return False
+
+        return bool(self.port_vlans[port_id] >> int(vlan) & 1)
+
+    def ports_of(self, vlan):
+        """
+        This returns the member interfaces of a VLAN, in the order first seen.
+        """
+        ports = self.ports
+
+        return [ports[port_id] for port_id in bits(self.vlan_ports.get(int(vlan), 0))]
+
+    def vlans_of(self, intfc):
+        """
+        This returns the VLAN IDs an interface is a member of, lowest first.
+        """
+        port_id = self.port_ids.get(intfc_name(intfc))
+        if port_id is None:
+            return []
+
+        return list(bits(self.port_vlans[port_id]))
+
+    def vlans(self):
+        """
+        This returns every VLAN ID, lowest first.
+        """
+        return sorted(self.names)
@@ -0,0 +1,163 @@
+import json
+from xml.sax.saxutils import escape
+from xml.etree import ElementTree
+
+# The wire formats of a request. "jsonrpc" is the JSON-RPC "cli" method that
+# req_body() builds; "json" and "xml" are the ins_api "cli_show" request with
+# JSON or XML output; "ascii" is the JSON-RPC "cli_ascii" method, which
+# answers with the CLI text instead of a structured body.
+FORMATS = ("jsonrpc", "json", "xml", "ascii")
+
+CONTENT_TYPES = {
+    "jsonrpc": "application/json-rpc",
+    "json": "application/json",
+    "xml": "application/xml",
+    "ascii": "application/json-rpc",
+}
+
+XML_REQUEST = ('<?xml version="1.0"?><ins_api><version>1.0</version><type>cli_show</type><chunk>0</chunk>'
+               '<sid>sid</sid><input>{}</input><output_format>xml</output_format></ins_api>')
+
+
+def wire_request(cmds, fmt):
+    """
+    This builds the request for show commands in a wire format.
+
+    :param cmds: A list of the commands; more than one is a batch.
+    :param fmt: One of FORMATS.
+
+    :return: The request data, and its content type.
+
+    :example:
+    >>> wire_request(["show version"], "json")
+    ('{"ins_api": {"version": "1.0", "type": "cli_show", "chunk": "0", "sid": "1", "input": "show version",
+    "output_format": "json"}}', 'application/json')
+    """
+    if fmt in ("jsonrpc", "ascii"):
+        method = "cli" if fmt == "jsonrpc" else "cli_ascii"
+        bodies = [{"jsonrpc": "2.0", "method": method, "id": req_id, "params": {"cmd": cmd, "version": 1}}
+                  for req_id, cmd in enumerate(cmds, 1)]
+        data = json.dumps(bodies if len(bodies) > 1 else bodies[0])
+    elif fmt == "json":
+        data = json.dumps({"ins_api": {"version": "1.0", "type": "cli_show", "chunk": "0", "sid": "1",
+                                       "input": " ;".join(cmds), "output_format": "json"}})
+    elif fmt == "xml":
+        data = XML_REQUEST.format(escape(" ;".join(cmds)))
+    else:
+        raise ValueError("Unknown wire format {!r}; use one of {}".format(fmt, ", ".join(FORMATS)))
+
+    return data, CONTENT_TYPES[fmt]
+
+
+def decode_reply(content, fmt, batch=False):
+    """
+    This decodes a response body in any wire format to the JSON-RPC reply
+    the filters take, so the format only changes what is on the wire.
+    The values of a XML body are all strings, where JSON has some numbers.
+
+    :param content: The response body bytes.
+    :param fmt: The wire format of the request.
+    :param batch: Set to True if the request had more than one command.
+
+    :return: A reply dictionary, or a list of them for a batch.
+    """
+    if fmt in ("jsonrpc", "ascii"):
+        return json.loads(content)
+    if fmt == "json":
+        outputs = json.loads(content)["ins_api"]["outputs"]["output"]
+        if isinstance(outputs, dict):
+            outputs = [outputs]
+        outputs = [(out.get("code"), out.get("msg"), out.get("clierror"), out.get("body", ""))
+                   for out in outputs]
+    elif fmt == "xml":
+        root = ElementTree.fromstring(content)
+        outputs = []
+        for out in root.iter("output"):
+            body = out.find("body")
+            outputs.append((out.findtext("code"), out.findtext("msg"), out.findtext("clierror"),
+                            "" if body is None else xml_value(body)))
+    else:
+        raise ValueError("Unknown wire format {!r}; use one of {}".format(fmt, ", ".join(FORMATS)))
+
+    replies = []
+    for req_id, (code, msg, clierror, body) in enumerate(outputs, 1):
+        if str(code) == "200":
+            replies.append({"jsonrpc": "2.0", "result": {"body": body}, "id": req_id})
+        else:
+            replies.append({"jsonrpc": "2.0", "id": req_id, "error": {
+                "code": -32602, "message": msg or "Invalid params", "data": {"msg": clierror or msg}}})
+
+    return replies if batch else replies[0]
+
+
+def xml_value(elem):
+    """
+    This turns a XML body element into the dictionary the JSON body has: a
+    tag seen once is a value, and a tag repeated, as ROW_interface, is a
+    list. The __readonly__ and __XML__ wrapper elements NX-OS puts around
+    some bodies are passed through.
+    """
+    if len(elem) == 0:
+        return elem.text or ""
+
+    value = {}
+    for child in elem:
+        tag = child.tag.rsplit("}", 1)[-1]
+        if tag == "__readonly__" or tag.startswith("__XML__"):
+            inner = xml_value(child)
+            if isinstance(inner, dict):
+                value.update(inner)
+            continue
+        inner = xml_value(child)
+        if tag not in value:
+            value[tag] = inner
+        elif isinstance(value[tag], list):
+            value[tag].append(inner)
+        else:
+            value[tag] = [value[tag], inner]
+
+    return value
+
+
+class WireResponse:
+    """
+    This wraps a requests response to a request in a wire format other
+    than "jsonrpc"; json() decodes the body with decode_reply(), and every
+    other attribute is the response's own.
+    """
+
+    def __init__(self, resp, fmt, batch=False):
+        self.resp = resp
+        self.fmt = fmt
+        self.batch = batch
+
+    def json(self, **kwargs):
+        return decode_reply(self.resp.content, self.fmt, self.batch)
+
+    def __getattr__(self, name):
+        return getattr(self.resp, name)
+
+
+def wire_post(post, cmds, fmt):
+    """
+    This wraps a requests post function so it sends show commands in a
+    wire format instead of the JSON-RPC body it is called with.
+
+    :param post: The post function, as requests.Session.post.
+    :param cmds: The command, or tuple of commands, from body_cmds().
+    :param fmt: One of FORMATS.
+
+    :return: A function called as post is.
+    """
+    batch = isinstance(cmds, tuple)
+    data, content_type = wire_request(list(cmds) if batch else [cmds], fmt)
+
+    def post_wire(url, json=None, headers=None, **kwargs):
+        headers = dict(headers or {}, **{"content-type": content_type})
+        resp = post(url, data=data, headers=headers, **kwargs)
+        if fmt in ("jsonrpc", "ascii"):
+            return resp
+
+        return WireResponse(resp, fmt, batch)
+
+    return post_wire